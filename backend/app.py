@@ -1,27 +1,62 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Blueprint, Request, request, jsonify, render_template, g, current_app
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
+import logging
 import sqlite3
-import requests
-import json
 import re
-import random
 import html
+import hmac
 import time
-from datetime import datetime
-from dotenv import load_dotenv
+import threading
+import uuid
+import atexit
+import tempfile
+from datetime import datetime, timedelta
 from functools import wraps
+from itertools import groupby
+from werkzeug.local import LocalProxy
 
-# Load environment variables
-load_dotenv()
+# config.py loads .env before reading the environment
+from config import (SearchConfig, DedupConfig, PrefetchConfig, NoteStorageConfig, CacheConfig, LoggingConfig,
+                    UserConfig, PaymentConfig, StorageConfig, AIConfig, ExplanationConfig,
+                    GradingConfig, AttemptConfig, ReviewConfig, UploadConfig, TransferConfig, get_config)
+from utils.logging_setup import setup_logging, request_id_var, logging_stats
+from utils.lazy import Lazy
+from utils.migrations import migrate, SCHEMA_VERSION
+from utils.search import search_quizzes, backfill_search_index, index_note
+from utils.note_store import notes_digest, encode_content, store_note
+from utils.near_duplicates import minhash_signature, store_fingerprint, find_near_duplicates
+from utils.result_cache import ResultCache, result_key
+from utils.prefetch import Prefetcher
+from utils.single_flight import SingleFlight
+from utils.admission import AdmissionController, Overloaded
+from utils.fast_json import dumps as fast_dumps, loads as fast_loads, JSON_BACKEND
+from utils.questions import question_from_row
+from utils.generator_backends import (BackendRegistry, HuggingFaceBackend, FallbackBackend, CacheBackend,
+                                      StubBackend)
+from utils.explanations import (supporting_sentence, fallback_explanation, load_question,
+                                load_quiz_notes, store_explanation, unexplained_positions)
+from utils.response_cache import ResponseBytesCache
+from utils.grading import AnswerKey, AnswerKeyCache, grade_attempt
+from utils.write_behind import WriteBehindBuffer
+from utils.attempts import insert_attempts, recent_attempts
+from utils.reviews import enroll_cards, due_cards, record_review, drop_cards
+from utils.extraction import (TextExtractor, UnsupportedFile, ExtractionTimeout, SUPPORTED_EXTENSIONS,
+                              upload_extension, clip_text)
+from utils.analytics import record_quiz, query_stats, summarize, merge_series, GRANULARITIES
+from utils.shards import ShardRouter, shard_paths, HOME_SHARD
+from utils.quotas import (consume_credit, refund_credit, credit_status, consume_anonymous_credit,
+                          refund_anonymous_credit, anonymous_credit_status)
+from utils.transfer import export_header, export_records, ndjson_chunks
+from utils.sentence_index import (split_sentences, sentence_hash, attribute_questions,
+                                  lookup_sentences, record_sentences)
 
-app = Flask(__name__, 
-            template_folder='../frontend/templates',
-            static_folder='../frontend/static')
-CORS(app)
+# Routes and request hooks live on this blueprint; create_app() builds the Flask app around it
+bp = Blueprint('quiz', __name__)
 
 # Security: Set secure headers
-@app.after_request
+@bp.after_app_request
 def after_request(response):
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'DENY'
@@ -30,29 +65,52 @@ def after_request(response):
 
 # Rate limiting (simple in-memory for demo)
 request_counts = {}
+GENERATE_RATE_LIMIT = 10  # quiz generations per client per minute
+
+def allow_request(client_ip, max_requests, window):
+    """Count a request against the client's window; False once the limit is reached"""
+    current_time = time.time()
+    
+    # Clean old entries
+    request_counts[client_ip] = [req_time for req_time in request_counts.get(client_ip, []) 
+                               if current_time - req_time < window]
+    
+    # Check rate limit
+    if len(request_counts.get(client_ip, [])) >= max_requests:
+        return False
+    
+    # Add current request
+    request_counts.setdefault(client_ip, []).append(current_time)
+    return True
 
 def rate_limit(max_requests=20, window=60):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            client_ip = request.remote_addr
-            current_time = time.time()
-            
-            # Clean old entries
-            request_counts[client_ip] = [req_time for req_time in request_counts.get(client_ip, []) 
-                                       if current_time - req_time < window]
-            
-            # Check rate limit
-            if len(request_counts.get(client_ip, [])) >= max_requests:
+            if not allow_request(request.remote_addr, max_requests, window):
                 return jsonify({'success': False, 'error': 'Rate limit exceeded. Please wait a minute.'}), 429
             
-            # Add current request
-            request_counts.setdefault(client_ip, []).append(current_time)
-            
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def current_user_id():
+    """Id of the requesting user from X-User-ID (the demo user if absent)"""
+    return parse_user_id(request.headers.get('X-User-ID', ''), request.headers.get('X-User-Signature', ''))
+
+def parse_user_id(header, signature=''):
+    """User id claimed by an X-User-ID header, verified against X-User-Signature when USER_ID_SECRET is set"""
+    header = header.strip()
+    if not header:
+        return UserConfig.DEFAULT_USER_ID
+    if not header.isdigit() or int(header) < 1:
+        raise ValueError('Invalid X-User-ID header')
+    if UserConfig.USER_ID_SECRET:
+        expected = hmac.new(UserConfig.USER_ID_SECRET.encode('utf-8'), header.encode('ascii'), 'sha256').hexdigest()
+        if not hmac.compare_digest(signature.strip().lower(), expected):
+            raise ValueError('Invalid X-User-Signature header')
+    return int(header)
+
 def sanitize_input(text):
     """Sanitize user input to prevent XSS and injection"""
     if not text:
@@ -63,439 +121,318 @@ def sanitize_input(text):
     text = re.sub(r'[<>"\';]', '', text)
     return text
 
-# Load environment variables
-load_dotenv()
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify through utils.fast_json (orjson when installed); question models serialize directly"""
+    
+    def dumps(self, obj, **kwargs):
+        return fast_dumps(obj, sort_keys=self.sort_keys).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return fast_loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(fast_dumps(obj, sort_keys=self.sort_keys) + b'\n', mimetype=self.mimetype)
 
-app = Flask(__name__, 
-            template_folder='../frontend/templates',
-            static_folder='../frontend/static')
-CORS(app)
+class UploadRequest(Request):
+    """Streams uploaded file parts straight to temp files (deleted when the request closes)"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', prefix='notes-upload-', suffix=upload_extension(filename),
+                                           dir=UploadConfig.TEMP_DIR)
+
+logger = logging.getLogger('quiz_app')
+
+@bp.before_app_request
+def assign_request_id():
+    """Correlate every log entry of a request (honours an incoming X-Request-ID)"""
+    g.request_id = request_id_from(request.headers.get('X-Request-ID', ''))
+    g.request_id_token = request_id_var.set(g.request_id)
+
+def request_id_from(incoming):
+    return incoming if re.fullmatch(r'[\w.-]{1,64}', incoming) else uuid.uuid4().hex[:16]
+
+@bp.after_app_request
+def add_request_id_header(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
 
-# Configuration
-HUGGING_FACE_API_KEY = os.getenv('HUGGING_FACE_API_KEY')
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'database', 'quiz_app.db')
+@bp.teardown_app_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+# Configuration class of the app (Config subclass from config.py), set by create_app()
+settings = None
+# Every database access goes through the router; users and credits live in HOME_SHARD
+storage = None
 
 class AIQuizGenerator:
-    """AI-powered quiz generator using Hugging Face models"""
+    """Quiz generation engine: tries a chain of generator backends until one yields questions"""
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, admission=None, overload_mode='fallback', registry=None,
+                 default_chain=('fallback',)):
         self.api_key = api_key
-        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        # Backends by name (utils/generator_backends.py) and the chain used when a request names none
+        self.registry = registry or BackendRegistry()
+        self.default_chain = list(default_chain)
+        
+        # Caps concurrent Hugging Face calls; shed requests degrade or are rejected
+        self.admission = admission or AdmissionController()
+        self.overload_mode = overload_mode
+        self._session = None
+        
+        # Load, used to hold back speculative work
+        self._state_lock = threading.Lock()
+        self.in_flight = 0
         
     def generate_quiz(self, notes, quiz_type='mcq', num_questions=5):
         """Generate quiz questions using AI or fallback"""
+        return self.generate_quiz_with_method(notes, quiz_type, num_questions)[0]
+    
+    def backend_chain(self, backend=None):
+        """Backends to try, in order: the named one (then the local fallback) or the configured chain"""
+        chain = self.registry.chain([backend] if backend else self.default_chain)
+        if not chain or not chain[-1].terminal:
+            fallback = self.registry.get('fallback')
+            if fallback is not None and fallback not in chain:
+                chain.append(fallback)
+        return chain
+    
+    def generate_quiz_with_method(self, notes, quiz_type='mcq', num_questions=5, backend=None):
+        """Generate quiz questions, returning (questions, generation_method).
         
-        if not self.api_key:
-            print("No API key, using fallback generation")
-            return self._generate_fallback_quiz(notes, quiz_type, num_questions)
+        generation_method is the label of the backend that answered ('AI',
+        'Fallback', 'Reused' or 'Stub'), or 'Degraded' when remote backends
+        were at capacity and a local one answered instead; with overload_mode
+        'reject' that case raises Overloaded.
+        """
+        shed = False
+        for candidate in self.backend_chain(backend):
+            if not candidate.remote:
+                questions = self.run_backend(candidate, notes, quiz_type, num_questions)
+            elif shed:
+                continue
+            elif not self.admission.acquire():
+                if self.overload_mode == 'reject':
+                    raise Overloaded(self.admission.retry_after())
+                logger.info("AI backend at capacity, serving fallback questions", extra={'sample': 'ai_shed'})
+                shed = True
+                continue
+            else:
+                started = time.monotonic()
+                with self._state_lock:
+                    self.in_flight += 1
+                try:
+                    questions = self.run_backend(candidate, notes, quiz_type, num_questions)
+                finally:
+                    with self._state_lock:
+                        self.in_flight -= 1
+                    self.admission.release(time.monotonic() - started)
+            
+            if questions:
+                return questions, 'Degraded' if shed else candidate.label
         
+        return [], 'Fallback'
+    
+    def run_backend(self, backend, notes, quiz_type, num_questions):
+        """Questions from one backend ([] on failure), recorded in its stats"""
+        started = time.monotonic()
+        questions = []
         try:
-            if quiz_type == 'mcq':
-                return self._generate_mcq_with_ai(notes, num_questions)
-            else:
-                return self._generate_flashcards_with_ai(notes, num_questions)
+            questions = backend.generate(notes, quiz_type, num_questions)
         except Exception as e:
-            print(f"AI generation failed: {e}")
-            return self._generate_fallback_quiz(notes, quiz_type, num_questions)
+            logger.warning("%s generation failed: %s", backend.name, e)
+        backend.stats.record(time.monotonic() - started, num_questions, len(questions))
+        return questions
+    
+    def _http(self):
+        """Pooled HTTP session shared by the Hugging Face backends, created on the first AI call"""
+        with self._state_lock:
+            if self._session is None:
+                # Imported here: requests is a sizeable share of the app's import time
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                self._session.mount('https://', HTTPAdapter(pool_maxsize=self.admission.max_in_flight))
+            return self._session
     
-    def _generate_mcq_with_ai(self, notes, num_questions):
-        """Generate MCQ using Hugging Face"""
+    def is_degraded(self):
+        """True while every remote backend is failing repeatedly or rate limiting us"""
+        remote = self.registry.remote()
+        return bool(remote) and all(backend.is_degraded() for backend in remote)
+    
+    def generate_explanation(self, question, context=''):
+        """Explain a question's answer, returning (explanation, 'AI', 'Fallback' or 'Degraded')"""
         
-        prompt = f"""Based on the following study notes, create {num_questions} multiple choice questions.
-
-Study Notes:
-{notes}
-
-Please format each question exactly like this:
-QUESTION: [Clear question text]
-A) [First option]
-B) [Second option]
-C) [Third option]
-D) [Fourth option]
-CORRECT: [A or B or C or D]
----
-
-QUESTION:"""
-
-        try:
-            # Use text generation model
-            api_url = "https://api-inference.huggingface.co/models/gpt2"
-            
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": 600,
-                    "temperature": 0.7,
-                    "do_sample": True,
-                    "return_full_text": False
-                }
-            }
-            
-            response = requests.post(api_url, headers=self.headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    generated_text = result[0].get('generated_text', '')
-                    parsed_questions = self._parse_mcq_response(generated_text)
-                    if parsed_questions:
-                        return parsed_questions
-            elif response.status_code == 503:
-                print("Model is loading, using fallback")
-            else:
-                print(f"API response: {response.status_code}, {response.text}")
-            
-        except Exception as e:
-            print(f"Hugging Face API error: {e}")
+        # Explanations come from the first Hugging Face model of the default chain
+        explainer = next((backend for backend in self.backend_chain() if backend.remote), None)
+        if explainer is not None:
+            if not self.admission.acquire():
+                return fallback_explanation(question, context), 'Degraded'
+            started = time.monotonic()
+            with self._state_lock:
+                self.in_flight += 1
+            try:
+                explanation = self._generate_explanation_with_ai(explainer, question, context)
+                if explanation:
+                    return explanation, 'AI'
+            finally:
+                with self._state_lock:
+                    self.in_flight -= 1
+                self.admission.release(time.monotonic() - started)
         
-        # Fallback if AI fails
-        return self._generate_fallback_quiz(notes, 'mcq', num_questions)
+        return fallback_explanation(question, context), 'Fallback'
     
-    def _generate_flashcards_with_ai(self, notes, num_questions):
-        """Generate flashcards using AI"""
+    def _generate_explanation_with_ai(self, backend, question, context):
+        """Short explanation of why the answer is correct, or None"""
         
-        prompt = f"""Create {num_questions} study flashcards from this content:
+        prompt = f"""Question: {question.question}
+Correct answer: {question.answer_text()}
+From the study notes: {context}
 
-Content:
-{notes}
-
-Format each flashcard exactly like this:
-Q: [Question]
-A: [Answer]
----
-
-Q:"""
+In two sentences, explain why this answer is correct.
+Explanation:"""
 
         try:
-            api_url = "https://api-inference.huggingface.co/models/gpt2"
-            
             payload = {
                 "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": 400,
-                    "temperature": 0.6,
-                    "return_full_text": False
-                }
+                "parameters": dict(backend.parameters['explanation'])
             }
             
-            response = requests.post(api_url, headers=self.headers, json=payload, timeout=30)
+            response = self._http().post(backend.url, headers=backend.headers, json=payload, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
                 if isinstance(result, list) and len(result) > 0:
-                    generated_text = result[0].get('generated_text', '')
-                    parsed_questions = self._parse_flashcard_response(generated_text)
-                    if parsed_questions:
-                        return parsed_questions
+                    text = result[0].get('generated_text', '').strip().split('\n\n')[0].strip()
+                    if len(text) >= 20:
+                        backend.record_result(True)
+                        return text
+                backend.record_result(False, 200)
+            else:
+                backend.record_result(False, response.status_code, response.headers.get('Retry-After'))
             
         except Exception as e:
-            print(f"Flashcard generation error: {e}")
-        
-        return self._generate_fallback_quiz(notes, 'flashcard', num_questions)
-    
-    def _parse_mcq_response(self, text):
-        """Parse AI-generated MCQ text"""
-        questions = []
-        
-        # Split by question markers
-        blocks = re.split(r'QUESTION:', text)
-        
-        for block in blocks:
-            try:
-                lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
-                
-                if len(lines) < 6:
-                    continue
-                
-                question_text = lines[0].strip()
-                options = []
-                correct_answer = 0
-                
-                # Extract options A, B, C, D
-                for line in lines[1:5]:
-                    if re.match(r'^[A-D]\)', line):
-                        option = re.sub(r'^[A-D]\)\s*', '', line).strip()
-                        options.append(option)
-                
-                # Find correct answer
-                correct_line = next((line for line in lines if 'CORRECT:' in line.upper()), '')
-                if correct_line:
-                    correct_letter = correct_line.upper().split('CORRECT:')[-1].strip()
-                    if correct_letter in ['A', 'B', 'C', 'D']:
-                        correct_answer = ord(correct_letter) - ord('A')
-                
-                if len(options) == 4 and question_text:
-                    questions.append({
-                        'question': question_text,
-                        'options': options,
-                        'correct_answer': correct_answer,
-                        'type': 'mcq'
-                    })
-                    
-            except Exception as e:
-                print(f"Error parsing MCQ block: {e}")
-                continue
-        
-        return questions
-    
-    def _parse_flashcard_response(self, text):
-        """Parse AI-generated flashcard text"""
-        questions = []
+            logger.warning("Explanation generation error: %s", e)
+            backend.record_result(False)
         
-        # Split by Q: markers
-        parts = re.split(r'\bQ:', text)
-        
-        for part in parts:
-            try:
-                lines = [line.strip() for line in part.strip().split('\n') if line.strip()]
-                
-                if len(lines) < 2:
-                    continue
-                
-                question_text = lines[0].strip()
-                answer_line = next((line for line in lines if line.startswith('A:')), '')
-                
-                if answer_line:
-                    answer = answer_line.replace('A:', '').strip()
-                    
-                    if question_text and answer:
-                        questions.append({
-                            'question': question_text,
-                            'answer': answer,
-                            'type': 'flashcard'
-                        })
-                        
-            except Exception as e:
-                print(f"Error parsing flashcard: {e}")
-                continue
-        
-        return questions
-    
-    def _generate_fallback_quiz(self, notes, quiz_type, num_questions):
-        """Fallback quiz generation when AI is not available"""
-        
-        # Split notes into meaningful chunks
-        sentences = [s.strip() for s in notes.split('.') if s.strip() and len(s.split()) > 4]
-        questions = []
-        
-        for i, sentence in enumerate(sentences[:num_questions]):
-            words = sentence.split()
-            
-            if quiz_type == 'mcq':
-                # Create fill-in-the-blank MCQ
-                if len(words) > 6:
-                    # Find important words (exclude common words)
-                    skip_words = {'the', 'and', 'or', 'but', 'with', 'from', 'they', 'this', 'that', 'have', 'been', 'will', 'were', 'are', 'is', 'in', 'on', 'at', 'to', 'for', 'of', 'by', 'as'}
-                    important_words = [w for w in words if len(w) > 3 and w.lower() not in skip_words]
-                    
-                    if important_words:
-                        key_word = random.choice(important_words)
-                        question_text = sentence.replace(key_word, "______", 1)
-                        
-                        # Generate plausible wrong answers
-                        wrong_options = []
-                        
-                        # Add variations of the word
-                        if key_word.endswith('s') and len(key_word) > 3:
-                            wrong_options.append(key_word[:-1])
-                        else:
-                            wrong_options.append(f"{key_word}s")
-                        
-                        if not key_word.lower().startswith('un'):
-                            wrong_options.append(f"un{key_word.lower()}")
-                        else:
-                            wrong_options.append(key_word[2:])
-                        
-                        wrong_options.append(f"{key_word.lower()}_related")
-                        
-                        # Ensure we have exactly 4 options
-                        options = [key_word] + wrong_options[:3]
-                        random.shuffle(options)
-                        correct_answer = options.index(key_word)
-                        
-                        questions.append({
-                            'question': f"Fill in the blank: {question_text}",
-                            'options': options,
-                            'correct_answer': correct_answer,
-                            'type': 'mcq'
-                        })
-            
-            else:  # flashcard
-                if len(words) > 5:
-                    # Create meaningful question-answer pairs
-                    if any(word in sentence.lower() for word in ['is', 'are', 'means', 'refers', 'defines']):
-                        # Definition-style question
-                        question = f"What is defined or described in this statement?"
-                        answer = sentence
-                    elif any(word in sentence.lower() for word in ['because', 'since', 'due to', 'causes']):
-                        # Cause-effect question
-                        question = f"What cause and effect relationship is described?"
-                        answer = sentence
-                    else:
-                        # General comprehension question
-                        question = f"What is the main concept explained here?"
-                        answer = sentence
-                    
-                    questions.append({
-                        'question': question,
-                        'answer': answer,
-                        'type': 'flashcard'
-                    })
-        
-        # Ensure we have at least some questions
-        if not questions and sentences:
-            # Create at least one question from the content
-            first_sentence = sentences[0]
-            if quiz_type == 'mcq':
-                questions.append({
-                    'question': f"Based on your notes, which statement is correct?",
-                    'options': [
-                        first_sentence[:50] + "...",
-                        "This is incorrect information",
-                        "The opposite is true",
-                        "This is partially correct"
-                    ],
-                    'correct_answer': 0,
-                    'type': 'mcq'
-                })
-            else:
-                questions.append({
-                    'question': 'What is the key information from your notes?',
-                    'answer': first_sentence,
-                    'type': 'flashcard'
-                })
-        
-        return questions
+        return None
 
 # Initialize database
 def init_database():
-    """Initialize SQLite database with required tables"""
-    
-    # Ensure database directory exists
-    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    """Bring the SQLite schema of every shard up to date (a single pragma read when current)"""
     
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    # Ensure database directories exist
+    for path in storage.paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
     
-    print("Initializing database tables...")
+    applied = sum(storage.fan_out(lambda shard, conn: migrate(conn)))
     
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            email TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER DEFAULT 1,
-            content TEXT NOT NULL,
-            title TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS quizzes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            notes_id INTEGER,
-            quiz_type TEXT NOT NULL CHECK(quiz_type IN ('mcq', 'flashcard')),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (notes_id) REFERENCES notes (id)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            quiz_id INTEGER,
-            question_text TEXT NOT NULL,
-            question_type TEXT NOT NULL,
-            options TEXT,
-            correct_answer TEXT,
-            explanation TEXT,
-            FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
-        )
-    ''')
+    if applied:
+        logger.info("✅ Database migrated to schema v%s (%s step(s) applied)", SCHEMA_VERSION, applied)
+    else:
+        logger.info("✅ Database schema is current (v%s)", SCHEMA_VERSION)
     
-    # Create default user
-    cursor.execute('''
-        INSERT OR IGNORE INTO users (id, username, email) 
-        VALUES (1, 'demo_user', 'demo@example.com')
-    ''')
+    # Index pre-existing rows off the startup path
+    threading.Thread(target=resume_search_backfill, name='search-backfill', daemon=True).start()
     
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully!")
+    if ExplanationConfig.BULK_FILL_ENABLED:
+        threading.Thread(target=fill_popular_explanations, name='explanation-fill', daemon=True).start()
+
+def resume_search_backfill():
+    """Finish indexing rows created before full-text search existed"""
+    try:
+        indexed = sum(storage.fan_out(
+            lambda shard, conn: backfill_search_index(conn, SearchConfig.BACKFILL_BATCH_SIZE)))
+        if indexed:
+            logger.info("🔎 Search index backfilled %s existing rows", indexed)
+    except Exception as e:
+        logger.exception("Search backfill error: %s", e)
 
 # Database helper functions
-def save_quiz_to_db(notes_content, quiz_data, quiz_type):
-    """Save quiz to database"""
+def save_quiz_to_db(notes_content, quiz_data, quiz_type, sentence_sources=None, processed_sentences=(),
+                    generation_method=None, user_id=1):
+    """Save quiz to database
+    
+    sentence_sources (parallel to quiz_data) holds the sentence hash each newly
+    generated question came from, processed_sentences the hashes that were sent
+    to the generator; both feed the sentence index for incremental regeneration.
+    The quiz is written to the shard of its notes; returns its public id.
+    """
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
+        digest = notes_digest(notes_content)
+        title = f"Notes from {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        
+        shard = storage.shard_for_digest(digest)
+        conn = storage.connect(shard)
         cursor = conn.cursor()
         
-        # Save notes
-        cursor.execute(
-            "INSERT INTO notes (content, title) VALUES (?, ?)",
-            (notes_content, f"Notes from {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        )
-        notes_id = cursor.lastrowid
+        # Notes are stored once per distinct content; do the CPU work for a new
+        # note (compression, fingerprint) before taking the write lock
+        known = cursor.execute("SELECT 1 FROM notes WHERE content_hash = ? LIMIT 1", (digest,)).fetchone()
+        encoded = signature = None
+        if not known:
+            encoded = encode_content(notes_content, NoteStorageConfig.COMPRESS_MIN_BYTES,
+                                     NoteStorageConfig.COMPRESSION)
+            signature = minhash_signature(notes_content)
+        
+        cursor.execute('BEGIN IMMEDIATE')
+        notes_id, created = store_note(cursor, notes_content, title, digest, encoded, user_id)
+        if created:
+            store_fingerprint(cursor, notes_id, signature or minhash_signature(notes_content))
+            index_note(cursor, notes_id, title, notes_content)
         
         # Save quiz
         cursor.execute(
-            "INSERT INTO quizzes (notes_id, quiz_type) VALUES (?, ?)",
-            (notes_id, quiz_type)
+            "INSERT INTO quizzes (notes_id, quiz_type, generation_method, user_id, question_count) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (notes_id, quiz_type, generation_method, user_id, len(quiz_data))
         )
         quiz_id = cursor.lastrowid
         
         # Save questions
-        for question in quiz_data:
-            options_json = json.dumps(question.get('options', []))
-            
-            if question['type'] == 'mcq':
-                correct_answer_json = json.dumps(question.get('correct_answer', 0))
-            else:
-                correct_answer_json = json.dumps(question.get('answer', ''))
-            
+        question_sources = []
+        for position, question in enumerate(quiz_data):
             cursor.execute(
                 "INSERT INTO questions (quiz_id, question_text, question_type, options, correct_answer) VALUES (?, ?, ?, ?, ?)",
-                (quiz_id, question['question'], question['type'], options_json, correct_answer_json)
+                (quiz_id,) + question.db_columns()
             )
+            if sentence_sources and sentence_sources[position] is not None:
+                question_sources.append((sentence_sources[position], cursor.lastrowid))
+        
+        record_sentences(cursor, quiz_type, processed_sentences, question_sources)
+        record_quiz(cursor, quiz_id, generation_method or 'Unknown', len(quiz_data))
         
         conn.commit()
         conn.close()
-        return quiz_id
+        return storage.encode_id(shard, quiz_id)
         
     except Exception as e:
-        print(f"Database error: {e}")
+        logger.exception("Failed to save quiz: %s", e)
         return None
 
-def get_quiz_history():
-    """Get quiz history from database"""
-    try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+def get_quiz_history(user_id):
+    """Get a user's latest quizzes (a range scan of idx_quizzes_user_created per shard)"""
+    def latest(shard, conn):
+        rows = conn.execute('''
             SELECT q.id, q.quiz_type, q.created_at, n.title, 
-                   COUNT(qu.id) as question_count,
-                   substr(n.content, 1, 100) as content_preview
+                   q.question_count,
+                   n.preview as content_preview
             FROM quizzes q
             JOIN notes n ON q.notes_id = n.id
-            LEFT JOIN questions qu ON q.id = qu.quiz_id
-            GROUP BY q.id
-            ORDER BY q.created_at DESC
+            WHERE q.user_id = ?
+            ORDER BY q.created_at DESC, q.id DESC
             LIMIT 10
-        ''')
-        
-        history = cursor.fetchall()
-        conn.close()
+        ''', (user_id,)).fetchall()
+        return [(storage.encode_id(shard, row[0]),) + row[1:] for row in rows]
+    
+    try:
+        # Each shard returns its newest 10; the newest 10 overall are among them
+        history = sorted((row for rows in storage.fan_out(latest) for row in rows),
+                         key=lambda row: (row[2], row[0]), reverse=True)[:10]
         
         return [
             {
@@ -504,157 +441,1088 @@ def get_quiz_history():
                 'date': row[2],
                 'title': row[3],
                 'question_count': row[4],
-                'preview': row[5] + '...' if len(row[5]) == 100 else row[5]
+                'preview': row[5] + '...' if len(row[5] or '') == 100 else row[5]
             }
             for row in history
         ]
         
     except Exception as e:
-        print(f"Database error: {e}")
+        logger.exception("Failed to load quiz history: %s", e)
         return []
 
-# Initialize AI generator
-ai_generator = AIQuizGenerator(HUGGING_FACE_API_KEY)
+def is_anonymous(user_id):
+    """Requests without a user identity; their credits are counted per client address"""
+    return user_id == UserConfig.DEFAULT_USER_ID
+
+def spend_credit(user_id, client_ip):
+    """Atomically consume one of the user's (or anonymous client's) daily credits; returns (allowed, remaining)"""
+    conn = storage.connect(HOME_SHARD)
+    try:
+        if is_anonymous(user_id):
+            return consume_anonymous_credit(conn, client_ip or '', PaymentConfig.QUIZ_CREDITS_FREE)
+        return consume_credit(conn, user_id, PaymentConfig.QUIZ_CREDITS_FREE, PaymentConfig.QUIZ_CREDITS_PREMIUM)
+    finally:
+        conn.close()
+
+def give_back_credit(user_id, client_ip):
+    """Refund a credit when no quiz was produced"""
+    try:
+        conn = storage.connect(HOME_SHARD)
+        try:
+            if is_anonymous(user_id):
+                refund_anonymous_credit(conn, client_ip or '')
+            else:
+                refund_credit(conn, user_id)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning("Credit refund failed for user %s: %s", user_id, e)
+
+def quiz_owner(quiz_id):
+    """user_id of a quiz, or None if it does not exist (no SQLite read when the quiz is cached)"""
+    owner = quiz_cache.owner(quiz_id)
+    if owner is not None:
+        return owner
+    location = storage.decode_id(quiz_id)
+    if location is None:
+        return None
+    shard, local_id = location
+    conn = storage.connect(shard)
+    try:
+        row = conn.execute("SELECT user_id FROM quizzes WHERE id = ?", (local_id,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+def load_quiz_questions(cursor, quiz_id):
+    """Load a quiz's questions as question models (empty list if not found)"""
+    cursor.execute('''
+        SELECT qu.question_text, qu.question_type, qu.options, qu.correct_answer, qu.explanation
+        FROM questions qu
+        WHERE qu.quiz_id = ?
+        ORDER BY qu.id
+    ''', (quiz_id,))
+    
+    return [question_from_row(row) for row in cursor.fetchall()]
+
+def find_near_duplicate_quiz(notes_content, quiz_type, owner_id=None):
+    """Find an existing quiz of quiz_type generated from near-identical notes.
+    
+    Returns (quiz_id, similarity, questions) or None. The LSH index keeps this
+    to a few index lookups per shard regardless of how many notes are stored.
+    With owner_id, only that user's quizzes are considered.
+    """
+    if DedupConfig.NEAR_DUPLICATE_MODE == 'off':
+        return None
+    
+    signature = minhash_signature(notes_content)
+    
+    def best_match(shard, conn):
+        matches = find_near_duplicates(conn, signature, DedupConfig.NEAR_DUPLICATE_THRESHOLD)
+        cursor = conn.cursor()
+        for notes_id, similarity in matches:
+            cursor.execute(
+                "SELECT id FROM quizzes WHERE notes_id = ? AND quiz_type = ? AND (? IS NULL OR user_id = ?) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (notes_id, quiz_type, owner_id, owner_id)
+            )
+            row = cursor.fetchone()
+            if row:
+                questions = load_quiz_questions(cursor, row[0])
+                if questions:
+                    return storage.encode_id(shard, row[0]), similarity, questions
+        return None
+    
+    try:
+        found = [match for match in storage.fan_out(best_match) if match]
+        if found:
+            return max(found, key=lambda match: match[1])
+    except Exception as e:
+        logger.warning("Near-duplicate lookup error: %s", e)
+    
+    return None
+
+def generate_incrementally(notes, quiz_type, num_questions, backend=None):
+    """Generate a quiz, sending only new or changed sentences to the generator.
+    
+    Questions previously generated from unchanged sentences are reused, so the
+    work (and HF calls) scale with how much of the notes changed. Returns
+    (questions, sentence_sources, processed_sentences, stats, generation_method),
+    where generation_method is 'Reused' if no generation was needed. backend
+    names the generator backend to use instead of the configured chain.
+    """
+    plan = plan_incremental(notes, quiz_type, num_questions)
+    generated, generation_method = [], 'Reused'
+    if plan['delta_notes'] is not None:
+        generated, generation_method = ai_generator.generate_quiz_with_method(
+            plan['delta_notes'], quiz_type, plan['needed'], backend)
+    return finish_incremental(plan, generated, generation_method)
+
+def plan_incremental(notes, quiz_type, num_questions):
+    """Reusable questions and the sentences left to generate from (delta_notes is None if none)"""
+    sentences = split_sentences(notes)
+    hashes = [sentence_hash(sentence) for sentence in sentences]
+    
+    reusable, seen = {}, set()
+    if hashes:
+        try:
+            # Edited notes hash to a different shard than their previous version
+            for shard_reusable, shard_seen in storage.fan_out(
+                    lambda shard, conn: lookup_sentences(conn, hashes, quiz_type)):
+                for hash_value, rows in shard_reusable.items():
+                    reusable.setdefault(hash_value, []).extend(rows)
+                seen |= shard_seen
+        except Exception as e:
+            logger.warning("Sentence index lookup error: %s", e)
+    
+    # (sentence position, question, source hash); source is None for reused questions
+    selected = []
+    used_hashes = set()
+    for position, hash_value in enumerate(hashes):
+        if hash_value in used_hashes:
+            continue
+        used_hashes.add(hash_value)
+        for row in reusable.get(hash_value, []):
+            if len(selected) < num_questions:
+                selected.append((position, question_from_row(row), None))
+    reused_count = len(selected)
+    
+    needed = num_questions - reused_count
+    fresh, delta_notes = [], None
+    
+    if needed > 0:
+        # Unseen sentences first; top up with seen sentences that never yielded a
+        # question when there are too few new ones to fill the quiz
+        candidates = [(position, sentence, hash_value)
+                      for position, (sentence, hash_value) in enumerate(zip(sentences, hashes))
+                      if hash_value not in reusable]
+        fresh = [candidate for candidate in candidates if candidate[2] not in seen]
+        if len(fresh) < needed:
+            fresh += [candidate for candidate in candidates if candidate[2] in seen][:needed - len(fresh)]
+            fresh.sort(key=lambda candidate: candidate[0])
+        if not fresh and not selected:
+            fresh = list(zip(range(len(sentences)), sentences, hashes))
+        
+        if fresh or not selected:
+            # With no usable sentence split, fall back to the whole notes
+            delta_notes = ' '.join(sentence for _, sentence, _ in fresh) or notes
+    
+    return {'sentences': sentences, 'selected': selected, 'reused_count': reused_count,
+            'needed': needed, 'fresh': fresh, 'delta_notes': delta_notes}
+
+def finish_incremental(plan, generated, generation_method):
+    """Merge freshly generated questions into a plan; returns generate_incrementally()'s tuple"""
+    sentences, fresh, reused_count = plan['sentences'], plan['fresh'], plan['reused_count']
+    selected = list(plan['selected'])
+    processed = []
+    
+    if plan['delta_notes'] is not None:
+        generated = generated[:plan['needed']]
+        sources = attribute_questions(generated, [sentence for _, sentence, _ in fresh])
+        for question, source in zip(generated, sources):
+            if source is None:
+                selected.append((len(sentences), question, None))
+            else:
+                selected.append((fresh[source][0], question, fresh[source][2]))
+        processed = [hash_value for _, _, hash_value in fresh]
+    
+    selected.sort(key=lambda item: item[0])
+    stats = {
+        'total_sentences': len(sentences),
+        'changed_sentences': len(processed),
+        'reused_questions': reused_count,
+        'generated_questions': len(selected) - reused_count
+    }
+    return ([question for _, question, _ in selected],
+            [source for _, _, source in selected],
+            processed,
+            stats,
+            generation_method)
+
+def build_ai_generator():
+    generator = AIQuizGenerator(
+        settings.HUGGING_FACE_API_KEY,
+        admission=AdmissionController(AIConfig.MAX_IN_FLIGHT, AIConfig.MAX_QUEUE, AIConfig.QUEUE_TIMEOUT),
+        overload_mode=AIConfig.OVERLOAD_MODE,
+        registry=BackendRegistry(AIConfig.BACKEND_AUTO_ORDER, AIConfig.BACKEND_MIN_SAMPLES),
+        default_chain=AIConfig.GENERATOR_BACKENDS
+    )
+    # Hugging Face models are only registered with an API key; chains skip missing backends
+    if settings.HUGGING_FACE_API_KEY:
+        for model in AIConfig.HF_MODELS:
+            generator.registry.register(HuggingFaceBackend(model, settings.HUGGING_FACE_API_KEY, generator._http))
+    generator.registry.register(CacheBackend(result_cache))
+    generator.registry.register(StubBackend(AIConfig.STUB_LATENCY))
+    generator.registry.register(FallbackBackend())
+    return generator
+
+# Initialize AI generator on first use; the proxy forwards attribute access to it
+lazy_ai_generator = Lazy(build_ai_generator)
+ai_generator = LocalProxy(lazy_ai_generator.get)
+
+# Recent generation results, also filled by speculative prefetch
+result_cache = ResultCache(PrefetchConfig.RESULT_CACHE_ENTRIES, PrefetchConfig.RESULT_CACHE_TTL)
+# Identical generations arriving together share one in-flight call
+generation_flight = SingleFlight()
+
+def generation_key(notes, quiz_type, num_questions, backend=None):
+    """Result cache and coalescing key; results of an explicitly chosen backend are kept apart"""
+    key = result_key(notes, quiz_type, num_questions)
+    return key + (backend,) if backend else key
+
+def generate_coalesced(notes, quiz_type, num_questions, backend=None):
+    """generate_incrementally, shared by concurrent requests for the same notes, type, size and backend"""
+    return generation_flight.do(generation_key(notes, quiz_type, num_questions, backend),
+                                lambda: generate_incrementally(notes, quiz_type, num_questions, backend),
+                                timeout=AIConfig.COALESCE_WAIT_TIMEOUT)
+
+def generate_for_prefetch(notes, quiz_type, num_questions):
+    questions, _, _, _, generation_method = generate_coalesced(notes, quiz_type, num_questions)
+    if generation_method == 'Degraded':
+        return [], generation_method  # never cache overload fallbacks
+    return questions, generation_method
+
+prefetcher = Prefetcher(
+    generate_for_prefetch,
+    result_cache,
+    budget_per_minute=PrefetchConfig.BUDGET_PER_MINUTE,
+    max_pending=PrefetchConfig.MAX_PENDING,
+    backend_healthy=lambda: not ai_generator.is_degraded() and ai_generator.admission.has_capacity(),
+    foreground_busy=lambda: ai_generator.in_flight > 0
+)
+
+# Serialized /quiz/<id> responses for hot (e.g. shared) quizzes
+quiz_cache = ResponseBytesCache(CacheConfig.QUIZ_CACHE_MAX_BYTES)
+
+def serialize_quiz_response(questions):
+    """Final /quiz/<id> response body, as jsonify would produce it"""
+    return fast_dumps({'success': True, 'questions': questions}, sort_keys=FastJSONProvider.sort_keys) + b'\n'
+
+# Normalized answers per quiz, so grading a class's submissions is one lookup
+answer_keys = AnswerKeyCache(GradingConfig.ANSWER_KEY_CACHE_ENTRIES)
+
+def load_answer_key(quiz_id):
+    """AnswerKey of a quiz, or None if it does not exist"""
+    key = answer_keys.get(quiz_id)
+    if key is None:
+        location = storage.decode_id(quiz_id)
+        if location is None:
+            return None
+        shard, local_id = location
+        conn = storage.connect(shard)
+        try:
+            questions = load_quiz_questions(conn.cursor(), local_id)
+        finally:
+            conn.close()
+        if not questions:
+            return None
+        key = AnswerKey(questions)
+        answer_keys.put(quiz_id, key)
+    return key
+
+def write_attempts(batch):
+    """Write buffered (shard, attempt) pairs, one transaction per shard; returns the pairs that failed"""
+    by_shard = {}
+    for shard, attempt in batch:
+        by_shard.setdefault(shard, []).append(attempt)
+    
+    failed = []
+    for shard, attempts in by_shard.items():
+        try:
+            conn = storage.connect(shard)
+            try:
+                insert_attempts(conn, attempts)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning("Writing %s attempts to shard %s failed: %s", len(attempts), shard, e)
+            failed.extend((shard, attempt) for attempt in attempts)
+    return failed
+
+# Attempts are acknowledged from memory and written in batches
+attempt_buffer = WriteBehindBuffer(
+    write_attempts,
+    max_items=AttemptConfig.FLUSH_BATCH_SIZE,
+    max_delay=AttemptConfig.FLUSH_INTERVAL,
+    max_pending=AttemptConfig.MAX_PENDING,
+    name='attempt-writer'
+)
+atexit.register(attempt_buffer.close)
+
+def enroll_for_review(user_id, quiz_id, question_count):
+    """Put a new flashcard quiz in its creator's review queue (best effort: generation already succeeded)"""
+    conn = storage.connect(HOME_SHARD)
+    try:
+        enroll_cards(conn, user_id, quiz_id, range(question_count), datetime.utcnow())
+    except sqlite3.Error as e:
+        logger.warning("Enrolling quiz %s for review failed: %s", quiz_id, e)
+    finally:
+        conn.close()
+
+def load_review_questions(cards):
+    """{(quiz_id, question_index): question} for review cards, one query per shard"""
+    by_shard = {}
+    for card in cards:
+        location = storage.decode_id(card['quiz_id'])
+        if location is not None:
+            by_shard.setdefault(location[0], {})[location[1]] = card['quiz_id']
+    
+    questions = {}
+    for shard, quiz_ids in by_shard.items():
+        conn = storage.connect(shard)
+        try:
+            placeholders = ', '.join('?' * len(quiz_ids))
+            rows = conn.execute(f'''
+                SELECT quiz_id, question_text, question_type, options, correct_answer, explanation
+                FROM questions WHERE quiz_id IN ({placeholders}) ORDER BY quiz_id, id
+            ''', list(quiz_ids)).fetchall()
+        finally:
+            conn.close()
+        for local_id, quiz_rows in groupby(rows, key=lambda row: row[0]):
+            for position, row in enumerate(quiz_rows):
+                questions[(quiz_ids[local_id], position)] = question_from_row(row[1:])
+    return questions
+
+# CPU-heavy parsing of uploaded files runs outside the request threads
+text_extractor = TextExtractor(UploadConfig.EXTRACT_WORKERS)
+atexit.register(text_extractor.close)
+
+# Concurrent first requests for the same explanation share one generation
+explanation_flight = SingleFlight()
+
+def explain_question(quiz_id, question_index):
+    """Stored explanation of a question, generating and saving it on first use.
+    
+    Returns {'explanation', 'generation_method'} ('Stored' when it already
+    existed) or None if the quiz or question does not exist.
+    """
+    location = storage.decode_id(quiz_id)
+    if location is None:
+        return None
+    shard, local_id = location
+    
+    conn = storage.connect(shard)
+    try:
+        found = load_question(conn, local_id, question_index)
+        if found is None:
+            return None
+        question_id, row, explanation = found
+        if explanation is not None:
+            return {'explanation': explanation, 'generation_method': 'Stored'}
+        
+        question = question_from_row(row)
+        context = supporting_sentence(load_quiz_notes(conn, local_id), question)
+        explanation, generation_method = explanation_flight.do(
+            (quiz_id, question_index), lambda: ai_generator.generate_explanation(question, context),
+            timeout=AIConfig.COALESCE_WAIT_TIMEOUT)
+        
+        # Overload fallbacks are served but not kept, so the AI can fill them in later
+        if generation_method != 'Degraded':
+            explanation = store_explanation(conn, question_id, explanation)
+            quiz_cache.invalidate(quiz_id)
+        return {'explanation': explanation, 'generation_method': generation_method}
+    finally:
+        conn.close()
+
+def fill_popular_explanations():
+    """Background loop: explain the most viewed quizzes before anyone asks"""
+    while True:
+        time.sleep(ExplanationConfig.BULK_FILL_INTERVAL)
+        filled = 0
+        try:
+            for quiz_id in quiz_cache.most_requested(ExplanationConfig.BULK_FILL_TOP_QUIZZES):
+                location = storage.decode_id(quiz_id)
+                if location is None:
+                    continue
+                conn = storage.connect(location[0])
+                try:
+                    positions = unexplained_positions(conn, location[1])
+                finally:
+                    conn.close()
+                for position in positions:
+                    # Only spend spare capacity
+                    if ai_generator.is_degraded() or not ai_generator.admission.has_capacity():
+                        break
+                    result = explain_question(quiz_id, position)
+                    if result and result['generation_method'] != 'Degraded':
+                        filled += 1
+        except Exception as e:
+            logger.warning("Explanation bulk fill error: %s", e)
+        if filled:
+            logger.info("Pre-generated %s explanations for popular quizzes", filled)
+
+def maybe_prefetch_other_type(notes, quiz_type, num_questions, client_ip):
+    """Speculatively generate the other quiz type if there is spare capacity"""
+    if not PrefetchConfig.ENABLED or not settings.HUGGING_FACE_API_KEY:
+        return
+    # Leave the client's remaining rate limit for real requests
+    recent = len(request_counts.get(client_ip, []))
+    if recent >= GENERATE_RATE_LIMIT * PrefetchConfig.RATE_LIMIT_HEADROOM:
+        return
+    prefetcher.schedule(notes, quiz_type, num_questions)
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def home():
     """Serve the main page"""
     return render_template('index.html')
 
-@app.route('/generate', methods=['POST'])
-@rate_limit(max_requests=10, window=60)  # Max 10 quiz generations per minute
+@bp.route('/generate', methods=['POST'])
+@rate_limit(max_requests=GENERATE_RATE_LIMIT, window=60)  # Max 10 quiz generations per minute
 def generate_quiz():
     """Generate quiz from notes using AI"""
+    return run_generation(request.get_json(silent=True))
+
+@bp.route('/notes/upload', methods=['POST'])
+@rate_limit(max_requests=GENERATE_RATE_LIMIT, window=60)
+def upload_notes():
+    """Generate a quiz from an uploaded notes file
+    
+    Multipart form: "file" (.txt, .md, .docx or .pdf) plus the optional
+    quiz_type, num_questions and force_new fields of /generate.
+    """
+    if request.content_length is None:
+        return jsonify({'success': False, 'error': 'Content-Length is required'}), 411
+    if request.content_length > UploadConfig.MAX_BYTES:
+        limit_mb = UploadConfig.MAX_BYTES // (1024 * 1024)
+        return jsonify({'success': False, 'error': f'File too large. Please upload at most {limit_mb} MB.'}), 413
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    extension = upload_extension(upload.filename)
+    if extension not in SUPPORTED_EXTENSIONS:
+        return jsonify({'success': False,
+                        'error': f'Unsupported file type. Upload one of: {", ".join(SUPPORTED_EXTENSIONS)}'}), 415
+    
     try:
-        data = request.get_json()
+        upload.stream.flush()
+        text = text_extractor.extract(upload.stream.name, extension, UploadConfig.MAX_EXTRACTED_CHARS,
+                                      UploadConfig.EXTRACT_TIMEOUT)
+    except UnsupportedFile as e:
+        return jsonify({'success': False, 'error': str(e)}), 415
+    except ExtractionTimeout:
+        logger.warning("Extraction of %s upload timed out", extension)
+        return jsonify({'success': False, 'error': 'This file took too long to read. Try a smaller file.'}), 422
+    except Exception as e:
+        logger.exception("Error extracting text from upload: %s", e)
+        return jsonify({'success': False, 'error': 'Could not read the uploaded file'}), 422
+    finally:
+        upload.close()
+    
+    notes, truncated = clip_text(text, UploadConfig.NOTES_CHARS)
+    return run_generation({
+        'notes': notes,
+        'quiz_type': request.form.get('quiz_type', 'mcq'),
+        'num_questions': request.form.get('num_questions', 5),
+        'force_new': request.form.get('force_new', '').lower() == 'true'
+    }, source={'filename': upload.filename, 'characters': len(notes), 'truncated': truncated})
+
+def run_generation(data, source=None):
+    """The /generate pipeline for a request body; source describes an uploaded file, if any"""
+    user_id = job = None
+    try:
+        user_id = current_user_id()
+        job, early_response = begin_generation(data, user_id, request.remote_addr, source)
+        if early_response:
+            payload, status = early_response
+            return jsonify(payload), status
         
-        if not data or 'notes' not in data:
-            return jsonify({'success': False, 'error': 'No notes provided'}), 400
+        cached = result_cache.get(job['cache_key'])
+        if cached:
+            result = (cached[0], None, (), None, cached[1])
+        else:
+            # Generate quiz using AI, reusing questions for unchanged sentences; identical
+            # requests in flight (e.g. a class opening shared notes) wait for one generation
+            result = generate_coalesced(job['notes'], job['quiz_type'], job['num_questions'], job['backend'])
         
-        # Sanitize input for security
-        notes = sanitize_input(data['notes'])
-        quiz_type = sanitize_input(data.get('quiz_type', 'mcq'))
-        num_questions = min(int(data.get('num_questions', 5)), 10)  # Limit to 10 questions
+        payload, status = finish_generation(job, result, bool(cached))
+        return jsonify(payload), status
+    except Exception as e:
+        payload, status, headers = generation_failure(e, user_id, request.remote_addr, credit_charged(job))
+        return jsonify(payload), status, headers
+
+def parse_generation_request(data):
+    """(notes, quiz_type, num_questions, backend) of a /generate body; ValueError describes what is wrong"""
+    if not data or 'notes' not in data:
+        raise ValueError('No notes provided')
+    
+    # The length limit applies to the notes as written (and as clipped for
+    # uploads): escaping below turns each quote into several characters
+    if len((data['notes'] or '').strip()) > 5000:
+        raise ValueError('Notes too long. Please limit to 5000 characters.')
+    
+    # Sanitize input for security
+    notes = sanitize_input(data['notes'])
+    quiz_type = sanitize_input(data.get('quiz_type', 'mcq'))
+    num_questions = min(int(data.get('num_questions', 5)), 10)  # Limit to 10 questions
+    
+    # Validate input length
+    if len(notes) < 30:
+        raise ValueError('Please provide more detailed notes (at least 30 characters)')
+    
+    # Validate quiz type
+    if quiz_type not in ['mcq', 'flashcard']:
+        raise ValueError('Invalid quiz type')
+    
+    # Optional generator backend, e.g. "hf:gpt2" or "fallback"; the configured chain otherwise
+    backend = data.get('backend') or None
+    if backend is not None and ai_generator.registry.get(backend) is None:
+        raise ValueError(f"Unknown generator backend. Available: {', '.join(ai_generator.registry.names())}")
+    
+    return notes, quiz_type, num_questions, backend
+
+def begin_generation(data, user_id, client_ip, source=None):
+    """Validate a /generate body, then reuse a near-duplicate quiz or charge a credit.
+    
+    Returns (job, None) when questions must be generated, or (None, (payload,
+    status)) when the request is already answered. Shared by the WSGI route
+    and the ASGI entry point (asgi.py), which only differ in how they wait.
+    """
+    notes, quiz_type, num_questions, backend = parse_generation_request(data)
+    
+    # Reuse a quiz generated from near-identical notes instead of paying for another generation
+    if not data.get('force_new'):
+        owner_id = None if UserConfig.PUBLIC_QUIZ_LINKS else user_id
+        duplicate = find_near_duplicate_quiz(notes, quiz_type, owner_id)
+        if duplicate:
+            existing_quiz_id, similarity, existing_questions = duplicate
+            near_duplicate = {'quiz_id': existing_quiz_id, 'similarity': round(similarity, 3)}
+            
+            if DedupConfig.NEAR_DUPLICATE_MODE == 'offer':
+                return None, ({
+                    'success': False,
+                    'error': 'A quiz already exists for very similar notes. Resend with force_new to generate a new one.',
+                    'near_duplicate': near_duplicate
+                }, 409)
+            
+            return None, ({
+                'success': True,
+                'questions': existing_questions[:num_questions],
+                'quiz_id': existing_quiz_id,
+                'message': f'Reused an existing {quiz_type} quiz generated from very similar notes.',
+                'generation_method': 'Reused',
+                'near_duplicate': near_duplicate,
+                'source': source
+            }, 200)
+    
+    credits_remaining = None
+    if UserConfig.ENFORCE_CREDITS:
+        allowed, credits_remaining = spend_credit(user_id, client_ip)
+        if not allowed:
+            return None, ({
+                'success': False,
+                'error': 'Daily quiz credits used up. Upgrade to premium or try again tomorrow.',
+                'credits_remaining': 0
+            }, 402)
+    
+    logger.info("Generating %s quiz with %s questions", quiz_type, num_questions,
+                extra={'quiz_type': quiz_type, 'num_questions': num_questions, 'notes_chars': len(notes),
+                       'user_id': user_id})
+    
+    return {
+        'notes': notes,
+        'quiz_type': quiz_type,
+        'num_questions': num_questions,
+        'user_id': user_id,
+        'client_ip': client_ip,
+        'backend': backend,
+        'credits_remaining': credits_remaining,
+        'source': source,
+        'cache_key': generation_key(notes, quiz_type, num_questions, backend)
+    }, None
+
+def finish_generation(job, result, cached):
+    """Cache and save a generated quiz; returns (payload, status).
+    
+    result is generate_incrementally()'s tuple, or (questions, None, (), None,
+    generation_method) for a result-cache hit.
+    """
+    questions, sentence_sources, processed_sentences, incremental, generation_method = result
+    notes, quiz_type, num_questions, user_id = job['notes'], job['quiz_type'], job['num_questions'], job['user_id']
+    
+    if not questions:
+        if UserConfig.ENFORCE_CREDITS:
+            give_back_credit(user_id, job['client_ip'])
+        return {'success': False, 'error': 'Failed to generate questions. Please try with different notes.'}, 500
+    
+    if not cached and generation_method != 'Degraded':
+        result_cache.put(job['cache_key'], questions, generation_method)
+    
+    if generation_method != 'AI':
+        # Template questions must not be reused as if the model had written them,
+        # and sentences they cover should go to the model next time
+        sentence_sources, processed_sentences = None, ()
+    
+    # Save to database
+    quiz_id = save_quiz_to_db(notes, questions, quiz_type, sentence_sources, processed_sentences,
+                              generation_method, user_id)
+    if quiz_id is not None:
+        # New quizzes are usually opened (or shared) right away
+        quiz_cache.put(quiz_id, serialize_quiz_response(questions), user_id)
+        if quiz_type == 'flashcard' and ReviewConfig.AUTO_ENROLL:
+            enroll_for_review(user_id, quiz_id, len(questions))
+    
+    maybe_prefetch_other_type(notes, quiz_type, num_questions, job['client_ip'])
+    
+    return {
+        'success': True,
+        'questions': questions,
+        'quiz_id': quiz_id,
+        'message': f'Successfully generated {len(questions)} {quiz_type} questions!',
+        'generation_method': generation_method,
+        'incremental': incremental,
+        'cached': cached,
+        'credits_remaining': job['credits_remaining'],
+        'source': job['source']
+    }, 200
+
+def credit_charged(job):
+    """Whether begin_generation() took a credit for job (None: it did not get that far)"""
+    return job is not None and job['credits_remaining'] is not None
+
+def generation_failure(error, user_id, client_ip, charged=False):
+    """(payload, status, headers) for an exception raised while generating.
+    
+    charged says a credit was taken for the request; it is given back
+    whatever the error, since no quiz was produced.
+    """
+    if charged:
+        give_back_credit(user_id, client_ip)
+    if isinstance(error, LookupError):
+        return {'success': False, 'error': 'Unknown user'}, 401, {}
+    if isinstance(error, ValueError):
+        return {'success': False, 'error': str(error)}, 400, {}
+    if isinstance(error, Overloaded):
+        return ({'success': False, 'error': 'The quiz generator is busy. Please retry shortly.',
+                 'retry_after': error.retry_after}, 503, {'Retry-After': str(error.retry_after)})
+    if isinstance(error, TimeoutError):
+        logger.warning("Generation wait timed out: %s", error)
+        return {'success': False, 'error': 'Quiz generation is taking too long. Please try again.'}, 504, {}
+    logger.error("Error in generate_quiz: %s", error, exc_info=error)
+    return {'success': False, 'error': 'Internal server error. Please try again.'}, 500, {}
+
+@bp.route('/quiz/<int:quiz_id>')
+def get_quiz(quiz_id):
+    """Retrieve a specific quiz by ID"""
+    try:
+        user_id = None if UserConfig.PUBLIC_QUIZ_LINKS else current_user_id()
+        
+        entry = quiz_cache.get_entry(quiz_id)
+        if entry is None:
+            location = storage.decode_id(quiz_id)
+            if location is None:
+                return jsonify({'success': False, 'error': 'Quiz not found'}), 404
+            shard, local_id = location
+            conn = storage.connect(shard)
+            cursor = conn.cursor()
+            
+            owner = cursor.execute("SELECT user_id FROM quizzes WHERE id = ?", (local_id,)).fetchone()
+            questions = load_quiz_questions(cursor, local_id)
+            conn.close()
+            
+            if owner is None or not questions:
+                return jsonify({'success': False, 'error': 'Quiz not found'}), 404
+            
+            entry = serialize_quiz_response(questions), owner[0]
+            quiz_cache.put(quiz_id, *entry)
+        
+        body, owner = entry
+        if user_id is not None and owner != user_id:
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        # Validate input length
-        if len(notes) < 30:
-            return jsonify({'success': False, 'error': 'Please provide more detailed notes (at least 30 characters)'}), 400
+        # Hits skip SQLite and JSON work entirely
+        return current_app.response_class(body, mimetype='application/json')
         
-        if len(notes) > 5000:
-            return jsonify({'success': False, 'error': 'Notes too long. Please limit to 5000 characters.'}), 400
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error retrieving quiz %s: %s", quiz_id, e)
+        return jsonify({'success': False, 'error': 'Failed to retrieve quiz'}), 500
+
+@bp.route('/quiz/<int:quiz_id>/grade', methods=['POST'])
+def grade_quiz(quiz_id):
+    """Grade one attempt ({"answers": [...]}) or many ({"submissions": [[...], ...]})
+    
+    answers[i] is the chosen option index (MCQ) or the typed answer
+    (flashcard) for question i; null or a missing entry counts as skipped.
+    """
+    try:
+        if not UserConfig.PUBLIC_QUIZ_LINKS and quiz_owner(quiz_id) != current_user_id():
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        # Validate quiz type
-        if quiz_type not in ['mcq', 'flashcard']:
-            return jsonify({'success': False, 'error': 'Invalid quiz type'}), 400
+        data = request.get_json(silent=True) or {}
+        single = 'submissions' not in data
+        submissions = [data.get('answers')] if single else data.get('submissions')
         
-        print(f"Generating {quiz_type} quiz with {num_questions} questions...")
+        if not isinstance(submissions, list) or not all(isinstance(answers, list) for answers in submissions):
+            return jsonify({'success': False, 'error': 'answers must be a list'}), 400
+        if len(submissions) > GradingConfig.MAX_SUBMISSIONS:
+            return jsonify({'success': False,
+                            'error': f'At most {GradingConfig.MAX_SUBMISSIONS} submissions per request'}), 400
         
-        # Generate quiz using AI
-        questions = ai_generator.generate_quiz(notes, quiz_type, num_questions)
+        key = load_answer_key(quiz_id)
+        if key is None:
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        if not questions:
-            return jsonify({'success': False, 'error': 'Failed to generate questions. Please try with different notes.'}), 500
+        results = [grade_attempt(key, answers, GradingConfig.MATCH_THRESHOLD) for answers in submissions]
+        if single:
+            return jsonify(dict(results[0], success=True, quiz_id=quiz_id))
+        return jsonify({'success': True, 'quiz_id': quiz_id, 'results': results})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error grading quiz %s: %s", quiz_id, e)
+        return jsonify({'success': False, 'error': 'Failed to grade quiz'}), 500
+
+@bp.route('/quiz/<int:quiz_id>/attempts', methods=['POST'])
+def record_attempt(quiz_id):
+    """Grade and record an attempt ({"answers": [...], "duration_ms": ...})
+    
+    The attempt is acknowledged once buffered; it reaches the database
+    within AttemptConfig.FLUSH_INTERVAL seconds.
+    """
+    try:
+        user_id = current_user_id()
+        if not UserConfig.PUBLIC_QUIZ_LINKS and quiz_owner(quiz_id) != user_id:
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        # Save to database
-        quiz_id = save_quiz_to_db(notes, questions, quiz_type)
+        data = request.get_json(silent=True) or {}
+        answers = data.get('answers')
+        duration_ms = data.get('duration_ms')
+        if not isinstance(answers, list):
+            return jsonify({'success': False, 'error': 'answers must be a list'}), 400
+        if duration_ms is not None and (not isinstance(duration_ms, int) or duration_ms < 0):
+            return jsonify({'success': False, 'error': 'duration_ms must be a non-negative integer'}), 400
         
-        return jsonify({
-            'success': True,
-            'questions': questions,
-            'quiz_id': quiz_id,
-            'message': f'Successfully generated {len(questions)} {quiz_type} questions!',
-            'generation_method': 'AI' if HUGGING_FACE_API_KEY else 'Fallback'
-        })
+        key = load_answer_key(quiz_id)
+        if key is None:
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
+        result = grade_attempt(key, answers, GradingConfig.MATCH_THRESHOLD)
+        shard, local_id = storage.decode_id(quiz_id)
+        submitted_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        attempt_buffer.add((shard, (local_id, user_id, submitted_at, duration_ms, result, answers[:len(key)])))
+        
+        return jsonify(dict(result, success=True, quiz_id=quiz_id, recorded=True)), 202
     except ValueError as e:
         return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        print(f"Error in generate_quiz: {e}")
-        return jsonify({'success': False, 'error': 'Internal server error. Please try again.'}), 500
+        logger.exception("Error recording attempt for quiz %s: %s", quiz_id, e)
+        return jsonify({'success': False, 'error': 'Failed to record attempt'}), 500
 
-@app.route('/quiz/<int:quiz_id>')
-def get_quiz(quiz_id):
-    """Retrieve a specific quiz by ID"""
+@bp.route('/quiz/<int:quiz_id>/attempts')
+def list_attempts(quiz_id):
+    """The requesting user's latest attempts at a quiz"""
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        user_id = current_user_id()
+        location = storage.decode_id(quiz_id)
+        if location is None:
+            return jsonify({'success': False, 'error': 'Quiz not found'}), 404
+        shard, local_id = location
         
-        cursor.execute('''
-            SELECT qu.question_text, qu.question_type, qu.options, qu.correct_answer
-            FROM questions qu
-            WHERE qu.quiz_id = ?
-            ORDER BY qu.id
-        ''', (quiz_id,))
+        # Read your own writes: anything still buffered goes to the database first
+        attempt_buffer.flush()
         
-        rows = cursor.fetchall()
-        conn.close()
+        conn = storage.connect(shard)
+        try:
+            attempts = recent_attempts(conn, local_id, user_id, AttemptConfig.HISTORY_LIMIT)
+        finally:
+            conn.close()
         
-        if not rows:
+        return jsonify({'success': True, 'quiz_id': quiz_id, 'attempts': attempts})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error listing attempts for quiz %s: %s", quiz_id, e)
+        return jsonify({'success': False, 'error': 'Failed to list attempts'}), 500
+
+@bp.route('/quiz/<int:quiz_id>/explain/<int:question_index>')
+def explain(quiz_id, question_index):
+    """Explanation of a question's answer, generated on first request and stored"""
+    try:
+        if not UserConfig.PUBLIC_QUIZ_LINKS and quiz_owner(quiz_id) != current_user_id():
             return jsonify({'success': False, 'error': 'Quiz not found'}), 404
         
-        questions = []
-        for row in rows:
-            question = {
-                'question': row[0],
-                'type': row[1]
-            }
-            
-            try:
-                if row[1] == 'mcq':
-                    question['options'] = json.loads(row[2]) if row[2] else []
-                    question['correct_answer'] = json.loads(row[3]) if row[3] else 0
-                else:
-                    question['answer'] = json.loads(row[3]) if row[3] else ''
-            except (json.JSONDecodeError, TypeError):
-                # Handle cases where data isn't properly JSON encoded
-                if row[1] == 'mcq':
-                    question['options'] = ['Option 1', 'Option 2', 'Option 3', 'Option 4']
-                    question['correct_answer'] = 0
-                else:
-                    question['answer'] = row[3] or 'No answer available'
-            
-            questions.append(question)
+        result = explain_question(quiz_id, question_index)
+        if result is None:
+            return jsonify({'success': False, 'error': 'Question not found'}), 404
+        
+        return jsonify(dict(result, success=True, quiz_id=quiz_id, question_index=question_index))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except TimeoutError:
+        return jsonify({'success': False, 'error': 'Explanation is taking too long. Please try again.'}), 504
+    except Exception as e:
+        logger.exception("Error explaining quiz %s question %s: %s", quiz_id, question_index, e)
+        return jsonify({'success': False, 'error': 'Failed to explain question'}), 500
+
+@bp.route('/review/next')
+def review_next():
+    """The requesting user's next due review cards (?limit=N), most overdue first"""
+    try:
+        user_id = current_user_id()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', ReviewConfig.DEFAULT_BATCH)), 1), ReviewConfig.MAX_BATCH)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    
+    try:
+        conn = storage.connect(HOME_SHARD)
+        try:
+            cards, has_more = due_cards(conn, user_id, datetime.utcnow(), limit)
+            questions = load_review_questions(cards)
+            # Cards of deleted quizzes would otherwise stay at the head of the queue
+            gone = [(card['quiz_id'], card['question_index']) for card in cards
+                    if (card['quiz_id'], card['question_index']) not in questions]
+            if gone:
+                drop_cards(conn, user_id, gone)
+        finally:
+            conn.close()
         
         return jsonify({
             'success': True,
-            'questions': questions
+            'cards': [dict(card, question=questions[(card['quiz_id'], card['question_index'])])
+                      for card in cards if (card['quiz_id'], card['question_index']) in questions],
+            'has_more': has_more
         })
+    except Exception as e:
+        logger.exception("Error loading review cards: %s", e)
+        return jsonify({'success': False, 'error': 'Failed to load review cards'}), 500
+
+@bp.route('/review/answer', methods=['POST'])
+def review_answer():
+    """Reschedule a card ({"quiz_id", "question_index", "quality": 0-5}, SM-2 grades)"""
+    try:
+        user_id = current_user_id()
+        data = request.get_json(silent=True) or {}
+        quiz_id, question_index, quality = data.get('quiz_id'), data.get('question_index'), data.get('quality')
+        for name, value in (('quiz_id', quiz_id), ('question_index', question_index), ('quality', quality)):
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                return jsonify({'success': False, 'error': f'{name} must be a non-negative integer'}), 400
+        if quality > 5:
+            return jsonify({'success': False, 'error': 'quality must be between 0 and 5'}), 400
+        
+        now = datetime.utcnow()
+        conn = storage.connect(HOME_SHARD)
+        try:
+            card = record_review(conn, user_id, quiz_id, question_index, quality, now)
+            if card is None:
+                # Not in the queue yet: any question the user can open joins it on first answer
+                key = load_answer_key(quiz_id)
+                if key is None or question_index >= len(key) or \
+                        (not UserConfig.PUBLIC_QUIZ_LINKS and quiz_owner(quiz_id) != user_id):
+                    return jsonify({'success': False, 'error': 'Card not found'}), 404
+                enroll_cards(conn, user_id, quiz_id, [question_index], now)
+                card = record_review(conn, user_id, quiz_id, question_index, quality, now)
+        finally:
+            conn.close()
         
+        return jsonify(dict(card, success=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        print(f"Error retrieving quiz: {e}")
-        return jsonify({'success': False, 'error': 'Failed to retrieve quiz'}), 500
+        logger.exception("Error recording review of quiz %s: %s", data.get('quiz_id'), e)
+        return jsonify({'success': False, 'error': 'Failed to record review'}), 500
 
-@app.route('/history')
+@bp.route('/history')
 def quiz_history():
-    """Get quiz history"""
+    """Get the requesting user's quiz history"""
     try:
-        history = get_quiz_history()
+        history = get_quiz_history(current_user_id())
         return jsonify({
             'success': True,
             'history': history
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        print(f"Error getting history: {e}")
+        logger.exception("Error getting history: %s", e)
         return jsonify({'success': False, 'error': 'Failed to get history'}), 500
 
-@app.route('/api/test')
+@bp.route('/credits')
+def credits():
+    """Plan and daily quiz credits of the requesting user"""
+    try:
+        user_id = current_user_id()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    conn = storage.connect(HOME_SHARD)
+    try:
+        if is_anonymous(user_id):
+            status = anonymous_credit_status(conn, request.remote_addr or '', PaymentConfig.QUIZ_CREDITS_FREE)
+        else:
+            status = credit_status(conn, user_id, PaymentConfig.QUIZ_CREDITS_FREE,
+                                   PaymentConfig.QUIZ_CREDITS_PREMIUM)
+    finally:
+        conn.close()
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown user'}), 401
+    return jsonify(dict(status, success=True, enforced=UserConfig.ENFORCE_CREDITS))
+
+@bp.route('/search')
+def search():
+    """Full-text search across notes and generated questions"""
+    query = request.args.get('q', '').strip()
+    if len(query) < SearchConfig.MIN_QUERY_LENGTH:
+        return jsonify({'success': False, 'error': 'Please provide a search query'}), 400
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = int(request.args.get('per_page', SearchConfig.DEFAULT_PAGE_SIZE))
+        per_page = min(max(per_page, 1), SearchConfig.MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid pagination parameters'}), 400
+    
+    try:
+        # Private links: other users' titles and snippets must not show up either
+        user_id = None if UserConfig.PUBLIC_QUIZ_LINKS else current_user_id()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        results, has_more = search_all_shards(query, limit=per_page, offset=(page - 1) * per_page, user_id=user_id)
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': results,
+            'page': page,
+            'per_page': per_page,
+            'has_more': has_more
+        })
+    except Exception as e:
+        logger.exception("Error searching quizzes: %s", e)
+        return jsonify({'success': False, 'error': 'Search failed'}), 500
+
+def search_all_shards(query, limit, offset, user_id=None):
+    """Search every shard (only user_id's quizzes if given) and merge by score; returns (results, has_more)"""
+    if not storage.sharded:
+        conn = storage.connect(HOME_SHARD)
+        try:
+            return search_quizzes(conn, query, limit=limit, offset=offset, user_id=user_id)
+        finally:
+            conn.close()
+    
+    # Any result on the requested page is within the top offset + limit of its own shard
+    def top(shard, conn):
+        results, has_more = search_quizzes(conn, query, limit=offset + limit, offset=0, user_id=user_id)
+        for result in results:
+            result['id'] = storage.encode_id(shard, result['id'])
+        return results, has_more
+    
+    pages = storage.fan_out(top)
+    merged = sorted((result for results, _ in pages for result in results),
+                    key=lambda result: result['score'], reverse=True)
+    has_more = len(merged) > offset + limit or any(more for _, more in pages)
+    return merged[offset:offset + limit], has_more
+
+@bp.route('/stats')
+def stats():
+    """Dashboard metrics from the analytics rollups (never scans quizzes)"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'success': False, 'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    
+    try:
+        now = datetime.utcnow()
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else now + timedelta(hours=1)
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start and end must be ISO dates (YYYY-MM-DD[THH:MM])'}), 400
+    if start >= end:
+        return jsonify({'success': False, 'error': 'start must be before end'}), 400
+    
+    try:
+        window = start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+        series = merge_series(storage.fan_out(lambda shard, conn: query_stats(conn, *window, granularity)))
+        
+        return jsonify({
+            'success': True,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'granularity': granularity,
+            'totals': summarize(series),
+            'series': series
+        })
+    except Exception as e:
+        logger.exception("Error computing stats: %s", e)
+        return jsonify({'success': False, 'error': 'Failed to compute stats'}), 500
+
+@bp.route('/export')
+def export_quiz_bank():
+    """Every note, quiz and question as NDJSON, streamed (database/quiz_bank.py imports it)"""
+    if not TransferConfig.EXPORT_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint not found'}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {TransferConfig.EXPORT_TOKEN}'):
+        return jsonify({'success': False, 'error': 'Export token required'}), 401
+
+    def records():
+        yield export_header()
+        # One shard after another, each read from its own snapshot
+        for shard in range(storage.count):
+            conn = storage.connect(shard)
+            try:
+                yield from export_records(conn, TransferConfig.FETCH_SIZE,
+                                          lambda local_id, shard=shard: storage.encode_id(shard, local_id))
+            finally:
+                conn.close()
+
+    logger.info("Quiz bank export started")
+    return current_app.response_class(
+        ndjson_chunks(records(), TransferConfig.CHUNK_BYTES),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=quiz-bank.ndjson'}
+    )
+
+# Further /metrics sections (name -> callable), e.g. the ASGI entry point's async generation path
+extra_metrics = {}
+
+@bp.route('/metrics')
+def metrics():
+    """Runtime counters for caches and background workers"""
+    return jsonify({
+        **{name: collect() for name, collect in extra_metrics.items()},
+        'success': True,
+        'quiz_cache': quiz_cache.stats(),
+        'result_cache': result_cache.stats(),
+        'answer_keys': answer_keys.stats(),
+        'attempt_buffer': attempt_buffer.stats(),
+        'text_extraction': text_extractor.stats(),
+        'prefetch': dict(prefetcher.stats(), enabled=PrefetchConfig.ENABLED),
+        'coalescing': generation_flight.stats(),
+        'admission': dict(ai_generator.admission.stats(), overload_mode=ai_generator.overload_mode),
+        'logging': logging_stats(),
+        'ai_backend': {
+            'in_flight': ai_generator.in_flight,
+            'degraded': ai_generator.is_degraded(),
+            'chain': [backend.name for backend in ai_generator.backend_chain()],
+            'backends': ai_generator.registry.stats()
+        }
+    })
+
+@bp.route('/api/test')
 def test_api():
     """Test API endpoint"""
     return jsonify({
         'success': True,
         'message': 'API is working!',
-        'ai_available': bool(HUGGING_FACE_API_KEY),
-        'database_path': DATABASE_PATH,
+        'ai_available': bool(settings.HUGGING_FACE_API_KEY),
+        'database_path': settings.DATABASE_PATH,
+        'database_shards': storage.count,
+        'json_backend': JSON_BACKEND,
         'timestamp': datetime.now().isoformat()
     })
 
-@app.route('/health')
+@bp.route('/health')
 def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        conn = sqlite3.connect(DATABASE_PATH)
+        conn = storage.connect(HOME_SHARD)
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
         table_count = cursor.fetchone()[0]
@@ -664,7 +1532,7 @@ def health_check():
             'status': 'healthy', 
             'timestamp': datetime.now().isoformat(),
             'database_tables': table_count,
-            'ai_configured': bool(HUGGING_FACE_API_KEY)
+            'ai_configured': bool(settings.HUGGING_FACE_API_KEY)
         })
     except Exception as e:
         return jsonify({
@@ -674,26 +1542,54 @@ def health_check():
         }), 500
 
 # Error handlers
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'success': False, 'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
-# Replace the final if __name__ == '__main__': section with:
+def create_app(config_class=None):
+    """Build the Flask app for a configuration class from config.py (get_config() by default).
+    
+    Only cheap wiring happens here. The AI generator and its HTTP session,
+    the shard query pool, upload extraction workers and background writers
+    are all started on first use.
+    """
+    global settings, storage
+    config_class = config_class or get_config()
+    if config_class is not settings:
+        settings = config_class
+        storage = ShardRouter(shard_paths(config_class.DATABASE_PATH, StorageConfig.SHARD_COUNT,
+                                          StorageConfig.SHARD_DIR))
+        lazy_ai_generator.reset()
+    
+    # Logging: request threads only enqueue records, a background thread writes them
+    setup_logging(LoggingConfig)
+    
+    app = Flask(__name__, 
+                template_folder='../frontend/templates',
+                static_folder='../frontend/static')
+    app.config.from_object(config_class)
+    app.json = FastJSONProvider(app)
+    app.request_class = UploadRequest
+    CORS(app)
+    app.register_blueprint(bp)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
-    print("🚀 Starting AI Quiz Generator...")
+    logger.info("🚀 Starting AI Quiz Generator...")
     init_database()
     
-    if HUGGING_FACE_API_KEY:
-        print("✅ AI features enabled")
+    if settings.HUGGING_FACE_API_KEY:
+        logger.info("✅ AI features enabled")
     else:
-        print("⚠️ Using fallback generation")
+        logger.warning("⚠️ Using fallback generation")
     
     # Production configuration
     port = int(os.environ.get('PORT', 5000))
-    debug = os.environ.get('FLASK_ENV') == 'development'
     
-    app.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,345 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as quiz_app
+from app import (ai_generator, allow_request, parse_user_id, begin_generation, finish_generation,
+                 generation_failure, credit_charged, give_back_credit, plan_incremental, finish_incremental, result_cache, request_id_from,
+                 init_database, logger, GENERATE_RATE_LIMIT)
+from config import AIConfig
+from utils.admission import AsyncAdmissionController, Overloaded
+from utils.async_http import AsyncHTTPClient, ASYNC_HTTP_BACKEND
+from utils.fast_json import dumps as fast_dumps, loads as fast_loads
+from utils.logging_setup import request_id_var
+from utils.single_flight import AsyncSingleFlight
+
+# ASGI entry point: uvicorn asgi:app (from backend/).
+#
+# POST /generate runs on the event loop. A request waiting on Hugging Face
+# holds a socket and a coroutine instead of a worker thread, so one process
+# keeps hundreds of generations in flight; database work (dedup lookup,
+# credits, saving) still runs in short thread-pool hops. Every other route
+# is passed to the Flask app through a small WSGI bridge, so there is one
+# implementation of each endpoint. app.py under a WSGI server is unchanged.
+
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+
+
+class AsyncQuizGenerator:
+    """generate_quiz_with_method() of an AIQuizGenerator, awaiting remote backends instead of blocking"""
+
+    def __init__(self, generator, admission, http):
+        self.generator = generator
+        self.admission = admission
+        self.http = http
+
+    async def generate_quiz_with_method(self, notes, quiz_type='mcq', num_questions=5, backend=None):
+        generator = self.generator
+        shed = False
+        for candidate in generator.backend_chain(backend):
+            if not candidate.remote:
+                questions = await asyncio.to_thread(generator.run_backend, candidate, notes, quiz_type, num_questions)
+            elif shed:
+                continue
+            elif not await self.admission.acquire():
+                if generator.overload_mode == 'reject':
+                    raise Overloaded(self.admission.retry_after())
+                logger.info("Async AI backend at capacity, serving fallback questions", extra={'sample': 'ai_shed'})
+                shed = True
+                continue
+            else:
+                started = time.monotonic()
+                # Shared with the sync path, so prefetch backs off while either is busy
+                with generator._state_lock:
+                    generator.in_flight += 1
+                try:
+                    questions = await self.run_remote(candidate, notes, quiz_type, num_questions)
+                finally:
+                    with generator._state_lock:
+                        generator.in_flight -= 1
+                    await self.admission.release(time.monotonic() - started)
+
+            if questions:
+                return questions, 'Degraded' if shed else candidate.label
+
+        return [], 'Fallback'
+
+    async def run_remote(self, backend, notes, quiz_type, num_questions):
+        """AIQuizGenerator.run_backend() for a Hugging Face backend, over the async client"""
+        started = time.monotonic()
+        questions = []
+        try:
+            status, result, retry_after, preview = await self.http.post_json(
+                backend.url, backend.headers, backend.payload(notes, quiz_type, num_questions))
+            questions = backend.questions_from_response(quiz_type, status, result, retry_after, preview)
+        except Exception as e:
+            logger.warning("Hugging Face API error (%s): %s", backend.model, e)
+            backend.record_result(False)
+        backend.stats.record(time.monotonic() - started, num_questions, len(questions))
+        return questions
+
+
+http_client = AsyncHTTPClient(AIConfig.ASYNC_MAX_IN_FLIGHT)
+async_generator = AsyncQuizGenerator(
+    ai_generator,
+    AsyncAdmissionController(AIConfig.ASYNC_MAX_IN_FLIGHT, AIConfig.ASYNC_MAX_QUEUE, AIConfig.QUEUE_TIMEOUT),
+    http_client
+)
+generation_flight = AsyncSingleFlight()
+# Flask handles every other route in these threads
+wsgi_threads = ThreadPoolExecutor(AIConfig.ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+
+quiz_app.extra_metrics['async_generation'] = lambda: {
+    'http_backend': ASYNC_HTTP_BACKEND,
+    'admission': async_generator.admission.stats(),
+    'coalescing': generation_flight.stats()
+}
+
+
+async def generate_incrementally_async(notes, quiz_type, num_questions, backend=None):
+    """app.generate_incrementally() with the generation awaited"""
+    plan = await asyncio.to_thread(plan_incremental, notes, quiz_type, num_questions)
+    generated, generation_method = [], 'Reused'
+    if plan['delta_notes'] is not None:
+        generated, generation_method = await async_generator.generate_quiz_with_method(
+            plan['delta_notes'], quiz_type, plan['needed'], backend)
+    return finish_incremental(plan, generated, generation_method)
+
+
+async def run_generation(data, user_id_header, signature_header, client_ip):
+    """app.run_generation() for the event loop; returns (payload, status, headers)"""
+    user_id = job = None
+    try:
+        user_id = parse_user_id(user_id_header, signature_header)
+        job, early_response = await asyncio.to_thread(begin_generation, data, user_id, client_ip)
+        if early_response:
+            return early_response + ({},)
+
+        cached = result_cache.get(job['cache_key'])
+        if cached:
+            result = (cached[0], None, (), None, cached[1])
+        else:
+            result = await generation_flight.do(
+                job['cache_key'],
+                lambda: generate_incrementally_async(job['notes'], job['quiz_type'], job['num_questions'],
+                                                     job['backend']),
+                timeout=AIConfig.COALESCE_WAIT_TIMEOUT)
+
+        payload, status = await asyncio.to_thread(finish_generation, job, result, bool(cached))
+        return payload, status, {}
+    except asyncio.CancelledError:
+        # The client went away; the refund must not wait on (or be cancelled with) this task
+        if credit_charged(job):
+            asyncio.get_running_loop().run_in_executor(None, give_back_credit, user_id, client_ip)
+        raise
+    except Exception as e:
+        return await asyncio.to_thread(generation_failure, e, user_id, client_ip, credit_charged(job))
+
+
+def header_map(scope):
+    headers = {}
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        headers[name] = headers[name] + ',' + value if name in headers else value
+    return headers
+
+
+async def read_body(receive, body):
+    """Copy the request body into the writable file body"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body
+
+
+async def send_response(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def handle_generate(scope, receive, send):
+    headers = header_map(scope)
+    client_ip = scope['client'][0] if scope.get('client') else None
+    request_id = request_id_from(headers.get('x-request-id', ''))
+    token = request_id_var.set(request_id)
+    try:
+        if not allow_request(client_ip, GENERATE_RATE_LIMIT, 60):
+            payload, status, extra = {'success': False, 'error': 'Rate limit exceeded. Please wait a minute.'}, 429, {}
+        else:
+            with tempfile.SpooledTemporaryFile(UPLOAD_SPOOL_BYTES) as body:
+                raw = (await read_body(receive, body)).read()
+            # Same as request.get_json(silent=True)
+            data = None
+            mimetype = headers.get('content-type', '').split(';')[0].strip()
+            if mimetype == 'application/json' or mimetype.endswith('+json'):
+                try:
+                    data = fast_loads(raw)
+                except ValueError:
+                    data = None
+            payload, status, extra = await run_generation(data, headers.get('x-user-id', ''),
+                                                           headers.get('x-user-signature', ''), client_ip)
+
+        response_headers = [('Content-Type', 'application/json'), ('X-Request-ID', request_id),
+                            ('X-Content-Type-Options', 'nosniff'), ('X-Frame-Options', 'DENY'),
+                            ('X-XSS-Protection', '1; mode=block')]
+        if headers.get('origin') in quiz_app.settings.CORS_ORIGINS:
+            # What flask_cors adds for the same origins on every other route
+            response_headers += [('Access-Control-Allow-Origin', headers['origin']), ('Vary', 'Origin')]
+        response_headers += list(extra.items())
+        await send_response(send, status, response_headers, fast_dumps(payload, sort_keys=True) + b'\n')
+    finally:
+        request_id_var.reset(token)
+
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in header_map(scope).items():
+        key = name.upper().replace('-', '_')
+        environ[key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + key] = value
+    return environ
+
+
+class ClientGone(Exception):
+    """The ASGI side stopped reading a WSGI response"""
+
+
+def run_wsgi(environ, loop, queue, closed):
+    """Run the Flask app for one request in this thread, handing the response to the event loop.
+
+    Puts ('start', status code, headers), then body chunks, then None; a
+    body is never held whole, so streamed responses (e.g. /export) keep a
+    few chunks in memory. The whole iteration stays in this one thread,
+    which owns any SQLite connection a streaming body holds.
+    """
+    started = {}
+
+    def put(item):
+        if closed.is_set():
+            raise ClientGone()
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def send_start():
+        if not started.get('sent'):
+            started['sent'] = True
+            put(('start', int(started['status'].split(' ', 1)[0]), started['headers']))
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+        return lambda data: (send_start(), put(data))
+
+    try:
+        result = quiz_app.app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    send_start()
+                    put(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        send_start()
+        put(None)
+    except ClientGone:
+        pass
+
+
+async def handle_wsgi(scope, receive, send):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=8)
+    closed = threading.Event()
+    with tempfile.SpooledTemporaryFile(UPLOAD_SPOOL_BYTES) as body:
+        environ = wsgi_environ(scope, await read_body(receive, body))
+        worker = loop.run_in_executor(wsgi_threads, run_wsgi, environ, loop, queue, closed)
+        try:
+            while True:
+                if worker.done():
+                    # Everything it put is already queued
+                    if queue.empty():
+                        worker.result()  # raises what the app raised
+                        raise RuntimeError("WSGI app returned without a response")
+                    item = queue.get_nowait()
+                else:
+                    getter = asyncio.ensure_future(queue.get())
+                    await asyncio.wait((getter, worker), return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    item = getter.result()
+                if item is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                if isinstance(item, tuple):
+                    _, status, headers = item
+                    await send({'type': 'http.response.start', 'status': status,
+                                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                            for name, value in headers]})
+                else:
+                    await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+        finally:
+            # Unblock and stop the worker if the client went away mid-stream
+            closed.set()
+            while not worker.done():
+                while not queue.empty():
+                    queue.get_nowait()
+                await asyncio.sleep(0.01)
+            await worker
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.to_thread(init_database)
+            logger.info("ASGI entry point started (HTTP backend: %s)", ASYNC_HTTP_BACKEND)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await http_client.close()
+            wsgi_threads.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+    elif scope['method'] == 'POST' and scope['path'] == '/generate':
+        await handle_generate(scope, receive, send)
+    else:
+        await handle_wsgi(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn  # optional dependency, only needed to serve this module directly
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
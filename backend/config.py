@@ -1,5 +1,6 @@
  
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -62,7 +63,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
-    DATABASE_PATH = ':memory:'  # Use in-memory database for tests
+    # Every database access opens its own connection, so ':memory:' would start empty each time
+    DATABASE_PATH = os.path.join(tempfile.gettempdir(), 'quiz_app_test.db')
 
 # Configuration dictionary
 config = {
@@ -105,6 +107,34 @@ class AIConfig:
         "return_full_text": False
     }
     
+    # Admission control for Hugging Face calls: concurrent calls, waiting requests
+    # and how long one may wait. Shed requests get fallback questions ('fallback',
+    # reported as generation_method 'Degraded') or a 503 with Retry-After ('reject')
+    MAX_IN_FLIGHT = int(os.getenv('AI_MAX_IN_FLIGHT', '8'))
+    MAX_QUEUE = int(os.getenv('AI_MAX_QUEUE', '16'))
+    QUEUE_TIMEOUT = float(os.getenv('AI_QUEUE_TIMEOUT', '10'))
+    OVERLOAD_MODE = os.getenv('AI_OVERLOAD_MODE', 'fallback').lower()
+    
+    # Longest a request waits on an identical generation already in flight
+    COALESCE_WAIT_TIMEOUT = float(os.getenv('COALESCE_WAIT_TIMEOUT', '75'))
+    
+    # Generator backends (utils/generator_backends.py): Hugging Face models to register and
+    # the chain tried when a request names no backend ("cache", "stub" and "fallback" always exist)
+    HF_MODELS = [model.strip() for model in os.getenv('HF_MODELS', 'gpt2').split(',') if model.strip()]
+    GENERATOR_BACKENDS = [name.strip() for name in os.getenv('GENERATOR_BACKENDS', 'hf:gpt2,fallback').split(',')
+                          if name.strip()]
+    # Try the chain fastest-first by observed time per successful call, once a backend has this many calls
+    BACKEND_AUTO_ORDER = os.getenv('GENERATOR_AUTO_ORDER', 'true').lower() == 'true'
+    BACKEND_MIN_SAMPLES = int(os.getenv('GENERATOR_MIN_SAMPLES', '20'))
+    # Simulated upstream latency of the stub backend (load tests)
+    STUB_LATENCY = float(os.getenv('STUB_BACKEND_LATENCY', '0'))
+    
+    # Event-loop generation path (asgi.py): pending calls hold no thread, so the cap is much higher
+    ASYNC_MAX_IN_FLIGHT = int(os.getenv('AI_ASYNC_MAX_IN_FLIGHT', '256'))
+    ASYNC_MAX_QUEUE = int(os.getenv('AI_ASYNC_MAX_QUEUE', '1024'))
+    # Threads running the Flask app for every other route under ASGI
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '16'))
+    
     # Fallback generation settings
     FALLBACK_ENABLED = True
     MIN_WORDS_PER_SENTENCE = 4
@@ -127,13 +157,152 @@ class PaymentConfig:
     QUIZ_CREDITS_FREE = 5
     QUIZ_CREDITS_PREMIUM = 50
 
+# Users and Quotas Configuration
+class UserConfig:
+    """Request identity and per-user limits"""
+    
+    # Requests without an X-User-ID header act as the demo user.
+    # X-User-ID is an identity claim: without USER_ID_SECRET it is trusted as
+    # sent, so it must come from a proxy that authenticates users and drops
+    # any copy sent by the client. With USER_ID_SECRET set, the header must
+    # be accompanied by X-User-Signature, the hex HMAC-SHA256 of the id under
+    # that secret (issued to the client at login), and unsigned ids are refused.
+    DEFAULT_USER_ID = int(os.getenv('DEFAULT_USER_ID', 1))
+    USER_ID_SECRET = os.getenv('USER_ID_SECRET') or None
+    # Daily credits per plan (PaymentConfig.QUIZ_CREDITS_*) are enforced on /generate;
+    # anonymous requests spend the free plan's credits of their client address
+    ENFORCE_CREDITS = os.getenv('ENFORCE_CREDITS', 'true').lower() == 'true'
+    # When true anyone with a quiz id can open it; otherwise only its owner
+    PUBLIC_QUIZ_LINKS = os.getenv('PUBLIC_QUIZ_LINKS', 'true').lower() == 'true'
+
+# Storage Configuration
+class StorageConfig:
+    """SQLite layout: one file, or notes-hash shards to spread writers"""
+    
+    # 1 keeps everything in DATABASE_PATH; more spreads writes over N files
+    # (create them from an existing database with database/reshard.py)
+    SHARD_COUNT = int(os.getenv('SHARD_COUNT', 1))
+    SHARD_DIR = os.getenv('SHARD_DIR', os.path.join(os.path.dirname(__file__), '..', 'database', 'shards'))
+
+# Near-duplicate Notes Configuration
+class DedupConfig:
+    """Reuse of quizzes generated from near-identical notes"""
+    
+    # 'serve' returns the existing quiz, 'offer' answers 409 with a pointer to it
+    # (clients resend with force_new=true to regenerate), 'off' disables lookups
+    NEAR_DUPLICATE_MODE = os.getenv('NEAR_DUPLICATE_MODE', 'serve').lower()
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.8'))
+
+# Result Cache and Speculative Prefetch Configuration
+class PrefetchConfig:
+    """Generate the other quiz type in the background after /generate (opt-in)"""
+    
+    ENABLED = os.getenv('PREFETCH_ENABLED', 'false').lower() == 'true'
+    BUDGET_PER_MINUTE = int(os.getenv('PREFETCH_BUDGET_PER_MINUTE', '20'))  # global, all users
+    MAX_PENDING = 50
+    # Skip prefetch once a client has used this share of its /generate rate limit
+    RATE_LIMIT_HEADROOM = 0.8
+    
+    RESULT_CACHE_ENTRIES = 500
+    RESULT_CACHE_TTL = 900  # seconds
+
+# Note Storage Configuration
+class NoteStorageConfig:
+    """Content-addressed note bodies"""
+    
+    COMPRESSION = os.getenv('NOTE_COMPRESSION', 'zlib')  # 'zlib' or 'zstd' (needs zstandard)
+    COMPRESS_MIN_BYTES = 1024  # smaller bodies are stored as plain text
+    COMPACTION_BATCH_SIZE = 500
+    VACUUM_PAGES_PER_STEP = 200
+
+# Response Cache Configuration
+class CacheConfig:
+    """In-process cache of serialized /quiz/<id> responses"""
+    
+    QUIZ_CACHE_MAX_BYTES = int(os.getenv('QUIZ_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Grading Configuration
+class GradingConfig:
+    """Server-side scoring of quiz attempts"""
+    
+    # Free-text answers scoring at least this similarity (0-1) count as correct
+    MATCH_THRESHOLD = float(os.getenv('GRADING_MATCH_THRESHOLD', '0.75'))
+    ANSWER_KEY_CACHE_ENTRIES = int(os.getenv('ANSWER_KEY_CACHE_ENTRIES', '1000'))
+    MAX_SUBMISSIONS = 500  # attempts per /grade request
+
+# Upload Configuration
+class UploadConfig:
+    """Notes file uploads (/notes/upload)"""
+    
+    MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+    EXTRACT_TIMEOUT = float(os.getenv('UPLOAD_EXTRACT_TIMEOUT', '20'))  # seconds per file
+    EXTRACT_WORKERS = int(os.getenv('UPLOAD_EXTRACT_WORKERS', '2'))  # processes
+    TEMP_DIR = os.getenv('UPLOAD_TEMP_DIR') or None  # system temp dir by default
+    # Generation takes at most 5000 characters; read a little more to cut at a sentence
+    NOTES_CHARS = 5000
+    MAX_EXTRACTED_CHARS = 6000
+
+# Attempt Recording Configuration
+class AttemptConfig:
+    """Write-behind buffering of recorded quiz attempts"""
+    
+    # Longest an acknowledged attempt waits in memory, i.e. the most a crash can lose; 0 writes through
+    FLUSH_INTERVAL = float(os.getenv('ATTEMPT_FLUSH_INTERVAL', '2'))  # seconds
+    FLUSH_BATCH_SIZE = int(os.getenv('ATTEMPT_FLUSH_BATCH_SIZE', '200'))
+    MAX_PENDING = 10000  # beyond this, submissions flush inline
+    HISTORY_LIMIT = 20
+
+# Spaced Repetition Configuration
+class ReviewConfig:
+    """SM-2 review queue of flashcards (/review/next, /review/answer)"""
+
+    # New flashcard quizzes join their creator's queue; other questions join on first answer
+    AUTO_ENROLL = os.getenv('REVIEW_AUTO_ENROLL', 'true').lower() == 'true'
+    DEFAULT_BATCH = 10
+    MAX_BATCH = 50
+
+# Explanation Configuration
+class ExplanationConfig:
+    """Lazily generated answer explanations"""
+    
+    # Optionally explain the most viewed quizzes ahead of time, using only spare AI capacity
+    BULK_FILL_ENABLED = os.getenv('EXPLANATION_BULK_FILL', 'false').lower() == 'true'
+    BULK_FILL_INTERVAL = int(os.getenv('EXPLANATION_BULK_FILL_INTERVAL', '300'))  # seconds
+    BULK_FILL_TOP_QUIZZES = int(os.getenv('EXPLANATION_BULK_FILL_TOP_QUIZZES', '20'))
+
+# Search Configuration
+class SearchConfig:
+    """Full-text search configuration"""
+    
+    DEFAULT_PAGE_SIZE = 10
+    MAX_PAGE_SIZE = 50
+    MIN_QUERY_LENGTH = 2
+    BACKFILL_BATCH_SIZE = 5000  # rows indexed per transaction for existing databases
+
+# Export / Import Configuration
+class TransferConfig:
+    """NDJSON quiz bank export (/export) and import (database/quiz_bank.py)"""
+
+    # /export streams every user's notes, so it needs this bearer token; unset disables it
+    EXPORT_TOKEN = os.getenv('EXPORT_TOKEN', '')
+    FETCH_SIZE = 1000  # rows read from SQLite per round trip
+    CHUNK_BYTES = 64 * 1024  # NDJSON bytes per response chunk
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 5000))  # records per import transaction
+
 # Logging Configuration
 class LoggingConfig:
     """Logging configuration"""
     
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
     LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
+    LOG_JSON = os.getenv('LOG_JSON', 'true').lower() == 'true'  # one JSON object per line
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # records beyond this are dropped
+    # Sampled messages (e.g. per-block parse errors): at most BURST per key per WINDOW seconds
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 5))
+    LOG_SAMPLE_WINDOW = float(os.getenv('LOG_SAMPLE_WINDOW', 60))
 
 # Usage example:
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['HUGGING_FACE_API_KEY'] = ''
+
+import app as quiz_app  # noqa: E402
+from config import TestingConfig  # noqa: E402
+from utils.grading import AnswerKeyCache  # noqa: E402
+from utils.response_cache import ResponseBytesCache  # noqa: E402
+
+NOTES = ("Photosynthesis converts light energy into chemical energy inside the chloroplast. "
+         "The light reactions split water molecules and release oxygen as a by-product. "
+         "The Calvin cycle fixes carbon dioxide into three-carbon sugars using ATP and NADPH. "
+         "Chlorophyll absorbs mostly red and blue light and reflects green light. ")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a freshly migrated database of its own"""
+    class Config(TestingConfig):
+        DATABASE_PATH = str(tmp_path / 'quiz_app.db')
+
+    application = quiz_app.create_app(Config)
+    quiz_app.init_database()
+    quiz_app.request_counts.clear()
+    # Quiz ids restart with every database
+    monkeypatch.setattr(quiz_app, 'quiz_cache', ResponseBytesCache())
+    monkeypatch.setattr(quiz_app, 'answer_keys', AnswerKeyCache())
+    return application
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_user():
+    def add(user_id):
+        conn = quiz_app.storage.connect(0)
+        try:
+            conn.execute("INSERT INTO users (id, username, email) VALUES (?, ?, ?)",
+                         (user_id, f'user{user_id}', f'user{user_id}@example.com'))
+            conn.commit()
+        finally:
+            conn.close()
+    return add
+
+
+def generate(client, notes=NOTES, user_id=None, **fields):
+    headers = {'X-User-ID': str(user_id)} if user_id is not None else {}
+    body = dict({'notes': notes, 'quiz_type': 'mcq', 'num_questions': 3, 'force_new': True}, **fields)
+    return client.post('/generate', json=body, headers=headers)
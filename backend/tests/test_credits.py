@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import hmac
+
+import pytest
+
+import app as quiz_app
+from config import PaymentConfig, UserConfig
+from utils.quotas import anonymous_credit_status
+
+from conftest import generate
+
+
+def signed(user_id, secret):
+    return hmac.new(secret.encode('utf-8'), str(user_id).encode('ascii'), hashlib.sha256).hexdigest()
+
+
+def test_anonymous_generation_spends_the_client_addresses_credits(client, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'ENFORCE_CREDITS', True)
+
+    for used in range(1, PaymentConfig.QUIZ_CREDITS_FREE + 1):
+        response = generate(client)
+        assert response.status_code == 200
+        assert response.get_json()['credits_remaining'] == PaymentConfig.QUIZ_CREDITS_FREE - used
+
+    assert generate(client).status_code == 402
+    status = client.get('/credits').get_json()
+    assert status['plan'] == 'anonymous' and status['remaining'] == 0
+
+    # Another client address has its own allowance
+    other = client.post('/generate', json={'notes': 'x' * 40 + ' notes about osmosis in plant cells.',
+                                            'force_new': True}, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 200
+
+
+def test_identified_user_runs_out_of_credits(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'ENFORCE_CREDITS', True)
+    add_user(2)
+
+    for used in range(1, PaymentConfig.QUIZ_CREDITS_FREE + 1):
+        response = generate(client, user_id=2)
+        assert response.status_code == 200
+        assert response.get_json()['credits_remaining'] == PaymentConfig.QUIZ_CREDITS_FREE - used
+
+    response = generate(client, user_id=2)
+    assert response.status_code == 402
+    # Anonymous traffic is unaffected by another user's quota
+    assert generate(client).status_code == 200
+
+
+def test_unsigned_user_id_is_refused_when_ids_are_signed(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'ENFORCE_CREDITS', True)
+    monkeypatch.setattr(UserConfig, 'USER_ID_SECRET', 'test-secret')
+    add_user(2)
+
+    spoofed = generate(client, user_id=2)
+    assert spoofed.status_code == 400
+    forged = client.get('/credits', headers={'X-User-ID': '2', 'X-User-Signature': signed(2, 'other-secret')})
+    assert forged.status_code == 400
+
+    headers = {'X-User-ID': '2', 'X-User-Signature': signed(2, 'test-secret')}
+    assert client.get('/credits', headers=headers).get_json()['used'] == 0
+    response = client.post('/generate', json={'notes': 'Osmosis moves water across membranes toward solutes.',
+                                              'force_new': True}, headers=headers)
+    assert response.status_code == 200
+    assert client.get('/credits', headers=headers).get_json()['used'] == 1
+
+
+def test_credit_is_refunded_when_generation_fails(client, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'ENFORCE_CREDITS', True)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError('generator crashed')
+
+    monkeypatch.setattr(quiz_app, 'generate_coalesced', broken)
+    assert generate(client).status_code == 500
+    assert client.get('/credits').get_json()['used'] == 0
+
+
+def test_credit_is_refunded_when_the_asgi_client_goes_away(app, monkeypatch):
+    asgi = pytest.importorskip('asgi')
+    monkeypatch.setattr(UserConfig, 'ENFORCE_CREDITS', True)
+    started = []
+
+    async def hang(*args, **kwargs):
+        started.append(True)
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(asgi, 'generate_incrementally_async', hang)
+
+    async def scenario():
+        task = asyncio.create_task(asgi.run_generation(
+            {'notes': 'Osmosis moves water across membranes toward solutes.', 'force_new': True},
+            '', '', '10.0.0.3'))
+        while not started:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.2)  # the refund runs in the default executor
+
+    asyncio.run(scenario())
+    conn = quiz_app.storage.connect(0)
+    try:
+        assert anonymous_credit_status(conn, '10.0.0.3', PaymentConfig.QUIZ_CREDITS_FREE)['used'] == 0
+    finally:
+        conn.close()
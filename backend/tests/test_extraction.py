@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils.extraction import ExtractionTimeout, TextExtractor
+
+
+@pytest.fixture
+def extractor():
+    extractor = TextExtractor(workers=2)
+    yield extractor
+    extractor.close()
+
+
+def test_timeout_kills_only_the_runaway_extraction(extractor, tmp_path):
+    # Reading a FIFO blocks until something writes to it: a parser that never finishes
+    stuck, slow = str(tmp_path / 'stuck.txt'), str(tmp_path / 'slow.txt')
+    os.mkfifo(stuck)
+    os.mkfifo(slow)
+    outcomes = {}
+
+    def extract(name, path, timeout):
+        try:
+            outcomes[name] = extractor.extract(path, '.txt', 100, timeout)
+        except Exception as e:
+            outcomes[name] = e
+
+    runaway = threading.Thread(target=extract, args=('stuck', stuck, 1))
+    healthy = threading.Thread(target=extract, args=('slow', slow, 30))
+    runaway.start()
+    healthy.start()
+
+    runaway.join()
+    assert isinstance(outcomes['stuck'], ExtractionTimeout)
+    # The healthy extraction was in flight when the runaway one was killed
+    started = time.monotonic()
+    # Non-blocking: fails (ENXIO) instead of waiting if the reader was killed too
+    with os.fdopen(os.open(slow, os.O_WRONLY | os.O_NONBLOCK), 'w') as handle:
+        handle.write('Chlorophyll absorbs red and blue light.')
+    healthy.join()
+    assert outcomes['slow'] == 'Chlorophyll absorbs red and blue light.'
+    assert time.monotonic() - started < 10
+
+    plain = tmp_path / 'plain.txt'
+    plain.write_text('Stomata regulate gas exchange.')
+    assert extractor.extract(str(plain), '.txt', 100, 30) == 'Stomata regulate gas exchange.'
+    assert extractor.stats()['timed_out'] == 1 and extractor.stats()['extracted'] == 2
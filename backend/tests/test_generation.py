@@ -0,0 +1,28 @@
+import app as quiz_app
+from utils.generator_backends import fallback_quiz
+
+from conftest import NOTES, generate
+
+
+def indexed_sentences():
+    conn = quiz_app.storage.connect(0)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sentence_index").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_fallback_questions_are_not_indexed_for_reuse(client):
+    response = generate(client)
+    assert response.get_json()['generation_method'] == 'Fallback'
+    assert indexed_sentences() == 0
+
+
+def test_ai_questions_are_indexed_for_reuse(client, monkeypatch):
+    def generate_quiz_with_method(self, notes, quiz_type='mcq', num_questions=5, backend=None):
+        return fallback_quiz(notes, quiz_type, num_questions), 'AI'
+
+    monkeypatch.setattr(quiz_app.AIQuizGenerator, 'generate_quiz_with_method', generate_quiz_with_method)
+    response = generate(client, notes=NOTES + " Stomata on the leaf surface regulate gas exchange.")
+    assert response.get_json()['generation_method'] == 'AI'
+    assert indexed_sentences() > 0
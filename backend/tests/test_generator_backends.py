@@ -0,0 +1,44 @@
+import pytest
+
+import app as quiz_app
+from utils.generator_backends import GeneratorBackend, HuggingFaceBackend
+from utils.questions import Flashcard
+
+
+class Reply:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return [{'generated_text': 'Chlorophyll absorbs red and blue light, so green light is reflected.'}]
+
+
+class RecordingSession:
+    def __init__(self):
+        self.bodies = []
+
+    def post(self, url, json=None, **kwargs):
+        self.bodies.append(json)
+        return Reply()
+
+
+def test_backends_must_implement_generate():
+    class Incomplete(GeneratorBackend):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize('model, full_text_flag', [('gpt2', True), ('google/flan-t5-base', False)])
+def test_explanation_uses_the_models_parameters(app, monkeypatch, model, full_text_flag):
+    session = RecordingSession()
+    monkeypatch.setattr(quiz_app.AIQuizGenerator, '_http', lambda self: session)
+    backend = HuggingFaceBackend(model, 'key', lambda: session)
+    question = Flashcard('Why are leaves green?', 'Chlorophyll reflects green light.')
+
+    explanation = quiz_app.ai_generator._generate_explanation_with_ai(backend, question, 'Chlorophyll.')
+
+    assert explanation.startswith('Chlorophyll absorbs')
+    assert ('return_full_text' in session.bodies[0]['parameters']) is full_text_flag
+    assert session.bodies[0]['parameters']['max_new_tokens'] == 120
@@ -0,0 +1,40 @@
+import sqlite3
+
+from utils.migrations import migrate
+from utils.note_store import compact_notes
+from utils.search import backfill_search_index, index_note, search_quizzes
+
+NOTE = "The mitochondrion releases chemical energy from glucose during cellular respiration."
+
+
+def add_note(conn, text, indexed):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO notes (user_id, content, title, content_hash, size) VALUES (1, ?, 'Cells', 'h', ?)",
+                   (text, len(text)))
+    notes_id = cursor.lastrowid
+    if indexed:
+        index_note(cursor, notes_id, 'Cells', text)
+    cursor.execute("INSERT INTO quizzes (notes_id, quiz_type) VALUES (?, 'mcq')", (notes_id,))
+    return notes_id
+
+
+def test_compaction_skips_notes_the_backfill_has_not_indexed(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'quiz_app.db'))
+    migrate(conn)
+    # Two copies stored before full-text search existed: still waiting for the backfill
+    add_note(conn, NOTE, indexed=False)
+    add_note(conn, NOTE, indexed=False)
+    conn.execute("UPDATE search_backfill SET next_rowid = 0, end_rowid = 2 WHERE source = 'notes'")
+    # and one stored since, indexed on insert
+    add_note(conn, NOTE, indexed=True)
+    conn.commit()
+
+    totals = compact_notes(conn, pause=0)
+    assert totals['duplicates_removed'] == 2
+
+    conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('integrity-check')")
+    backfill_search_index(conn)
+    conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('integrity-check')")
+    results, _ = search_quizzes(conn, 'mitochondrion')
+    assert len(results) == 3
+    conn.close()
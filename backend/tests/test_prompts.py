@@ -0,0 +1,25 @@
+import pytest
+
+from utils.generator_backends import MODEL_PARAMETERS
+from utils.prompts import PromptBuilder, estimate_tokens
+
+NOTES = ' '.join(f"Step {i} of the Calvin cycle fixes carbon dioxide into three-carbon sugars." for i in range(120))
+
+
+@pytest.mark.parametrize('model, lead_in', [('gpt2', 'QUESTION:'), ('google/flan-t5-base', None)])
+def test_prompt_style_follows_the_model(model, lead_in):
+    builder = PromptBuilder(model, MODEL_PARAMETERS.get(model, MODEL_PARAMETERS['default']))
+    prompt = builder.build('Chlorophyll absorbs red and blue light.', 'mcq', 3)
+    if lead_in:
+        assert prompt.endswith(lead_in)
+    else:
+        assert prompt.startswith('Write 3 multiple choice questions')
+        assert prompt.endswith('Chlorophyll absorbs red and blue light.')
+
+
+@pytest.mark.parametrize('model, window', [('gpt2', 1024 - 600), ('google/flan-t5-base', 512)])
+def test_long_notes_are_fitted_into_the_window(model, window):
+    builder = PromptBuilder(model, MODEL_PARAMETERS.get(model, MODEL_PARAMETERS['default']))
+    prompt = builder.build(NOTES, 'mcq', 5)
+    assert estimate_tokens(prompt) <= window
+    assert builder.stats()['compressed'] == 1
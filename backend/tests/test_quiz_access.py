@@ -0,0 +1,30 @@
+import app as quiz_app
+from config import UserConfig
+
+from conftest import generate
+
+
+def test_private_quiz_is_served_to_its_owner_from_the_cache(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'PUBLIC_QUIZ_LINKS', False)
+    add_user(2)
+    quiz_id = generate(client, user_id=2).get_json()['quiz_id']
+
+    def no_database(shard):
+        raise AssertionError('cached quiz read from SQLite')
+
+    monkeypatch.setattr(quiz_app.storage, 'connect', no_database)
+    assert client.get(f'/quiz/{quiz_id}', headers={'X-User-ID': '2'}).status_code == 200
+    assert client.get(f'/quiz/{quiz_id}').status_code == 404
+    grade = client.post(f'/quiz/{quiz_id}/grade', json={'answers': []})
+    assert grade.status_code == 404
+
+
+def test_private_quiz_owner_is_checked_on_a_cache_miss(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'PUBLIC_QUIZ_LINKS', False)
+    add_user(2)
+    quiz_id = generate(client, user_id=2).get_json()['quiz_id']
+    quiz_app.quiz_cache.invalidate(quiz_id)
+
+    assert client.get(f'/quiz/{quiz_id}').status_code == 404
+    assert client.get(f'/quiz/{quiz_id}', headers={'X-User-ID': '2'}).status_code == 200
+    assert quiz_app.quiz_cache.owner(quiz_id) == 2
@@ -0,0 +1,56 @@
+import sqlite3
+
+from config import UserConfig
+from utils.migrations import migrate
+from utils.search import search_quizzes
+
+from conftest import generate
+
+
+def test_private_links_hide_other_users_results(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'PUBLIC_QUIZ_LINKS', False)
+    add_user(2)
+    quiz_id = generate(client, user_id=2).get_json()['quiz_id']
+
+    mine = client.get('/search?q=chloroplast', headers={'X-User-ID': '2'}).get_json()
+    assert [result['id'] for result in mine['results']] == [quiz_id]
+
+    theirs = client.get('/search?q=chloroplast').get_json()
+    assert theirs['results'] == [] and theirs['has_more'] is False
+
+
+def test_public_links_search_everyone(client, add_user, monkeypatch):
+    monkeypatch.setattr(UserConfig, 'PUBLIC_QUIZ_LINKS', True)
+    add_user(2)
+    quiz_id = generate(client, user_id=2).get_json()['quiz_id']
+
+    results = client.get('/search?q=chloroplast').get_json()['results']
+    assert [result['id'] for result in results] == [quiz_id]
+
+
+def test_pages_keep_quizzes_outranked_by_another_quizs_many_questions(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'quiz_app.db'))
+    migrate(conn)
+
+    def add_quiz(questions):
+        cursor = conn.execute("INSERT INTO quizzes (notes_id, quiz_type) VALUES (NULL, 'flashcard')")
+        quiz_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO questions (quiz_id, question_text, question_type, options, correct_answer) "
+            "VALUES (?, ?, 'flashcard', NULL, 'x')", [(quiz_id, text) for text in questions])
+        return quiz_id
+
+    # One quiz with many short (high-scoring) matching questions, then two with one longer match each
+    crowded = add_quiz([f"Osmosis question {i}" for i in range(30)])
+    others = [add_quiz([f"Which statement about plant cells and {word} and osmosis is true here?"])
+              for word in ('turgor', 'vacuoles')]
+    conn.commit()
+
+    seen, offset, has_more = [], 0, True
+    while has_more:
+        results, has_more = search_quizzes(conn, 'osmosis', limit=1, offset=offset)
+        seen += [result['id'] for result in results]
+        offset += 1
+    assert seen[0] == crowded
+    assert sorted(seen[1:]) == sorted(others)
+    conn.close()
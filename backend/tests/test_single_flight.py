@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import AsyncSingleFlight
+
+
+def test_followers_take_over_when_the_leader_is_cancelled():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(len(calls))
+            await asyncio.sleep(0.05)
+            return {'call': len(calls)}
+
+        leader = asyncio.create_task(flight.do('key', work))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do('key', work, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        results = await asyncio.gather(*followers)
+        # One follower re-ran the call and the other two shared it
+        assert results == [{'call': 2}] * 3
+        assert len(calls) == 2
+        assert flight.stats()['in_flight'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_follower_timeout_covers_the_retry():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(flight.do('key', slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do('key', slow, timeout=0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(TimeoutError):
+            await follower
+        leader.cancel()
+
+    asyncio.run(scenario())
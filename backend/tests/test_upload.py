@@ -0,0 +1,29 @@
+import io
+
+from config import UploadConfig
+
+SENTENCE = "The cell's membrane controls what enters and leaves, and it's \"selectively permeable\". "
+
+
+def upload(client, text, filename='notes.txt'):
+    return client.post('/notes/upload', content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(text.encode('utf-8')), filename), 'force_new': 'true'})
+
+
+def test_long_upload_with_quotes_is_clipped_not_rejected(client):
+    text = SENTENCE * (6000 // len(SENTENCE) + 1)
+    response = upload(client, text)
+
+    assert response.status_code == 200, response.get_json()
+    source = response.get_json()['source']
+    assert source['truncated'] is True
+    assert source['characters'] <= UploadConfig.NOTES_CHARS
+
+
+def test_typed_notes_with_quotes_at_the_limit_are_accepted(client):
+    notes = (SENTENCE * (5000 // len(SENTENCE) + 1))[:5000]
+    response = client.post('/generate', json={'notes': notes, 'force_new': True})
+    assert response.status_code == 200
+
+    response = client.post('/generate', json={'notes': notes + 'x', 'force_new': True})
+    assert response.status_code == 400
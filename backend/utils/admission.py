@@ -0,0 +1,146 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+# Admission control for calls to the AI backend.
+#
+# At most max_in_flight calls run at once and at most max_queue requests
+# wait for a slot, each for no longer than queue_timeout. Anything beyond
+# that is shed straight away instead of parking another thread on a slow
+# upstream; the caller decides whether a shed request degrades to fallback
+# generation or is rejected with 503 + Retry-After. The async variant
+# applies the same policy on the event loop for the ASGI entry point.
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed and the overload mode is 'reject'"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"AI backend at capacity, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency cap with a bounded, time-limited wait queue"""
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 16, queue_timeout: float = 10.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_call_seconds = 5.0  # moving average, seeds Retry-After estimates
+        self.counters = {'admitted': 0, 'admitted_after_wait': 0, 'shed_queue_full': 0, 'shed_timeout': 0}
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False means the request was shed"""
+        with self._condition:
+            if self.in_flight < self.max_in_flight and self.waiting == 0:
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                return False
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['shed_timeout'] += 1
+                        return False
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                self.counters['admitted_after_wait'] += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, elapsed: float) -> None:
+        """Free a slot taken by acquire(); elapsed is how long the call held it"""
+        with self._condition:
+            self.in_flight -= 1
+            self.avg_call_seconds = 0.8 * self.avg_call_seconds + 0.2 * elapsed
+            self._condition.notify()
+
+    def has_capacity(self) -> bool:
+        with self._condition:
+            return self.in_flight < self.max_in_flight and self.waiting == 0
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has likely drained (1-60)"""
+        with self._condition:
+            backlog = self.in_flight + self.waiting + 1
+            estimate = self.avg_call_seconds * backlog / max(self.max_in_flight, 1)
+        return min(max(math.ceil(estimate), 1), 60)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return dict(self.counters,
+                        in_flight=self.in_flight,
+                        queue_depth=self.waiting,
+                        max_in_flight=self.max_in_flight,
+                        max_queue=self.max_queue,
+                        shed=self.counters['shed_queue_full'] + self.counters['shed_timeout'],
+                        avg_call_seconds=round(self.avg_call_seconds, 3))
+
+
+class AsyncAdmissionController(AdmissionController):
+    """AdmissionController for coroutines: queued requests wait on the event loop, not in a thread.
+
+    Counters live under the same thread lock as the base class (held only
+    between awaits), so stats() and retry_after() work from any thread.
+    """
+
+    def __init__(self, max_in_flight: int = 256, max_queue: int = 1024, queue_timeout: float = 10.0):
+        super().__init__(max_in_flight, max_queue, queue_timeout)
+        self._released: Optional[asyncio.Condition] = None  # created on the event loop
+
+    async def acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < self.max_in_flight and self.waiting == 0:
+                self.in_flight += 1
+                self.counters['admitted'] += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                return False
+            self.waiting += 1
+
+        if self._released is None:
+            self._released = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        try:
+            async with self._released:
+                while True:
+                    with self._condition:
+                        if self.in_flight < self.max_in_flight:
+                            self.in_flight += 1
+                            self.counters['admitted'] += 1
+                            self.counters['admitted_after_wait'] += 1
+                            return True
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        with self._condition:
+                            self.counters['shed_timeout'] += 1
+                        return False
+                    try:
+                        await asyncio.wait_for(self._released.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            with self._condition:
+                self.waiting -= 1
+
+    async def release(self, elapsed: float) -> None:
+        super().release(elapsed)
+        if self._released is not None:
+            async with self._released:
+                self._released.notify()
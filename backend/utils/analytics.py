@@ -0,0 +1,117 @@
+import sqlite3
+from typing import Dict, List, Optional
+
+# Incrementally maintained analytics rollups.
+#
+# quiz_rollups_hourly holds one row per (hour, quiz_type, generation_method)
+# with quiz and question counts. save_quiz_to_db bumps the matching row in
+# the same transaction that stores the quiz, and /stats reads only these
+# rows, so dashboards never aggregate over quizzes/questions. Coarser
+# granularities are folded from the hourly rows at read time.
+
+GRANULARITIES = {
+    'hour': 'bucket',
+    'day': 'substr(bucket, 1, 10)',
+    'week': "strftime('%Y-W%W', bucket)",
+    'month': 'substr(bucket, 1, 7)',
+}
+
+
+def _bucket(column: str) -> str:
+    """SQL expression truncating a timestamp column to its hour bucket"""
+    return f"strftime('%Y-%m-%d %H:00:00', {column})"
+
+
+def record_quiz(cursor: sqlite3.Cursor, quiz_id: int, generation_method: str, question_count: int) -> None:
+    """Add a newly inserted quiz to its hourly rollup (call in the saving transaction)"""
+    cursor.execute(f'''
+        INSERT INTO quiz_rollups_hourly (bucket, quiz_type, generation_method, quiz_count, question_count)
+        SELECT {_bucket('created_at')}, quiz_type, ?, 1, ? FROM quizzes WHERE id = ?
+        ON CONFLICT (bucket, quiz_type, generation_method) DO UPDATE SET
+            quiz_count = quiz_count + 1,
+            question_count = question_count + excluded.question_count
+    ''', (generation_method, question_count, quiz_id))
+
+
+def rebuild_rollups(cursor: sqlite3.Cursor) -> int:
+    """Recompute every rollup row from quizzes and questions; returns the row count.
+
+    Run inside a transaction so readers never see the table half rebuilt.
+    """
+    cursor.execute('DELETE FROM quiz_rollups_hourly')
+    cursor.execute(f'''
+        INSERT INTO quiz_rollups_hourly (bucket, quiz_type, generation_method, quiz_count, question_count)
+        SELECT {_bucket('q.created_at')}, q.quiz_type,
+               COALESCE(q.generation_method, 'Unknown'), COUNT(*), COALESCE(SUM(c.question_count), 0)
+        FROM quizzes q
+        LEFT JOIN (SELECT quiz_id, COUNT(*) AS question_count FROM questions GROUP BY quiz_id) c
+               ON c.quiz_id = q.id
+        GROUP BY 1, 2, 3
+    ''')
+    return cursor.execute('SELECT COUNT(*) FROM quiz_rollups_hourly').fetchone()[0]
+
+
+def query_stats(conn: sqlite3.Connection, start: str, end: str, granularity: str = 'day') -> List[Dict]:
+    """Series of dashboard metrics between start (inclusive) and end (exclusive).
+
+    start/end are 'YYYY-MM-DD[ HH:MM:SS]' UTC strings comparable with buckets.
+    """
+    period = GRANULARITIES[granularity]
+    rows = conn.execute(f'''
+        SELECT {period} AS period, quiz_type, generation_method,
+               SUM(quiz_count), SUM(question_count)
+        FROM quiz_rollups_hourly
+        WHERE bucket >= ? AND bucket < ?
+        GROUP BY period, quiz_type, generation_method
+        ORDER BY period
+    ''', (start, end)).fetchall()
+
+    series: Dict[str, Dict] = {}
+    for period_key, quiz_type, method, quizzes, questions in rows:
+        point = series.setdefault(period_key, {
+            'period': period_key, 'quizzes': 0, 'questions': 0, 'by_type': {}, 'by_method': {}
+        })
+        point['quizzes'] += quizzes
+        point['questions'] += questions
+        point['by_type'][quiz_type] = point['by_type'].get(quiz_type, 0) + quizzes
+        point['by_method'][method] = point['by_method'].get(method, 0) + quizzes
+
+    for point in series.values():
+        _add_ratios(point)
+    return list(series.values())
+
+
+def merge_series(series_list: List[List[Dict]]) -> List[Dict]:
+    """Combine series from several databases (shards) into one, period by period"""
+    by_period: Dict[str, List[Dict]] = {}
+    for series in series_list:
+        for point in series:
+            by_period.setdefault(point['period'], []).append(point)
+    return [dict(summarize(points), period=period) for period, points in sorted(by_period.items())]
+
+
+def summarize(series: List[Dict]) -> Dict:
+    """Totals over a whole series, with the same derived ratios as each point"""
+    total: Dict = {'quizzes': 0, 'questions': 0, 'by_type': {}, 'by_method': {}}
+    for point in series:
+        total['quizzes'] += point['quizzes']
+        total['questions'] += point['questions']
+        for field in ('by_type', 'by_method'):
+            for name, count in point[field].items():
+                total[field][name] = total[field].get(name, 0) + count
+    _add_ratios(total)
+    return total
+
+
+def _add_ratios(point: Dict) -> None:
+    methods = point['by_method']
+    # 'Degraded' is fallback generation forced by AI admission control
+    fallback = methods.get('Fallback', 0) + methods.get('Degraded', 0)
+    generated = methods.get('AI', 0) + fallback
+    point['avg_questions_per_quiz'] = round(point['questions'] / point['quizzes'], 2) if point['quizzes'] else 0.0
+    point['ai_ratio'] = _ratio(methods.get('AI', 0), generated)
+    point['fallback_ratio'] = _ratio(fallback, generated)
+
+
+def _ratio(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 3) if whole else None
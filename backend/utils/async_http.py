@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+
+from utils.fast_json import loads
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, only used by the ASGI entry point
+    aiohttp = None
+
+# HTTP client for the event-loop generation path (asgi.py).
+#
+# With aiohttp a pending Hugging Face call is just a socket on the event
+# loop, and one pooled session serves every request. Without it calls fall
+# back to requests in the default thread pool: the ASGI entry point keeps
+# working, but in-flight calls are bounded by threads again.
+
+ASYNC_HTTP_BACKEND = 'aiohttp' if aiohttp is not None else 'threads'
+
+# (status code, decoded JSON body or None, Retry-After header, start of the body text)
+Reply = Tuple[int, Any, Optional[str], str]
+
+
+def _decode(status: int, text: str) -> Any:
+    if status != 200:
+        return None
+    try:
+        return loads(text)
+    except ValueError:
+        return None
+
+
+class AsyncHTTPClient:
+    """POSTs JSON without holding a thread per pending call (when aiohttp is installed)"""
+
+    def __init__(self, max_connections: int = 256, timeout: float = 30.0):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        # Sessions belong to the running loop, so create one on first use
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def post_json(self, url: str, headers: Dict[str, str], payload: Any) -> Reply:
+        if aiohttp is None:
+            return await asyncio.to_thread(self._post_blocking, url, headers, payload)
+        async with self._get_session().post(url, headers=headers, json=payload) as response:
+            text = await response.text()
+            return response.status, _decode(response.status, text), response.headers.get('Retry-After'), text[:200]
+
+    def _post_blocking(self, url: str, headers: Dict[str, str], payload: Any) -> Reply:
+        # Imported here: requests is a sizeable share of the app's import time
+        import requests
+        response = requests.post(url, headers=headers, json=payload, timeout=self.timeout)
+        text = response.text
+        return response.status_code, _decode(response.status_code, text), response.headers.get('Retry-After'), text[:200]
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
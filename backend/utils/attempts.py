@@ -0,0 +1,53 @@
+import json
+import sqlite3
+from typing import Dict, List, Sequence, Tuple
+
+# Storage of quiz attempts and their per-question results.
+#
+# Attempts live in the shard of their quiz and are written in batches by
+# the write-behind buffer in app.py, so a class submitting at once costs a
+# handful of transactions instead of one commit per answer.
+
+# (local quiz id, user id, submitted_at, duration_ms, grade_attempt() result, raw answers)
+PendingAttempt = Tuple[int, int, str, int, Dict, Sequence]
+
+
+def insert_attempts(conn: sqlite3.Connection, attempts: Sequence[PendingAttempt]) -> None:
+    """Write a batch of attempts and their answers in one transaction"""
+    cursor = conn.cursor()
+    try:
+        for quiz_id, user_id, submitted_at, duration_ms, result, answers in attempts:
+            cursor.execute('''
+                INSERT INTO attempts (quiz_id, user_id, correct, total, score, duration_ms, submitted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (quiz_id, user_id, result['correct'], result['total'], result['score'], duration_ms, submitted_at))
+            attempt_id = cursor.lastrowid
+            cursor.executemany('''
+                INSERT INTO attempt_answers (attempt_id, question_index, answer, correct, score)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (attempt_id, item['index'],
+                 json.dumps(answers[item['index']]) if item['index'] < len(answers) else None,
+                 item['correct'], item['score'])
+                for item in result['items']
+            ])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def recent_attempts(conn: sqlite3.Connection, quiz_id: int, user_id: int, limit: int = 20) -> List[Dict]:
+    """A user's latest attempts at a quiz, newest first"""
+    rows = conn.execute('''
+        SELECT correct, total, score, duration_ms, submitted_at
+        FROM attempts
+        WHERE quiz_id = ? AND user_id = ?
+        ORDER BY submitted_at DESC, id DESC
+        LIMIT ?
+    ''', (quiz_id, user_id, limit)).fetchall()
+    return [
+        {'correct': correct, 'total': total, 'score': score, 'duration_ms': duration_ms,
+         'submitted_at': submitted_at}
+        for correct, total, score, duration_ms, submitted_at in rows
+    ]
@@ -0,0 +1,74 @@
+import re
+import sqlite3
+from typing import List, Optional, Tuple
+
+from utils.note_store import read_content
+from utils.questions import Question
+from utils.sentence_index import split_sentences
+
+# Lazily generated answer explanations.
+#
+# questions.explanation stays NULL until someone asks for it. The first
+# request generates one (AI, or a sentence-based fallback) and stores it
+# with UPDATE ... WHERE explanation IS NULL, so concurrent first requests
+# cannot overwrite each other and every later read is a plain lookup.
+
+_WORD = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {'the', 'a', 'an', 'of', 'to', 'in', 'is', 'are', 'and', 'or', 'what', 'which', 'how', 'why',
+              'does', 'do', 'for', 'on', 'with', 'by', 'this', 'that', 'it', 'as', 'be', 'was', 'were'}
+
+
+def _terms(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 2}
+
+
+def supporting_sentence(notes: str, question: Question) -> str:
+    """Sentence of the notes sharing the most terms with the question and its answer"""
+    wanted = _terms(question.question + ' ' + question.answer_text())
+    best, best_overlap = '', 0
+    for sentence in split_sentences(notes):
+        overlap = len(wanted & _terms(sentence))
+        if overlap > best_overlap:
+            best, best_overlap = sentence, overlap
+    return best
+
+
+def fallback_explanation(question: Question, context: str) -> str:
+    """Explanation built from the answer and the supporting sentence of the notes"""
+    parts = [f'The correct answer is "{question.answer_text()}".']
+    if context:
+        parts.append(f'Your notes say: "{context.strip()}"')
+    return ' '.join(parts)
+
+
+def load_question(conn: sqlite3.Connection, quiz_id: int, index: int) -> Optional[Tuple[int, tuple, Optional[str]]]:
+    """(question id, (text, type, options, correct_answer), explanation) of the index-th question"""
+    row = conn.execute('''
+        SELECT id, question_text, question_type, options, correct_answer, explanation
+        FROM questions WHERE quiz_id = ? ORDER BY id LIMIT 1 OFFSET ?
+    ''', (quiz_id, index)).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1:5], row[5]
+
+
+def load_quiz_notes(conn: sqlite3.Connection, quiz_id: int) -> str:
+    row = conn.execute('''
+        SELECT n.content, n.compression FROM quizzes q JOIN notes n ON n.id = q.notes_id WHERE q.id = ?
+    ''', (quiz_id,)).fetchone()
+    return read_content(*row) if row else ''
+
+
+def store_explanation(conn: sqlite3.Connection, question_id: int, explanation: str) -> str:
+    """Save an explanation unless one already exists; returns the stored one. Commits."""
+    conn.execute("UPDATE questions SET explanation = ? WHERE id = ? AND explanation IS NULL",
+                 (explanation, question_id))
+    conn.commit()
+    return conn.execute("SELECT explanation FROM questions WHERE id = ?", (question_id,)).fetchone()[0]
+
+
+def unexplained_positions(conn: sqlite3.Connection, quiz_id: int) -> List[int]:
+    """Positions (as used by load_question) of a quiz's questions without an explanation"""
+    rows = conn.execute("SELECT explanation IS NULL FROM questions WHERE quiz_id = ? ORDER BY id",
+                        (quiz_id,)).fetchall()
+    return [position for position, (missing,) in enumerate(rows) if missing]
@@ -0,0 +1,214 @@
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from typing import Dict, Optional, Tuple
+from xml.etree import ElementTree
+
+try:
+    import pypdf
+except ImportError:  # optional dependency, only needed for PDF uploads
+    pypdf = None
+
+# Text extraction for uploaded note files.
+#
+# Parsing DOCX XML or PDF content streams is CPU-bound pure Python, so it
+# runs in a child process instead of a request thread, where it would hold
+# the GIL. Each file gets its own process, at most `workers` at a time, so
+# a file that runs past the time limit is killed on its own: nothing else
+# can stop a runaway parser, and other uploads in flight are unaffected.
+# Uploads are passed by temp-file path, never by content, and children stop
+# reading once max_chars of text is out.
+
+SUPPORTED_EXTENSIONS = ('.txt', '.md', '.markdown', '.docx', '.pdf')
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MARKDOWN_RULES = [
+    (re.compile(r'^```.*?^```', re.M | re.S), ''),          # fenced code
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),          # images
+    (re.compile(r'\[([^\]]+)\]\([^)]*\)'), r'\1'),           # links
+    (re.compile(r'^\s{0,3}(#{1,6}|>+|[-*+]|\d+\.)\s+', re.M), ''),  # headings, quotes, list markers
+    (re.compile(r'(\*\*|__|\*|_|`)(.+?)\1'), r'\2'),         # emphasis, inline code
+    (re.compile(r'^\s*([-*_]\s*){3,}$', re.M), ''),          # horizontal rules
+]
+
+
+class UnsupportedFile(ValueError):
+    """The file type is not accepted or cannot be parsed"""
+
+
+class ExtractionTimeout(TimeoutError):
+    """Extraction ran past its time limit"""
+
+
+def _read_plain(path: str, max_chars: int) -> str:
+    with open(path, 'r', encoding='utf-8', errors='replace') as handle:
+        return handle.read(max_chars)
+
+
+def _strip_markdown(text: str) -> str:
+    for pattern, replacement in _MARKDOWN_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _read_docx(path: str, max_chars: int) -> str:
+    """Paragraph text of word/document.xml, streamed so huge documents stop early"""
+    try:
+        archive = zipfile.ZipFile(path)
+        document = archive.open('word/document.xml')
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise UnsupportedFile(f"Not a valid DOCX file: {e}")
+
+    paragraphs, length = [], 0
+    with archive, document:
+        for _, element in ElementTree.iterparse(document):
+            if element.tag != _WORD_NS + 'p':
+                continue
+            text = ''.join(node.text or '' for node in element.iter(_WORD_NS + 't'))
+            element.clear()
+            if text.strip():
+                paragraphs.append(text)
+                length += len(text) + 1
+                if length >= max_chars:
+                    break
+    return '\n'.join(paragraphs)
+
+
+def _read_pdf(path: str, max_chars: int) -> str:
+    if pypdf is None:
+        raise UnsupportedFile("PDF uploads need the optional pypdf package")
+    try:
+        reader = pypdf.PdfReader(path)
+        pages, length = [], 0
+        for page in reader.pages:
+            text = page.extract_text() or ''
+            pages.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+    except pypdf.errors.PyPdfError as e:
+        raise UnsupportedFile(f"Could not read PDF: {e}")
+    return '\n'.join(pages)
+
+
+def extract_text(path: str, extension: str, max_chars: int) -> str:
+    """Plain text of a notes file (runs in a worker process)"""
+    if extension == '.txt':
+        text = _read_plain(path, max_chars)
+    elif extension in ('.md', '.markdown'):
+        text = _strip_markdown(_read_plain(path, max_chars))
+    elif extension == '.docx':
+        text = _read_docx(path, max_chars)
+    elif extension == '.pdf':
+        text = _read_pdf(path, max_chars)
+    else:
+        raise UnsupportedFile(f"Unsupported file type {extension or '(none)'}")
+    return re.sub(r'[ \t]+', ' ', text).strip()[:max_chars]
+
+
+def _extract_child(connection, path: str, extension: str, max_chars: int) -> None:
+    """Child process body: send (True, text) or (False, error) back to the parent"""
+    try:
+        outcome = (True, extract_text(path, extension, max_chars))
+    except UnsupportedFile as e:
+        outcome = (False, e)
+    except Exception as e:
+        outcome = (False, RuntimeError(f"Text extraction failed: {e!r}"))  # may not pickle as is
+    connection.send(outcome)
+    connection.close()
+
+
+class TextExtractor:
+    """Runs extract_text() in a child process per file, at most `workers` at a time"""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers)
+        self._context = None
+        self._running = set()
+        self._lock = threading.Lock()
+        self.counters = {'extracted': 0, 'failed': 0, 'timed_out': 0}
+
+    def _get_context(self):
+        with self._lock:
+            if self._context is None:
+                # Not fork: forking a multithreaded server can copy a lock some other
+                # thread holds into the child. The fork server is a single-threaded
+                # process started on first use that forks the children instead.
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    self._context = multiprocessing.get_context('forkserver')
+                    self._context.set_forkserver_preload([__name__])
+                else:
+                    self._context = multiprocessing.get_context('spawn')
+            return self._context
+
+    def extract(self, path: str, extension: str, max_chars: int, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            self._count('timed_out')
+            raise ExtractionTimeout(f"Text extraction took longer than {timeout}s")
+        try:
+            context = self._get_context()
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(target=_extract_child, args=(writer, path, extension, max_chars),
+                                      name='text-extraction', daemon=True)
+            with self._lock:
+                self._running.add(process)
+            try:
+                process.start()
+                writer.close()
+                if not reader.poll(max(deadline - time.monotonic(), 0)):
+                    process.kill()
+                    self._count('timed_out')
+                    raise ExtractionTimeout(f"Text extraction took longer than {timeout}s")
+                try:
+                    succeeded, value = reader.recv()
+                except EOFError:
+                    succeeded, value = False, RuntimeError(f"Text extraction exited with code {process.exitcode}")
+            finally:
+                reader.close()
+                process.join()
+                with self._lock:
+                    self._running.discard(process)
+        finally:
+            self._slots.release()
+
+        if not succeeded:
+            self._count('failed')
+            raise value
+        self._count('extracted')
+        return value
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            running = list(self._running)
+        for process in running:
+            if process.is_alive():
+                process.kill()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, workers=self.workers, running=len(self._running))
+
+
+def upload_extension(filename: Optional[str]) -> str:
+    """Lower-case extension of an uploaded file name ('' if none)"""
+    return os.path.splitext(filename or '')[1].lower()
+
+
+def clip_text(text: str, max_chars: int) -> Tuple[str, bool]:
+    """At most max_chars of text, cut after a sentence where possible; also says whether it was cut"""
+    if len(text) <= max_chars:
+        return text, False
+    head = text[:max_chars]
+    cut = max(head.rfind('. '), head.rfind('\n'))
+    if cut >= max_chars // 2:
+        head = head[:cut + 1]
+    return head.rstrip(), True
@@ -0,0 +1,48 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# One JSON codec for database columns and HTTP responses.
+#
+# Uses orjson when it is installed and the standard library otherwise; both
+# produce compact UTF-8 output, and objects with a to_json() method (the
+# question models) are serialized through it, so lists of questions can be
+# passed to jsonify or stored without converting them to dicts first.
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def _default(obj: Any) -> Any:
+    to_json = getattr(obj, 'to_json', None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
+# Built once: json.dumps() with any option set constructs a new encoder per call
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+_sorted_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return (_sorted_encoder if sort_keys else _encoder).encode(obj).encode('utf-8')
+
+
+def dumps_text(obj: Any) -> str:
+    """Compact JSON as str, e.g. for TEXT columns"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode('utf-8')
+    return _encoder.encode(obj)
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
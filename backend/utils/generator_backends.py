@@ -0,0 +1,410 @@
+import abc
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.prompts import PromptBuilder
+from utils.questions import MCQQuestion, Flashcard, Question
+from utils.result_cache import ResultCache, result_key
+
+logger = logging.getLogger(__name__)
+
+# Quiz generator backends.
+#
+# Every way of producing questions is a backend with the same generate()
+# call: one per Hugging Face model, the local fill-in-the-blank fallback,
+# the result cache and a canned stub for load tests. The engine
+# (AIQuizGenerator in app.py) walks a chain of backends until one yields
+# questions. Each backend records its latency, success rate and question
+# yield; with auto-ordering on, the registry tries the backends of a chain
+# fastest-first by observed time per successful call. Backends that always
+# answer (fallback, stub) stay at the end as the safety net.
+
+HF_API_BASE = "https://api-inference.huggingface.co/models/"
+
+# Generation parameters per model and task (quiz types and answer
+# explanations); models not listed use 'default'
+MODEL_PARAMETERS = {
+    'default': {
+        'mcq': {"max_new_tokens": 600, "temperature": 0.7, "do_sample": True, "return_full_text": False},
+        'flashcard': {"max_new_tokens": 400, "temperature": 0.6, "return_full_text": False},
+        'explanation': {"max_new_tokens": 120, "temperature": 0.5, "return_full_text": False},
+    },
+    # Text-to-text models only return generated text and reject return_full_text
+    'google/flan-t5-base': {
+        'mcq': {"max_new_tokens": 800, "temperature": 0.7, "do_sample": True, "top_p": 0.9},
+        'flashcard': {"max_new_tokens": 600, "temperature": 0.6},
+        'explanation': {"max_new_tokens": 120, "temperature": 0.5},
+    },
+}
+
+_SKIP_WORDS = {'the', 'and', 'or', 'but', 'with', 'from', 'they', 'this', 'that', 'have', 'been', 'will',
+               'were', 'are', 'is', 'in', 'on', 'at', 'to', 'for', 'of', 'by', 'as'}
+
+
+def parse_mcq_response(text: str) -> List[Question]:
+    """Parse AI-generated MCQ text"""
+    questions = []
+
+    # Split by question markers
+    for block in re.split(r'QUESTION:', text):
+        try:
+            lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
+            if len(lines) < 6:
+                continue
+
+            question_text = lines[0].strip()
+            options = []
+            correct_answer = 0
+
+            # Extract options A, B, C, D
+            for line in lines[1:5]:
+                if re.match(r'^[A-D]\)', line):
+                    options.append(re.sub(r'^[A-D]\)\s*', '', line).strip())
+
+            # Find correct answer
+            correct_line = next((line for line in lines if 'CORRECT:' in line.upper()), '')
+            if correct_line:
+                correct_letter = correct_line.upper().split('CORRECT:')[-1].strip()
+                if correct_letter in ['A', 'B', 'C', 'D']:
+                    correct_answer = ord(correct_letter) - ord('A')
+
+            if len(options) == 4 and question_text:
+                questions.append(MCQQuestion(question_text, options, correct_answer))
+        except Exception as e:
+            logger.debug("Error parsing MCQ block: %s", e, extra={'sample': 'mcq_parse'})
+
+    return questions
+
+
+def parse_flashcard_response(text: str) -> List[Question]:
+    """Parse AI-generated flashcard text"""
+    questions = []
+
+    # Split by Q: markers
+    for part in re.split(r'\bQ:', text):
+        try:
+            lines = [line.strip() for line in part.strip().split('\n') if line.strip()]
+            if len(lines) < 2:
+                continue
+
+            question_text = lines[0].strip()
+            answer_line = next((line for line in lines if line.startswith('A:')), '')
+            if answer_line:
+                answer = answer_line.replace('A:', '').strip()
+                if question_text and answer:
+                    questions.append(Flashcard(question_text, answer))
+        except Exception as e:
+            logger.debug("Error parsing flashcard: %s", e, extra={'sample': 'flashcard_parse'})
+
+    return questions
+
+
+def fallback_quiz(notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+    """Fill-in-the-blank MCQs or sentence flashcards built from the notes themselves"""
+
+    # Split notes into meaningful chunks
+    sentences = [s.strip() for s in notes.split('.') if s.strip() and len(s.split()) > 4]
+    questions: List[Question] = []
+
+    for sentence in sentences[:num_questions]:
+        words = sentence.split()
+
+        if quiz_type == 'mcq':
+            # Create fill-in-the-blank MCQ
+            if len(words) > 6:
+                important_words = [w for w in words if len(w) > 3 and w.lower() not in _SKIP_WORDS]
+                if important_words:
+                    key_word = random.choice(important_words)
+                    question_text = sentence.replace(key_word, "______", 1)
+
+                    # Plausible wrong answers: variations of the word
+                    wrong_options = []
+                    if key_word.endswith('s') and len(key_word) > 3:
+                        wrong_options.append(key_word[:-1])
+                    else:
+                        wrong_options.append(f"{key_word}s")
+                    if not key_word.lower().startswith('un'):
+                        wrong_options.append(f"un{key_word.lower()}")
+                    else:
+                        wrong_options.append(key_word[2:])
+                    wrong_options.append(f"{key_word.lower()}_related")
+
+                    options = [key_word] + wrong_options[:3]
+                    random.shuffle(options)
+                    questions.append(MCQQuestion(f"Fill in the blank: {question_text}", options,
+                                                 options.index(key_word)))
+
+        elif len(words) > 5:
+            lowered = sentence.lower()
+            if any(word in lowered for word in ['is', 'are', 'means', 'refers', 'defines']):
+                question = "What is defined or described in this statement?"
+            elif any(word in lowered for word in ['because', 'since', 'due to', 'causes']):
+                question = "What cause and effect relationship is described?"
+            else:
+                question = "What is the main concept explained here?"
+            questions.append(Flashcard(question, sentence))
+
+    # Ensure we have at least some questions
+    if not questions and sentences:
+        first_sentence = sentences[0]
+        if quiz_type == 'mcq':
+            questions.append(MCQQuestion(
+                "Based on your notes, which statement is correct?",
+                [first_sentence[:50] + "...", "This is incorrect information", "The opposite is true",
+                 "This is partially correct"],
+                0
+            ))
+        else:
+            questions.append(Flashcard('What is the key information from your notes?', first_sentence))
+
+    return questions
+
+
+class BackendStats:
+    """Latency, success rate and question yield of one backend.
+
+    Totals are kept for reporting; ordering uses moving averages, so a
+    backend that slows down or starts failing drops back within a few calls.
+    """
+
+    def __init__(self, smoothing: float = 0.2):
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.questions_requested = 0
+        self.questions_returned = 0
+        self.avg_seconds = 0.0
+        self.recent_success = 1.0
+
+    def record(self, seconds: float, requested: int, returned: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.successes += bool(returned)
+            self.questions_requested += requested
+            self.questions_returned += returned
+            if self.calls == 1:
+                self.avg_seconds = seconds
+                self.recent_success = float(bool(returned))
+            else:
+                self.avg_seconds += self.smoothing * (seconds - self.avg_seconds)
+                self.recent_success += self.smoothing * (bool(returned) - self.recent_success)
+
+    def seconds_per_success(self) -> float:
+        """Expected time spent on this backend per call that yields questions"""
+        with self._lock:
+            return self.avg_seconds / max(self.recent_success, 0.05)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'success_rate': round(self.successes / self.calls, 3) if self.calls else None,
+                'question_yield': (round(self.questions_returned / self.questions_requested, 3)
+                                   if self.questions_requested else None),
+                'avg_seconds': round(self.avg_seconds, 3),
+            }
+
+
+class GeneratorBackend(abc.ABC):
+    """One way of producing questions; generate() returns [] when it has none"""
+
+    name = ''
+    label = 'AI'      # generation_method reported for its questions
+    remote = False    # calls an external service, so it goes through admission control
+    terminal = False  # always answers, so nothing after it in a chain is ever tried
+
+    def __init__(self):
+        self.stats = BackendStats()
+
+    @abc.abstractmethod
+    def generate(self, notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+        """Questions for the notes, or [] when this backend has none"""
+
+    def is_degraded(self) -> bool:
+        return False
+
+    def details(self) -> Dict:
+        """Backend-specific counters for /metrics"""
+        return {}
+
+
+class HuggingFaceBackend(GeneratorBackend):
+    """A Hugging Face Inference API model"""
+
+    remote = True
+
+    def __init__(self, model: str, api_key: str, session: Callable[[], Any], timeout: float = 30.0):
+        super().__init__()
+        self.model = model
+        self.name = 'hf:' + model
+        self.url = HF_API_BASE + model
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.session = session  # returns the shared, pooled requests session
+        self.timeout = timeout
+        self.parameters = MODEL_PARAMETERS.get(model, MODEL_PARAMETERS['default'])
+        # Fits the notes into the model's context window next to max_new_tokens
+        self.prompts = PromptBuilder(model, self.parameters)
+
+        # Health, used to hold back speculative work
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.rate_limited_until = 0.0
+
+    def payload(self, notes: str, quiz_type: str, num_questions: int) -> Dict:
+        """Request body for a quiz of quiz_type"""
+        quiz_type = 'mcq' if quiz_type == 'mcq' else 'flashcard'
+        return {"inputs": self.prompts.build(notes, quiz_type, num_questions),
+                "parameters": dict(self.parameters[quiz_type])}
+
+    def generate(self, notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+        try:
+            response = self.session().post(self.url, headers=self.headers, timeout=self.timeout,
+                                           json=self.payload(notes, quiz_type, num_questions))
+            result = response.json() if response.status_code == 200 else None
+            return self.questions_from_response(quiz_type, response.status_code, result,
+                                                response.headers.get('Retry-After'), response.text[:200])
+        except Exception as e:
+            logger.warning("Hugging Face API error (%s): %s", self.model, e)
+            self.record_result(False)
+        return []
+
+    def questions_from_response(self, quiz_type: str, status_code: int, result: Any,
+                                retry_after: Optional[str] = None, body_preview: str = '') -> List[Question]:
+        """Parse a reply (result: decoded JSON body) into questions and record backend health"""
+        if status_code == 200:
+            if isinstance(result, list) and len(result) > 0:
+                generated_text = result[0].get('generated_text', '')
+                if quiz_type == 'mcq':
+                    parsed_questions = parse_mcq_response(generated_text)
+                else:
+                    parsed_questions = parse_flashcard_response(generated_text)
+                if parsed_questions:
+                    self.record_result(True)
+                    return parsed_questions
+            self.record_result(False, 200)
+        elif status_code == 503:
+            logger.info("Model %s is loading", self.model)
+            self.record_result(False, 503)
+        else:
+            logger.warning("Unexpected API response %s from %s: %s", status_code, self.model, body_preview,
+                           extra={'sample': 'api_status'})
+            self.record_result(False, status_code, retry_after)
+        return []
+
+    def record_result(self, success: bool, status_code: Optional[int] = None,
+                      retry_after: Optional[str] = None) -> None:
+        """Track consecutive failures and rate limiting"""
+        with self._lock:
+            if success:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if status_code == 429:
+                try:
+                    delay = float(retry_after) if retry_after else 60.0
+                except ValueError:
+                    delay = 60.0
+                self.rate_limited_until = time.time() + delay
+
+    def is_degraded(self) -> bool:
+        """True while the model is failing repeatedly or rate limiting us"""
+        with self._lock:
+            return self.consecutive_failures >= 3 or time.time() < self.rate_limited_until
+
+    def details(self) -> Dict:
+        return {'prompts': self.prompts.stats()}
+
+
+class FallbackBackend(GeneratorBackend):
+    """Local heuristic questions; always answers"""
+
+    name = 'fallback'
+    label = 'Fallback'
+    terminal = True
+
+    def generate(self, notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+        return fallback_quiz(notes, quiz_type, num_questions)
+
+
+class CacheBackend(GeneratorBackend):
+    """Questions generated recently for the same notes, type and size"""
+
+    name = 'cache'
+    label = 'Reused'
+
+    def __init__(self, cache: ResultCache):
+        super().__init__()
+        self.cache = cache
+
+    def generate(self, notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+        cached = self.cache.get(result_key(notes, quiz_type, num_questions))
+        return cached[0] if cached else []
+
+
+class StubBackend(GeneratorBackend):
+    """Canned questions after an optional fixed delay, for load tests and offline development"""
+
+    name = 'stub'
+    label = 'Stub'
+    terminal = True
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+
+    def generate(self, notes: str, quiz_type: str, num_questions: int) -> List[Question]:
+        if self.latency:
+            time.sleep(self.latency)
+        topic = ' '.join(notes.split()[:6]) or 'your notes'
+        if quiz_type == 'mcq':
+            return [MCQQuestion(f"Stub question {i + 1} about: {topic}", ['Right', 'Wrong', 'Also wrong', 'Not it'],
+                                0) for i in range(num_questions)]
+        return [Flashcard(f"Stub card {i + 1} about: {topic}", topic) for i in range(num_questions)]
+
+
+class BackendRegistry:
+    """Backends by name, and the order to try a chain of them in"""
+
+    def __init__(self, auto_order: bool = True, min_samples: int = 20):
+        self.auto_order = auto_order
+        self.min_samples = min_samples  # calls before a backend's stats affect its position
+        self._backends: Dict[str, GeneratorBackend] = {}
+
+    def register(self, backend: GeneratorBackend) -> None:
+        self._backends[backend.name] = backend
+
+    def get(self, name: str) -> Optional[GeneratorBackend]:
+        return self._backends.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._backends)
+
+    def remote(self) -> List[GeneratorBackend]:
+        return [backend for backend in self._backends.values() if backend.remote]
+
+    def chain(self, names: Sequence[str]) -> List[GeneratorBackend]:
+        """Registered backends among names, in the order to try them (unknown names are skipped)"""
+        backends = [self._backends[name] for name in dict.fromkeys(names) if name in self._backends]
+        if not self.auto_order:
+            return backends
+
+        def position(item):
+            index, backend = item
+            if backend.terminal:
+                return 1, index, 0.0
+            # Too few samples: keep the configured position ahead of measured backends, so it gets measured
+            if backend.stats.calls < self.min_samples:
+                return 0, 0.0, index
+            return 0, backend.stats.seconds_per_success(), index
+
+        return [backend for _, backend in sorted(enumerate(backends), key=position)]
+
+    def stats(self) -> Dict:
+        return {name: dict(backend.stats.snapshot(), label=backend.label, remote=backend.remote,
+                           degraded=backend.is_degraded(), **backend.details())
+                for name, backend in self._backends.items()}
@@ -0,0 +1,140 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from utils.questions import Question
+
+# Server-side grading of quiz attempts.
+#
+# Each quiz's answers are normalized once into an AnswerKey (lowercased,
+# accent- and punctuation-free text plus its token set) and kept in an LRU
+# by quiz id. Grading an attempt is then a single pass over its answers:
+# MCQ answers are compared by index, free-text answers get the better of a
+# token-overlap (Dice) score and a difflib similarity ratio, with exact
+# matches and hopeless pairs decided before difflib runs.
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+_FILLER = {'a', 'an', 'the', 'it', 'its', 'is', 'are', 'was', 'were', 'of', 'to', 'and'}
+
+
+def normalize_answer(text) -> str:
+    """Lowercase, accent-free, punctuation-free text with single spaces"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', text)).strip()
+
+
+def answer_tokens(normalized: str) -> frozenset:
+    tokens = frozenset(normalized.split())
+    # An answer made only of filler words ("it is") still needs its tokens
+    return (tokens - _FILLER) or tokens
+
+
+class AnswerKey:
+    """Normalized correct answers of one quiz, in question order"""
+
+    __slots__ = ('entries',)
+
+    def __init__(self, questions: Sequence[Question]):
+        # ('mcq', correct index) or ('text', normalized answer, tokens)
+        self.entries: List[Tuple] = []
+        for question in questions:
+            if question.type == 'mcq':
+                self.entries.append(('mcq', question.correct_answer))
+            else:
+                normalized = normalize_answer(question.answer)
+                self.entries.append(('text', normalized, answer_tokens(normalized)))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def text_similarity(expected: str, expected_tokens: frozenset, given: str) -> float:
+    """Similarity of a normalized free-text answer to the expected one (0-1)"""
+    if given == expected:
+        return 1.0
+    if not given or not expected:
+        return 0.0
+
+    given_tokens = answer_tokens(given)
+    overlap = 2 * len(expected_tokens & given_tokens) / (len(expected_tokens) + len(given_tokens))
+    if overlap == 1.0:
+        return 1.0  # same words, different order or filler
+
+    matcher = SequenceMatcher(None, given, expected, autojunk=False)
+    # Cheap upper bounds first: skip the full ratio when it cannot win
+    if matcher.real_quick_ratio() <= overlap or matcher.quick_ratio() <= overlap:
+        return overlap
+    return max(overlap, matcher.ratio())
+
+
+def grade_attempt(key: AnswerKey, answers: Sequence, threshold: float) -> Dict:
+    """Score one attempt; answers[i] is an option index or free text for question i (None = skipped)"""
+    items = []
+    correct_count = 0
+    for index, entry in enumerate(key.entries):
+        given = answers[index] if index < len(answers) else None
+
+        if given is None:
+            score = 0.0
+        elif entry[0] == 'mcq':
+            try:
+                score = 1.0 if int(given) == entry[1] else 0.0
+            except (TypeError, ValueError):
+                score = 0.0
+        else:
+            score = text_similarity(entry[1], entry[2], normalize_answer(given))
+
+        correct = score >= threshold
+        correct_count += correct
+        items.append({'index': index, 'correct': correct, 'score': round(score, 3)})
+
+    total = len(key.entries)
+    return {
+        'correct': correct_count,
+        'total': total,
+        'score': round(correct_count / total, 3) if total else 0.0,
+        'items': items,
+    }
+
+
+class AnswerKeyCache:
+    """Thread-safe LRU of AnswerKeys by quiz id"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, AnswerKey]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, quiz_id: Hashable) -> Optional[AnswerKey]:
+        with self._lock:
+            key = self._entries.get(quiz_id)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(quiz_id)
+            self.hits += 1
+            return key
+
+    def put(self, quiz_id: Hashable, key: AnswerKey) -> None:
+        with self._lock:
+            self._entries[quiz_id] = key
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,39 @@
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+# Shared components built on first use.
+#
+# Importing app or forking a worker should not pay for objects a process
+# may never touch (the AI generator and its HTTP connection pool, for one).
+# A Lazy holds the builder and creates the value once, even when several
+# request threads ask for it at the same moment; create_app() resets it
+# when the configuration it was built from changes.
+
+T = TypeVar('T')
+
+
+class Lazy(Generic[T]):
+    """A value built by build() the first time get() is called"""
+
+    def __init__(self, build: Callable[[], T]):
+        self._build = build
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._build()
+                value = self._value
+        return value
+
+    @property
+    def built(self) -> bool:
+        return self._value is not None
+
+    def reset(self) -> None:
+        """Drop the value; the next get() builds a new one"""
+        with self._lock:
+            self._value = None
@@ -0,0 +1,173 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Non-blocking structured logging.
+#
+# Request threads only put records on a bounded in-memory queue; a single
+# QueueListener thread formats them and writes to stderr and a rotating
+# file. If the writer falls behind, records are dropped (and counted)
+# instead of blocking the request. Every record carries the id of the
+# request that produced it, and high-volume messages can be sampled by
+# passing extra={'sample': '<key>'}.
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar('request_id', default='-')
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+_sampler: Optional['SamplingFilter'] = None
+_setup_lock = threading.Lock()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id (runs in the caller's thread, before queueing)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Let through at most `burst` records per sample key per `window` seconds.
+
+    Records without a 'sample' attribute always pass. The first record let
+    through after a suppressed stretch reports how many were dropped.
+    """
+
+    def __init__(self, burst: int = 5, window: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._windows: Dict[str, Tuple[float, int, int]] = {}  # key -> (start, passed, suppressed)
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            start, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.window:
+                start, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (start, passed, suppressed + 1)
+                self.suppressed_total += 1
+                return False
+            self._windows[key] = (start, passed + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(config) -> None:
+    """Route all logging through a queue to the handlers described by config.
+
+    config is LoggingConfig (or anything with the same attributes). Safe to
+    call more than once; only the first call installs handlers.
+    """
+    global _listener, _queue_handler, _sampler
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        if config.LOG_JSON:
+            formatter: logging.Formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(config.LOG_FORMAT)
+
+        handlers = []
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(formatter)
+        handlers.append(console)
+
+        if config.LOG_FILE:
+            try:
+                directory = os.path.dirname(config.LOG_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES,
+                    backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8')
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+            except OSError as e:
+                sys.stderr.write(f"Log file {config.LOG_FILE} unavailable, logging to stderr only: {e}\n")
+
+        _sampler = SamplingFilter(config.LOG_SAMPLE_BURST, config.LOG_SAMPLE_WINDOW)
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(_sampler)
+        _queue_handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.setLevel(config.LOG_LEVEL.upper())
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            if _queue_handler is not None:
+                logging.getLogger().removeHandler(_queue_handler)
+
+
+def logging_stats() -> Dict:
+    return {
+        'queued': _queue_handler.queue.qsize() if _queue_handler else 0,
+        'dropped': _queue_handler.dropped if _queue_handler else 0,
+        'sampled_out': _sampler.suppressed_total if _sampler else 0,
+    }
@@ -0,0 +1,354 @@
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from utils.near_duplicates import backfill_fingerprints
+from utils.note_store import notes_digest, PREVIEW_LENGTH
+from utils.analytics import rebuild_rollups
+
+# Versioned schema migrations.
+#
+# This list is the single source of truth for the database schema: tables,
+# indexes and any later performance changes (denormalized columns, search
+# indexes, ...) are appended here as new versions. The applied version is
+# stored in SQLite's header via PRAGMA user_version, so checking whether a
+# database is current costs one pragma read.
+#
+# A migration step is either a list of SQL statements or a callable that
+# receives the cursor (for data backfills that need Python logic).
+# Never edit a released step - append a new one instead.
+
+MigrationStep = Union[List[str], Callable[[sqlite3.Cursor], None]]
+
+
+def _add_note_fingerprints(cursor: sqlite3.Cursor) -> None:
+    """MinHash signatures and LSH buckets for near-duplicate notes"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS note_fingerprints (
+            note_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            FOREIGN KEY (note_id) REFERENCES notes (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS note_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            note_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, note_id)
+        ) WITHOUT ROWID
+    ''')
+    # Finds the latest quiz of a type for a matched note
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_quizzes_notes_type ON quizzes(notes_id, quiz_type, created_at)')
+    backfill_fingerprints(cursor)
+
+
+def _content_addressed_notes(cursor: sqlite3.Cursor) -> None:
+    """Hash, size and preview columns for content-addressed (optionally compressed) notes"""
+    for column in ('content_hash TEXT', 'compression TEXT', 'size INTEGER', 'preview TEXT'):
+        cursor.execute(f'ALTER TABLE notes ADD COLUMN {column}')
+    cursor.connection.create_function('notes_digest', 1, notes_digest, deterministic=True)
+    cursor.execute(f'''
+        UPDATE notes SET content_hash = notes_digest(content),
+                         size = length(content),
+                         preview = substr(content, 1, {PREVIEW_LENGTH})
+    ''')
+    # Not UNIQUE: existing duplicates are folded by utils.note_store.compact_notes()
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_content_hash ON notes(content_hash)')
+
+    # Bodies may now be compressed, which an external-content FTS table cannot
+    # read. Recreate notes_fts as contentless, maintained by the application.
+    for trigger in ('notes_fts_insert', 'notes_fts_delete', 'notes_fts_update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('DROP TABLE IF EXISTS notes_fts')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE notes_fts USING fts5(
+            title, content, content='',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute("INSERT INTO notes_fts(notes_fts, rank) VALUES('rank', 'bm25(10.0, 1.0)')")
+    cursor.execute('''
+        INSERT OR REPLACE INTO search_backfill (source, next_rowid, end_rowid)
+        SELECT 'notes', 0, COALESCE(MAX(id), 0) FROM notes
+    ''')
+
+
+def _analytics_rollups(cursor: sqlite3.Cursor) -> None:
+    """Per-quiz generation method and hourly rollup table for /stats"""
+    cursor.execute('ALTER TABLE quizzes ADD COLUMN generation_method TEXT')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS quiz_rollups_hourly (
+            bucket TEXT NOT NULL,  -- 'YYYY-MM-DD HH:00:00' (UTC, like created_at)
+            quiz_type TEXT NOT NULL,
+            generation_method TEXT NOT NULL,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, quiz_type, generation_method)
+        ) WITHOUT ROWID
+    ''')
+    rebuild_rollups(cursor)
+
+
+def _per_user_quizzes(cursor: sqlite3.Cursor) -> None:
+    """Quiz ownership, denormalized question counts and daily credit counters"""
+    cursor.execute('ALTER TABLE quizzes ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1 REFERENCES users (id)')
+    cursor.execute('ALTER TABLE quizzes ADD COLUMN question_count INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE quizzes SET
+            user_id = COALESCE((SELECT n.user_id FROM notes n WHERE n.id = quizzes.notes_id), 1),
+            question_count = (SELECT COUNT(*) FROM questions qu WHERE qu.quiz_id = quizzes.id)
+    ''')
+    # Per-user history is an index range scan, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_quizzes_user_created ON quizzes(user_id, created_at DESC, id DESC)')
+    cursor.execute("ALTER TABLE users ADD COLUMN plan TEXT NOT NULL DEFAULT 'free'")
+    cursor.execute('ALTER TABLE users ADD COLUMN credits_used INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('ALTER TABLE users ADD COLUMN credits_day TEXT')  # UTC date credits_used applies to
+
+
+MIGRATIONS: List[Tuple[str, MigrationStep]] = [
+    ("initial schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER DEFAULT 1,
+            content TEXT NOT NULL,
+            title TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS quizzes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            notes_id INTEGER,
+            quiz_type TEXT NOT NULL CHECK(quiz_type IN ('mcq', 'flashcard')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (notes_id) REFERENCES notes (id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quiz_id INTEGER,
+            question_text TEXT NOT NULL,
+            question_type TEXT NOT NULL,
+            options TEXT,  -- JSON string for MCQ options
+            correct_answer TEXT,  -- JSON string
+            explanation TEXT,
+            FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+        )
+        ''',
+        # Default user for demo purposes
+        '''
+        INSERT OR IGNORE INTO users (id, username, email)
+        VALUES (1, 'demo_user', 'demo@example.com')
+        ''',
+    ]),
+    ("foreign key and history indexes", [
+        'CREATE INDEX IF NOT EXISTS idx_quizzes_notes_id ON quizzes(notes_id)',
+        'CREATE INDEX IF NOT EXISTS idx_questions_quiz_id ON questions(quiz_id)',
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_id ON notes(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_quizzes_created_at ON quizzes(created_at)',
+    ]),
+    ("full-text search over notes and questions", [
+        # External-content FTS5 tables: the index stores only tokens, the
+        # text itself stays in notes/questions and is read back for snippets.
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, content, content='notes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            question_text, content='questions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        # Title matches weigh more than body matches
+        "INSERT INTO notes_fts(notes_fts, rank) VALUES('rank', 'bm25(10.0, 1.0)')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF title, content ON notes BEGIN
+            INSERT INTO notes_fts(notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts(rowid, question_text) VALUES (new.id, new.question_text);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, question_text)
+            VALUES ('delete', old.id, old.question_text);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF question_text ON questions BEGIN
+            INSERT INTO questions_fts(questions_fts, rowid, question_text)
+            VALUES ('delete', old.id, old.question_text);
+            INSERT INTO questions_fts(rowid, question_text) VALUES (new.id, new.question_text);
+        END
+        ''',
+        # Rows that existed before this migration are indexed in batches by
+        # utils.search.backfill_search_index(); new rows go through the triggers.
+        '''
+        CREATE TABLE IF NOT EXISTS search_backfill (
+            source TEXT PRIMARY KEY,
+            next_rowid INTEGER NOT NULL,
+            end_rowid INTEGER NOT NULL
+        )
+        ''',
+        '''
+        INSERT OR IGNORE INTO search_backfill (source, next_rowid, end_rowid)
+        SELECT 'notes', 0, COALESCE(MAX(id), 0) FROM notes
+        ''',
+        '''
+        INSERT OR IGNORE INTO search_backfill (source, next_rowid, end_rowid)
+        SELECT 'questions', 0, COALESCE(MAX(id), 0) FROM questions
+        ''',
+    ]),
+    ("near-duplicate note fingerprints", _add_note_fingerprints),
+    ("sentence index for incremental regeneration", [
+        '''
+        CREATE TABLE IF NOT EXISTS sentence_index (
+            sentence_hash INTEGER NOT NULL,
+            quiz_type TEXT NOT NULL,
+            question_id INTEGER NOT NULL,  -- 0: sentence processed, no question
+            PRIMARY KEY (sentence_hash, quiz_type, question_id)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    ("content-addressed, compressible notes", _content_addressed_notes),
+    ("analytics rollups", _analytics_rollups),
+    ("per-user quizzes and credits", _per_user_quizzes),
+    ("quiz attempts and per-question results", [
+        '''
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quiz_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            correct INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            score REAL NOT NULL,
+            duration_ms INTEGER,
+            submitted_at TIMESTAMP NOT NULL,  -- when the user submitted, not when the row was written
+            FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_attempts_quiz_user ON attempts(quiz_id, user_id, submitted_at DESC)',
+        '''
+        CREATE TABLE IF NOT EXISTS attempt_answers (
+            attempt_id INTEGER NOT NULL,
+            question_index INTEGER NOT NULL,
+            answer TEXT,  -- JSON: option index or typed text, NULL if skipped
+            correct INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (attempt_id, question_index),
+            FOREIGN KEY (attempt_id) REFERENCES attempts (id)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    # Used in the home shard only (utils/reviews.py); quiz_id is the public id
+    ("spaced-repetition review cards", [
+        '''
+        CREATE TABLE IF NOT EXISTS review_cards (
+            user_id INTEGER NOT NULL,
+            quiz_id INTEGER NOT NULL,
+            question_index INTEGER NOT NULL,
+            due_at TIMESTAMP NOT NULL,
+            interval_days INTEGER NOT NULL DEFAULT 0,
+            ease REAL NOT NULL,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            lapses INTEGER NOT NULL DEFAULT 0,
+            reviewed_at TIMESTAMP,
+            PRIMARY KEY (user_id, quiz_id, question_index)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_review_cards_due ON review_cards(user_id, due_at)',
+    ]),
+    # Used in the home shard only (utils/quotas.py); one row per client address
+    ("anonymous daily credits", [
+        '''
+        CREATE TABLE IF NOT EXISTS anonymous_credits (
+            client TEXT PRIMARY KEY,
+            credits_day TEXT NOT NULL,  -- UTC date credits_used applies to
+            credits_used INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+    ]),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring the database up to SCHEMA_VERSION and return the number of steps applied.
+
+    When the schema is current this is a single pragma read. Otherwise all
+    pending steps run inside one IMMEDIATE transaction, so a crash leaves the
+    database at the old version and concurrent workers starting at the same
+    time apply the migrations exactly once.
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return 0
+
+    if get_schema_version(conn) == 0:
+        # Only takes effect on a brand-new file; lets note compaction
+        # return free pages with PRAGMA incremental_vacuum
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # manage the transaction explicitly
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        # Re-check under the write lock: another process may have migrated
+        current = get_schema_version(conn)
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            _, step = MIGRATIONS[version - 1]
+            if callable(step):
+                step(cursor)
+            else:
+                for statement in step:
+                    cursor.execute(statement)
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        cursor.execute('COMMIT')
+        return max(SCHEMA_VERSION - current, 0)
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        conn.isolation_level = previous_isolation
+
+
+def describe_migrations() -> List[str]:
+    """Human-readable list of migrations, e.g. for setup scripts"""
+    return [f"v{i}: {description}" for i, (description, _) in enumerate(MIGRATIONS, start=1)]
@@ -0,0 +1,137 @@
+import hashlib
+import html
+import re
+import sqlite3
+import zlib
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+# Near-duplicate note detection with MinHash + LSH banding.
+#
+# Every stored note gets a MinHash signature over word shingles. The
+# signature is cut into bands and each band is hashed into a bucket that is
+# indexed in note_lsh_buckets, so finding candidates is a handful of index
+# lookups instead of a scan over all notes. Candidates are then verified by
+# comparing full signatures (an estimate of Jaccard similarity).
+
+NUM_PERMUTATIONS = 64
+BANDS = 16                          # 16 bands x 4 rows: candidate threshold ~0.5
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+MAX_CANDIDATES = 50
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations(count: int) -> List[Tuple[int, int]]:
+    """Deterministic (a, b) coefficients for the universal hash family"""
+    coefficients = []
+    for i in range(count):
+        digest = hashlib.blake2b(f'minhash-{i}'.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'big') % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], 'big') % _MERSENNE_PRIME
+        coefficients.append((a, b))
+    return coefficients
+
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, unescape and strip punctuation so cosmetic edits don't matter"""
+    text = html.unescape(text).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """Word n-gram shingles of normalized text"""
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str) -> Optional[array]:
+    """MinHash signature of the note, or None for empty text"""
+    hashed = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)]
+    if not hashed:
+        return None
+    signature = array('Q')
+    for a, b in _PERMUTATIONS:
+        signature.append(min((a * h + b) % _MERSENNE_PRIME for h in hashed) & _MAX_HASH)
+    return signature
+
+
+def band_buckets(signature: Sequence[int]) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs for the LSH index"""
+    buckets = []
+    for band in range(BANDS):
+        rows = array('Q', signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+
+def estimate_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    matches = sum(1 for x, y in zip(first, second) if x == y)
+    return matches / NUM_PERMUTATIONS
+
+
+def store_fingerprint(cursor: sqlite3.Cursor, note_id: int, signature: Optional[array]) -> None:
+    """Index a note's signature (call inside the transaction that saved the note)"""
+    if signature is None:
+        return
+    cursor.execute(
+        "INSERT OR REPLACE INTO note_fingerprints (note_id, signature) VALUES (?, ?)",
+        (note_id, signature.tobytes())
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO note_lsh_buckets (band, bucket, note_id) VALUES (?, ?, ?)",
+        [(band, bucket, note_id) for band, bucket in band_buckets(signature)]
+    )
+
+
+def find_near_duplicates(conn: sqlite3.Connection, signature: Optional[array],
+                         threshold: float) -> List[Tuple[int, float]]:
+    """Return [(note_id, similarity)] at or above threshold, most similar first"""
+    if signature is None:
+        return []
+
+    buckets = band_buckets(signature)
+    probe = ','.join('(?, ?)' for _ in buckets)
+    params = [value for pair in buckets for value in pair]
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        WITH probe(band, bucket) AS (VALUES {probe})
+        SELECT b.note_id, f.signature
+        FROM probe
+        JOIN note_lsh_buckets b ON b.band = probe.band AND b.bucket = probe.bucket
+        JOIN note_fingerprints f ON f.note_id = b.note_id
+        GROUP BY b.note_id
+        ORDER BY COUNT(*) DESC
+        LIMIT {MAX_CANDIDATES}
+    ''', params)
+
+    matches = []
+    for note_id, blob in cursor.fetchall():
+        candidate = array('Q')
+        candidate.frombytes(blob)
+        similarity = estimate_similarity(signature, candidate)
+        if similarity >= threshold:
+            matches.append((note_id, similarity))
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches
+
+
+def backfill_fingerprints(cursor: sqlite3.Cursor) -> None:
+    """Fingerprint notes that were stored before near-duplicate detection existed"""
+    rows = cursor.execute('''
+        SELECT n.id, n.content FROM notes n
+        LEFT JOIN note_fingerprints f ON f.note_id = n.id
+        WHERE f.note_id IS NULL
+    ''').fetchall()
+    for note_id, content in rows:
+        store_fingerprint(cursor, note_id, minhash_signature(content or ''))
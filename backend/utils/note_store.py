@@ -0,0 +1,187 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+from array import array
+from typing import Dict, Optional, Tuple, Union
+
+from utils.near_duplicates import band_buckets
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Content-addressed note storage.
+#
+# A note body is stored once per distinct content (keyed by its SHA-256) and
+# quizzes reference it through quizzes.notes_id. Bodies above a size
+# threshold are stored compressed; notes.compression records the codec and
+# notes.preview keeps the first characters uncompressed so listings never
+# have to decompress. Use read_content() wherever the full text is needed.
+
+PREVIEW_LENGTH = 100
+
+
+def notes_digest(notes: str) -> str:
+    """Content hash that identifies a note body"""
+    return hashlib.sha256(notes.encode('utf-8')).hexdigest()
+
+
+def encode_content(text: str, min_bytes: int = 1024, codec: str = 'zlib') -> Tuple[Union[str, bytes], Optional[str]]:
+    """Return (stored value, compression) for a note body.
+
+    Small bodies, and bodies that do not shrink, are stored as plain text.
+    """
+    raw = text.encode('utf-8')
+    if len(raw) < min_bytes:
+        return text, None
+    if codec == 'zstd' and zstandard is not None:
+        packed = zstandard.ZstdCompressor(level=6).compress(raw)
+    else:
+        codec = 'zlib'
+        packed = zlib.compress(raw, 6)
+    if len(packed) >= len(raw):
+        return text, None
+    return packed, codec
+
+
+def read_content(stored: Union[str, bytes, None], compression: Optional[str]) -> str:
+    """Decompress a stored note body (only call this when the text is needed)"""
+    if stored is None:
+        return ''
+    if compression is None:
+        return stored if isinstance(stored, str) else stored.decode('utf-8')
+    if compression == 'zlib':
+        return zlib.decompress(stored).decode('utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed notes")
+        return zstandard.ZstdDecompressor().decompress(stored).decode('utf-8')
+    raise ValueError(f"Unknown note compression: {compression}")
+
+
+def store_note(cursor: sqlite3.Cursor, text: str, title: str, digest: str,
+               encoded: Optional[Tuple[Union[str, bytes], Optional[str]]] = None,
+               user_id: int = 1) -> Tuple[int, bool]:
+    """Return (notes_id, created) for the note, inserting it only if its content is new.
+
+    Call inside a write transaction (BEGIN IMMEDIATE) so two writers cannot
+    both insert the same content. encoded is the encode_content() result,
+    computed here with default settings if not given. A shared body keeps
+    the user_id of whoever stored it first; ownership lives on quizzes.
+    """
+    row = cursor.execute("SELECT id FROM notes WHERE content_hash = ? ORDER BY id LIMIT 1", (digest,)).fetchone()
+    if row:
+        return row[0], False
+
+    stored, compression = encoded or encode_content(text)
+    cursor.execute(
+        "INSERT INTO notes (user_id, content, title, content_hash, compression, size, preview) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (user_id, stored, title, digest, compression, len(text), text[:PREVIEW_LENGTH])
+    )
+    return cursor.lastrowid, True
+
+
+def load_note_text(conn: sqlite3.Connection, notes_id: int) -> Optional[str]:
+    """Full text of one note, or None if it does not exist"""
+    row = conn.execute("SELECT content, compression FROM notes WHERE id = ?", (notes_id,)).fetchone()
+    return read_content(*row) if row else None
+
+
+def compact_notes(conn: sqlite3.Connection, batch_size: int = 500, compress_min_bytes: int = 1024,
+                  codec: str = 'zlib', vacuum_pages: int = 200, pause: float = 0.01) -> Dict[str, int]:
+    """Deduplicate, compress and incrementally vacuum the notes table.
+
+    Work happens in small transactions so readers (WAL mode) are never
+    blocked for long and writers only wait for one batch. Returns counters.
+    """
+    # Deferred import: search depends on this module for decompression
+    from utils.search import pending_backfill, unindex_note
+
+    conn.execute('PRAGMA journal_mode = WAL')
+    cursor = conn.cursor()
+    totals = {'duplicates_removed': 0, 'quizzes_repointed': 0, 'notes_compressed': 0,
+              'bytes_saved': 0, 'pages_vacuumed': 0}
+
+    # 1. Fold duplicate rows into the oldest row with the same content hash
+    last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT n.id, n.title, n.content, n.compression,
+                   (SELECT MIN(m.id) FROM notes m WHERE m.content_hash = n.content_hash) AS keeper
+            FROM notes n
+            WHERE n.id > ? AND n.content_hash IS NOT NULL
+            ORDER BY n.id
+            LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        duplicates = [row for row in rows if row[4] != row[0]]
+        if not duplicates:
+            continue
+
+        cursor.execute('BEGIN IMMEDIATE')
+        # Notes the search backfill has not reached are not in the contentless
+        # index, and deleting them from it would corrupt it
+        pending_from, pending_to = pending_backfill(cursor, 'notes')
+        for notes_id, title, content, compression, keeper in duplicates:
+            cursor.execute("UPDATE quizzes SET notes_id = ? WHERE notes_id = ?", (keeper, notes_id))
+            totals['quizzes_repointed'] += cursor.rowcount
+            signature = cursor.execute(
+                "SELECT signature FROM note_fingerprints WHERE note_id = ?", (notes_id,)).fetchone()
+            if signature:
+                values = array('Q')
+                values.frombytes(signature[0])
+                cursor.executemany(
+                    "DELETE FROM note_lsh_buckets WHERE band = ? AND bucket = ? AND note_id = ?",
+                    [(band, bucket, notes_id) for band, bucket in band_buckets(values)])
+                cursor.execute("DELETE FROM note_fingerprints WHERE note_id = ?", (notes_id,))
+            if not pending_from < notes_id <= pending_to:
+                unindex_note(cursor, notes_id, title, read_content(content, compression))
+            cursor.execute("DELETE FROM notes WHERE id = ?", (notes_id,))
+            totals['duplicates_removed'] += 1
+        conn.commit()
+        time.sleep(pause)
+
+    # 2. Compress large bodies that are still stored as plain text
+    last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT id, content FROM notes
+            WHERE id > ? AND compression IS NULL AND size >= ?
+            ORDER BY id LIMIT ?
+        ''', (last_id, compress_min_bytes, batch_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for notes_id, content in rows:
+            text = read_content(content, None)
+            stored, compression = encode_content(text, compress_min_bytes, codec)
+            if compression:
+                updates.append((stored, compression, notes_id))
+                totals['bytes_saved'] += len(text.encode('utf-8')) - len(stored)
+        if updates:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.executemany("UPDATE notes SET content = ?, compression = ? WHERE id = ?", updates)
+            conn.commit()
+            totals['notes_compressed'] += len(updates)
+        time.sleep(pause)
+
+    # 3. Return free pages to the OS a few at a time
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:  # INCREMENTAL
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while free_pages > 0:
+            conn.execute(f'PRAGMA incremental_vacuum({int(vacuum_pages)})').fetchall()
+            conn.commit()
+            remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if remaining >= free_pages:
+                break
+            totals['pages_vacuumed'] += free_pages - remaining
+            free_pages = remaining
+            time.sleep(pause)
+
+    return totals
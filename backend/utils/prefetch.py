@@ -0,0 +1,116 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from utils.result_cache import CacheKey, ResultCache, result_key
+
+# Speculative prefetch of the other quiz type.
+#
+# After a user generates an MCQ quiz they very often ask for flashcards from
+# the same notes (and vice versa). The prefetcher generates the other type on
+# a single background worker and stores it in the result cache, so the
+# follow-up request is served without waiting on the model.
+#
+# Prefetching only spends spare capacity: it is bounded by a global budget
+# of generations per minute and a small pending queue, it skips jobs while
+# the AI backend is degraded, and the worker defers to foreground requests.
+
+logger = logging.getLogger(__name__)
+
+OTHER_QUIZ_TYPE = {'mcq': 'flashcard', 'flashcard': 'mcq'}
+
+
+class Prefetcher:
+    """Low-priority background generator that warms the result cache"""
+
+    def __init__(self, generate: Callable[[str, str, int], Tuple[List[Dict], str]], cache: ResultCache,
+                 budget_per_minute: int = 20, max_pending: int = 50,
+                 backend_healthy: Optional[Callable[[], bool]] = None,
+                 foreground_busy: Optional[Callable[[], bool]] = None):
+        # generate(notes, quiz_type, num_questions) -> (questions, generation_method)
+        self.generate = generate
+        self.cache = cache
+        self.budget_per_minute = budget_per_minute
+        self.backend_healthy = backend_healthy or (lambda: True)
+        self.foreground_busy = foreground_busy or (lambda: False)
+        self._jobs: 'queue.Queue' = queue.Queue(maxsize=max_pending)
+        self._pending: Set[CacheKey] = set()
+        self._spent: List[float] = []
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.stats_counters = {'scheduled': 0, 'completed': 0, 'failed': 0,
+                               'skipped_budget': 0, 'skipped_degraded': 0, 'skipped_queue_full': 0}
+
+    def schedule(self, notes: str, quiz_type: str, num_questions: int) -> bool:
+        """Queue generation of the other quiz type; returns False when the job is skipped"""
+        other_type = OTHER_QUIZ_TYPE.get(quiz_type)
+        if other_type is None:
+            return False
+        key = result_key(notes, other_type, num_questions)
+
+        with self._lock:
+            if key in self._pending or key in self.cache:
+                return False
+            if not self.backend_healthy():
+                self.stats_counters['skipped_degraded'] += 1
+                return False
+            if not self._take_budget():
+                self.stats_counters['skipped_budget'] += 1
+                return False
+            try:
+                self._jobs.put_nowait((key, notes, other_type, num_questions))
+            except queue.Full:
+                self._spent.pop()  # give the budget back
+                self.stats_counters['skipped_queue_full'] += 1
+                return False
+            self._pending.add(key)
+            self.stats_counters['scheduled'] += 1
+            self._ensure_worker()
+        return True
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        self._spent = [spent for spent in self._spent if now - spent < 60]
+        if len(self._spent) >= self.budget_per_minute:
+            return False
+        self._spent.append(now)
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='quiz-prefetch', daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            key, notes, quiz_type, num_questions = self._jobs.get()
+            try:
+                # Yield to user-facing generations; give up if the backend degrades meanwhile
+                waited = 0.0
+                while self.foreground_busy() and waited < 30:
+                    time.sleep(0.2)
+                    waited += 0.2
+                if not self.backend_healthy():
+                    with self._lock:
+                        self.stats_counters['skipped_degraded'] += 1
+                    continue
+                questions, generation_method = self.generate(notes, quiz_type, num_questions)
+                if questions:
+                    self.cache.put(key, questions, generation_method)
+                with self._lock:
+                    self.stats_counters['completed'] += 1
+            except Exception as e:
+                logger.warning("Prefetch failed: %s", e, extra={'quiz_type': quiz_type})
+                with self._lock:
+                    self.stats_counters['failed'] += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._jobs.task_done()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats_counters, pending=len(self._pending),
+                        budget_per_minute=self.budget_per_minute)
@@ -0,0 +1,197 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Tuple
+
+from utils.sentence_index import split_sentences, MIN_SENTENCE_WORDS
+
+# Token-budgeted generation prompts.
+#
+# Hugging Face models have small context windows (1024 tokens for gpt2,
+# 512 input tokens for flan-t5), and anything over the window is cut off
+# or rejected after the notes have already been uploaded. A PromptBuilder
+# knows its model's window and the max_new_tokens it asks for, so it knows
+# how many tokens the notes may take. Notes over that budget are
+# compressed extractively: the sentences that share the most vocabulary
+# with the rest of the notes are kept, in their original order, until the
+# budget is spent. Templates are split around the notes once per quiz type
+# and model, so a prompt is two string joins plus the notes. Decoder-only
+# models get a template that ends in the first question's lead-in to
+# continue; text-to-text models get a plain instruction.
+#
+# Tokens are estimated, not counted: there is no tokenizer in the
+# dependencies, and a regex pass is fast enough to run on every request.
+# The estimate errs high (long words and symbols cost extra), and
+# SAFETY_MARGIN keeps some of the window unused on top.
+
+# Context window per model in tokens; output_shares_window is True for
+# decoder-only models, where the prompt and generated tokens share it
+MODEL_CONTEXT = {
+    'default': {'tokens': 1024, 'output_shares_window': True},
+    'google/flan-t5-base': {'tokens': 512, 'output_shares_window': False},
+}
+
+PROMPT_TEMPLATES = {
+    'default': {
+        'mcq': """Based on the following study notes, create {num_questions} multiple choice questions.
+
+Study Notes:
+{notes}
+
+Please format each question exactly like this:
+QUESTION: [Clear question text]
+A) [First option]
+B) [Second option]
+C) [Third option]
+D) [Fourth option]
+CORRECT: [A or B or C or D]
+---
+
+QUESTION:""",
+        'flashcard': """Create {num_questions} study flashcards from this content:
+
+Content:
+{notes}
+
+Format each flashcard exactly like this:
+Q: [Question]
+A: [Answer]
+---
+
+Q:""",
+    },
+    # Text-to-text models follow instructions and write their answer from
+    # scratch; a decoder-style lead-in to continue would only be echoed
+    'google/flan-t5-base': {
+        'mcq': """Write {num_questions} multiple choice questions about the study notes below. For each question write a line starting with QUESTION: and the question, then four options on lines starting with A), B), C) and D), then a line starting with CORRECT: and the letter of the right option, then a line with ---.
+
+Study notes:
+{notes}""",
+        'flashcard': """Write {num_questions} study flashcards about the notes below. For each flashcard write a line starting with Q: and a question, then a line starting with A: and its answer, then a line with ---.
+
+Notes:
+{notes}""",
+    },
+}
+
+SAFETY_MARGIN = 0.05  # share of the notes budget left unused
+MIN_NOTES_TOKENS = 64  # floor when a model's window is nearly taken by the template and output
+
+_TOKEN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_LONG_WORD = re.compile(r"[A-Za-z]{7,}")
+_LONG_NUMBER = re.compile(r"\d{4,}")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+_WORD = re.compile(r"[a-z]{3,}")
+_STOP_WORDS = {'the', 'and', 'but', 'with', 'from', 'they', 'this', 'that', 'have', 'been', 'will', 'were',
+               'are', 'for', 'its', 'was', 'which', 'their', 'there', 'these', 'those', 'into', 'also', 'than',
+               'then', 'them', 'when', 'what', 'such', 'some', 'more', 'most', 'other', 'about', 'can', 'not',
+               'has', 'had', 'each', 'may', 'many', 'only', 'both', 'between', 'through', 'would', 'could'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: a word per token, long words and numbers split, symbols alone"""
+    # Whole-text regex passes; a Python loop per word costs several times more on long notes
+    return (len(_TOKEN.findall(text))
+            + sum((len(word) - 1) // 6 for word in _LONG_WORD.findall(text))
+            + sum((len(number) - 1) // 3 for number in _LONG_NUMBER.findall(text))
+            + len(_NON_ASCII.findall(text)))
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Leading words of text that fit in budget tokens"""
+    words, used = [], 0
+    for word in text.split():
+        cost = estimate_tokens(word)
+        if used + cost > budget:
+            break
+        words.append(word)
+        used += cost
+    return ' '.join(words)
+
+
+def compress_notes(notes: str, budget: int) -> Tuple[str, int]:
+    """Notes cut down to about budget tokens by keeping the highest-scoring sentences; returns (text, tokens).
+
+    A sentence scores by how often its words occur across the notes,
+    normalized by the square root of its length so a few long sentences do
+    not crowd out several focused ones.
+    """
+    sentences = split_sentences(notes)
+    if not sentences:
+        text = _truncate(notes, budget)
+        return text, estimate_tokens(text)
+
+    sentence_words = [set(_WORD.findall(sentence.lower())) - _STOP_WORDS for sentence in sentences]
+    frequency = Counter(word for words in sentence_words for word in words)
+    scores = [sum(frequency[word] for word in words) / math.sqrt(len(words)) if words else 0.0
+              for words in sentence_words]
+
+    kept, used = [], 0
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        # Every word is at least a token, so most candidates that cannot fit
+        # are skipped before the (costlier) estimate
+        if used + sentences[index].count(' ') + 2 > budget:
+            continue
+        cost = estimate_tokens(sentences[index]) + 1  # +1 for the joining space
+        if used + cost <= budget:
+            kept.append(index)
+            used += cost
+            if budget - used < MIN_SENTENCE_WORDS:
+                break
+
+    if not kept:
+        # Every sentence is over budget on its own: take the start of the best one
+        text = _truncate(sentences[max(range(len(sentences)), key=lambda i: scores[i])], budget)
+        return text, estimate_tokens(text)
+    kept.sort()
+    return ' '.join(sentences[index] for index in kept), used
+
+
+class PromptBuilder:
+    """Generation prompts for one model, with the notes fitted into its context window"""
+
+    def __init__(self, model: str, parameters: Dict[str, Dict]):
+        context = MODEL_CONTEXT.get(model, MODEL_CONTEXT['default'])
+        templates = PROMPT_TEMPLATES.get(model, PROMPT_TEMPLATES['default'])
+        # quiz type -> (text before the notes, text after, tokens the notes may take)
+        self._templates: Dict[str, Tuple[str, str, int]] = {}
+        for quiz_type, template in templates.items():
+            head, tail = template.split('{notes}')
+            overhead = estimate_tokens(head.format(num_questions=99) + tail)
+            reserved = parameters[quiz_type].get('max_new_tokens', 0) if context['output_shares_window'] else 0
+            budget = int((context['tokens'] - reserved - overhead) * (1 - SAFETY_MARGIN))
+            self._templates[quiz_type] = (head, tail, max(budget, MIN_NOTES_TOKENS))
+
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.compressed = 0
+        self.notes_tokens = 0
+        self.sent_tokens = 0
+
+    def notes_budget(self, quiz_type: str) -> int:
+        return self._templates[quiz_type][2]
+
+    def build(self, notes: str, quiz_type: str, num_questions: int) -> str:
+        head, tail, budget = self._templates[quiz_type]
+        tokens = estimate_tokens(notes)
+        sent, sent_tokens = notes, tokens
+        if tokens > budget:
+            sent, sent_tokens = compress_notes(notes, budget)
+        with self._lock:
+            self.prompts += 1
+            self.compressed += sent is not notes
+            self.notes_tokens += tokens
+            self.sent_tokens += sent_tokens
+        return head.format(num_questions=num_questions) + sent + tail
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'prompts': self.prompts,
+                'compressed': self.compressed,
+                'notes_budget': {quiz_type: budget for quiz_type, (_, _, budget) in self._templates.items()},
+                # Estimated tokens of the notes as submitted and as sent
+                'notes_tokens': self.notes_tokens,
+                'sent_tokens': self.sent_tokens,
+            }
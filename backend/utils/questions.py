@@ -0,0 +1,111 @@
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from utils.fast_json import dumps_text, loads
+
+# Typed question models.
+#
+# Questions are validated once, when the parser, fallback or database row
+# builds them; everything downstream (caches, the sentence index, grading,
+# saving, responses) trusts the fields. The classes use __slots__, so the
+# thousands held by the result cache stay small, and to_json() gives the
+# exact response shape the frontend has always received.
+
+
+class MCQQuestion:
+    """Multiple-choice question; correct_answer is an index into options"""
+
+    __slots__ = ('question', 'options', 'correct_answer', 'explanation')
+    type = 'mcq'
+
+    def __init__(self, question: str, options: Sequence[str], correct_answer: int = 0,
+                 explanation: Optional[str] = None):
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("question text is required")
+        options = list(options)
+        if len(options) < 2 or not all(isinstance(option, str) for option in options):
+            raise ValueError("an MCQ needs at least two text options")
+        if isinstance(correct_answer, bool) or not isinstance(correct_answer, int) \
+                or not 0 <= correct_answer < len(options):
+            raise ValueError(f"correct_answer must index one of the {len(options)} options")
+        self.question = question
+        self.options = options
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+
+    def answer_text(self) -> str:
+        return self.options[self.correct_answer]
+
+    def searchable_text(self) -> str:
+        return ' '.join([self.question] + self.options)
+
+    def db_columns(self) -> Tuple[str, str, str, str]:
+        """(question_text, question_type, options, correct_answer) as stored in questions"""
+        return self.question, self.type, dumps_text(self.options), dumps_text(self.correct_answer)
+
+    def to_json(self) -> Dict:
+        data = {'question': self.question, 'type': self.type, 'options': self.options,
+                'correct_answer': self.correct_answer}
+        if self.explanation:
+            data['explanation'] = self.explanation
+        return data
+
+
+class Flashcard:
+    """Free-recall question with a text answer"""
+
+    __slots__ = ('question', 'answer', 'explanation')
+    type = 'flashcard'
+
+    def __init__(self, question: str, answer: str, explanation: Optional[str] = None):
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("question text is required")
+        if not isinstance(answer, str) or not answer.strip():
+            raise ValueError("flashcard answer is required")
+        self.question = question
+        self.answer = answer
+        self.explanation = explanation
+
+    def answer_text(self) -> str:
+        return self.answer
+
+    def searchable_text(self) -> str:
+        return self.question + ' ' + self.answer
+
+    def db_columns(self) -> Tuple[str, str, str, str]:
+        return self.question, self.type, dumps_text([]), dumps_text(self.answer)
+
+    def to_json(self) -> Dict:
+        data = {'question': self.question, 'type': self.type, 'answer': self.answer}
+        if self.explanation:
+            data['explanation'] = self.explanation
+        return data
+
+
+Question = Union[MCQQuestion, Flashcard]
+
+
+def question_from_dict(data: Dict) -> Question:
+    """Build a question from its JSON shape; raises ValueError if it is invalid"""
+    if data.get('type') == 'mcq':
+        return MCQQuestion(data.get('question'), data.get('options') or [], data.get('correct_answer', 0),
+                           data.get('explanation'))
+    if data.get('type') == 'flashcard':
+        return Flashcard(data.get('question'), data.get('answer'), data.get('explanation'))
+    raise ValueError(f"unknown question type {data.get('type')!r}")
+
+
+def question_from_row(row: Sequence) -> Question:
+    """Build a question from (question_text, question_type, options, correct_answer[, explanation])"""
+    explanation = row[4] if len(row) > 4 else None
+    try:
+        if row[1] == 'mcq':
+            return MCQQuestion(row[0], loads(row[2]) if row[2] else [], loads(row[3]) if row[3] else 0,
+                               explanation)
+        return Flashcard(row[0], loads(row[3]) if row[3] else '', explanation)
+    except (ValueError, TypeError):
+        # Rows written before validation existed may hold malformed JSON or values
+        if row[1] == 'mcq':
+            return MCQQuestion(row[0] or 'Untitled question', ['Option 1', 'Option 2', 'Option 3', 'Option 4'], 0,
+                               explanation)
+        answer = row[3] if isinstance(row[3], str) and row[3].strip() else 'No answer available'
+        return Flashcard(row[0] or 'Untitled question', answer, explanation)
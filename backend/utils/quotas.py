@@ -0,0 +1,103 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Daily quiz credits.
+#
+# users.credits_used counts the quizzes generated on users.credits_day (a
+# UTC date). A credit is consumed by a single conditional UPDATE that resets
+# the counter on a new day and only matches while the user is under their
+# plan's limit, so concurrent requests can never overspend: there is no
+# read-modify-write for two requests to interleave.
+#
+# Requests without a user identity are not free: they spend the free plan's
+# credits of their client address, counted the same way in
+# anonymous_credits (home shard).
+
+_PLAN_LIMIT = "CASE plan WHEN 'premium' THEN :premium ELSE :free END"
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def consume_credit(conn: sqlite3.Connection, user_id: int, free_limit: int, premium_limit: int,
+                   day: Optional[str] = None) -> Tuple[bool, int]:
+    """Spend one credit; returns (allowed, credits remaining today).
+
+    Raises LookupError if the user does not exist. Commits.
+    """
+    day = day or today()
+    row = conn.execute(f'''
+        UPDATE users
+        SET credits_used = CASE WHEN credits_day = :day THEN credits_used + 1 ELSE 1 END,
+            credits_day = :day
+        WHERE id = :user_id
+          AND (credits_day IS NOT :day OR credits_used < {_PLAN_LIMIT})
+        RETURNING {_PLAN_LIMIT} - credits_used
+    ''', {'day': day, 'user_id': user_id, 'free': free_limit, 'premium': premium_limit}).fetchone()
+    conn.commit()
+
+    if row:
+        return True, max(row[0], 0)
+    if conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is None:
+        raise LookupError(f"Unknown user {user_id}")
+    return False, 0
+
+
+def refund_credit(conn: sqlite3.Connection, user_id: int, day: Optional[str] = None) -> None:
+    """Give back a credit spent today (e.g. when generation failed). Commits."""
+    conn.execute(
+        "UPDATE users SET credits_used = credits_used - 1 WHERE id = ? AND credits_day = ? AND credits_used > 0",
+        (user_id, day or today())
+    )
+    conn.commit()
+
+
+def credit_status(conn: sqlite3.Connection, user_id: int, free_limit: int, premium_limit: int,
+                  day: Optional[str] = None) -> Optional[Dict]:
+    """Plan, daily limit and credits left today, or None for an unknown user"""
+    row = conn.execute("SELECT plan, credits_used, credits_day FROM users WHERE id = ?", (user_id,)).fetchone()
+    if row is None:
+        return None
+    plan, used, credits_day = row
+    limit = premium_limit if plan == 'premium' else free_limit
+    used = used if credits_day == (day or today()) else 0
+    return {'plan': plan, 'daily_limit': limit, 'used': used, 'remaining': max(limit - used, 0)}
+
+
+def consume_anonymous_credit(conn: sqlite3.Connection, client: str, limit: int,
+                             day: Optional[str] = None) -> Tuple[bool, int]:
+    """Spend one of an anonymous client's (IP address's) credits; returns (allowed, credits remaining today).
+
+    Commits.
+    """
+    day = day or today()
+    row = conn.execute('''
+        INSERT INTO anonymous_credits (client, credits_day, credits_used) VALUES (:client, :day, 1)
+        ON CONFLICT (client) DO UPDATE
+        SET credits_used = CASE WHEN credits_day = :day THEN credits_used + 1 ELSE 1 END,
+            credits_day = :day
+        WHERE credits_day IS NOT :day OR credits_used < :limit
+        RETURNING :limit - credits_used
+    ''', {'client': client, 'day': day, 'limit': limit}).fetchone()
+    conn.commit()
+    return (True, max(row[0], 0)) if row else (False, 0)
+
+
+def refund_anonymous_credit(conn: sqlite3.Connection, client: str, day: Optional[str] = None) -> None:
+    """Give back an anonymous client's credit spent today. Commits."""
+    conn.execute(
+        "UPDATE anonymous_credits SET credits_used = credits_used - 1 "
+        "WHERE client = ? AND credits_day = ? AND credits_used > 0",
+        (client, day or today())
+    )
+    conn.commit()
+
+
+def anonymous_credit_status(conn: sqlite3.Connection, client: str, limit: int, day: Optional[str] = None) -> Dict:
+    """credit_status() for an anonymous client"""
+    row = conn.execute("SELECT credits_used, credits_day FROM anonymous_credits WHERE client = ?",
+                       (client,)).fetchone()
+    used = row[0] if row and row[1] == (day or today()) else 0
+    return {'plan': 'anonymous', 'daily_limit': limit, 'used': used, 'remaining': max(limit - used, 0)}
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Byte-capped LRU of pre-serialized HTTP response bodies.
+#
+# Popular quizzes are read far more often than they are written, so the
+# final JSON bytes are kept in memory: a hit skips SQLite, JSON decoding of
+# the stored columns and re-encoding of the response. The cache is bounded
+# by the total size of the stored bodies, not by entry count. Each body can
+# carry its owner, so access checks on a hit skip SQLite as well.
+
+
+class ResponseBytesCache:
+    """Thread-safe LRU keyed by id, bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # A single huge body should not flush the whole cache
+        self.max_entry_bytes = max_entry_bytes or max(max_bytes // 8, 1)
+        self._entries: 'OrderedDict[Hashable, Tuple[bytes, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hit_counts: Dict[Hashable, int] = {}
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[bytes, Any]]:
+        """(body, owner) of a cached response, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.hit_counts[key] = self.hit_counts.get(key, 0) + 1
+            return entry
+
+    def owner(self, key: Hashable) -> Any:
+        """Owner stored with a cached response (None if not cached); not counted as a hit"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else None
+
+    def put(self, key: Hashable, body: bytes, owner: Any = None) -> None:
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous[0])
+            self._entries[key] = (body, owner)
+            self.current_bytes += len(body)
+            while self.current_bytes > self.max_bytes and self._entries:
+                evicted_key, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.hit_counts.pop(evicted_key, None)
+                self.evictions += 1
+
+    def most_requested(self, count: int) -> List[Hashable]:
+        """Keys of the cached entries with the most hits, most popular first"""
+        with self._lock:
+            ranked = sorted(self.hit_counts.items(), key=lambda item: item[1], reverse=True)
+        return [key for key, _ in ranked[:count]]
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= len(entry[0])
+            self.hit_counts.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,65 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from utils.note_store import notes_digest
+
+# In-process cache of generated questions keyed by exact notes content.
+#
+# Keys are (notes digest, quiz_type, num_questions). Entries expire after a
+# TTL and the least recently used entry is evicted when the cache is full.
+
+CacheKey = Tuple[str, str, int]
+
+
+def result_key(notes: str, quiz_type: str, num_questions: int) -> CacheKey:
+    return notes_digest(notes), quiz_type, num_questions
+
+
+class ResultCache:
+    """Thread-safe LRU of generation results with a time-to-live"""
+
+    def __init__(self, max_entries: int = 500, ttl: float = 900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, List[Dict], str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[Tuple[List[Dict], str]]:
+        """Return (questions, generation_method) or None; callers get their own copy"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1]), entry[2]
+
+    def put(self, key: CacheKey, questions: List[Dict], generation_method: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(questions), generation_method)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,108 @@
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Spaced-repetition review schedule (SM-2).
+#
+# A card is one question a user studies: (user, public quiz id, question
+# index) with an ease factor, an interval and a due time. Cards live in the
+# home shard next to users and credits, so a user's queue is one table
+# wherever the quizzes are stored, and idx_review_cards_due (user_id,
+# due_at) turns "the next N due cards" into an index range scan that reads
+# N entries no matter how many cards the deployment holds.
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'  # UTC, compared as text
+
+_CARD_COLUMNS = "quiz_id, question_index, due_at, interval_days, ease, repetitions, lapses, reviewed_at"
+
+
+def format_time(moment: datetime) -> str:
+    return moment.strftime(TIME_FORMAT)
+
+
+def sm2(repetitions: int, interval_days: int, ease: float, quality: int) -> Tuple[int, int, float]:
+    """(repetitions, interval in days, ease) after an answer graded 0 (blackout) to 5 (perfect)"""
+    if quality >= 3:
+        interval_days = 1 if repetitions == 0 else 6 if repetitions == 1 else round(interval_days * ease)
+        repetitions += 1
+    else:
+        # A lapse starts the card over, but the lower ease is kept
+        repetitions, interval_days = 0, 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return repetitions, interval_days, ease
+
+
+def _card(row: Sequence) -> Dict:
+    quiz_id, question_index, due_at, interval_days, ease, repetitions, lapses, reviewed_at = row
+    return {'quiz_id': quiz_id, 'question_index': question_index, 'due_at': due_at,
+            'interval_days': interval_days, 'ease': round(ease, 2), 'repetitions': repetitions,
+            'lapses': lapses, 'reviewed_at': reviewed_at}
+
+
+def enroll_cards(conn: sqlite3.Connection, user_id: int, quiz_id: int, positions: Sequence[int],
+                 now: datetime) -> int:
+    """Add questions of a quiz to a user's queue, due now; returns the number added. Commits."""
+    cursor = conn.executemany(
+        "INSERT OR IGNORE INTO review_cards (user_id, quiz_id, question_index, due_at, ease) VALUES (?, ?, ?, ?, ?)",
+        [(user_id, quiz_id, position, format_time(now), DEFAULT_EASE) for position in positions]
+    )
+    conn.commit()
+    return cursor.rowcount
+
+
+def due_cards(conn: sqlite3.Connection, user_id: int, now: datetime, limit: int = 10) -> Tuple[List[Dict], bool]:
+    """A user's cards due by now, most overdue first; returns (cards, has_more)"""
+    rows = conn.execute(f'''
+        SELECT {_CARD_COLUMNS}
+        FROM review_cards
+        WHERE user_id = ? AND due_at <= ?
+        ORDER BY due_at
+        LIMIT ?
+    ''', (user_id, format_time(now), limit + 1)).fetchall()
+    return [_card(row) for row in rows[:limit]], len(rows) > limit
+
+
+def record_review(conn: sqlite3.Connection, user_id: int, quiz_id: int, question_index: int, quality: int,
+                  now: datetime) -> Optional[Dict]:
+    """Apply an answer to a card and return its new schedule, or None if the card is not scheduled. Commits.
+
+    Runs in a write transaction, so two answers to the same card (a double
+    submit) apply one after the other instead of overwriting each other.
+    """
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        row = cursor.execute(
+            "SELECT repetitions, interval_days, ease, lapses FROM review_cards "
+            "WHERE user_id = ? AND quiz_id = ? AND question_index = ?",
+            (user_id, quiz_id, question_index)
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+
+        repetitions, interval_days, ease, lapses = row
+        repetitions, interval_days, ease = sm2(repetitions, interval_days, ease, quality)
+        if quality < 3:
+            lapses += 1
+        card = cursor.execute(f'''
+            UPDATE review_cards
+            SET repetitions = ?, interval_days = ?, ease = ?, lapses = ?, due_at = ?, reviewed_at = ?
+            WHERE user_id = ? AND quiz_id = ? AND question_index = ?
+            RETURNING {_CARD_COLUMNS}
+        ''', (repetitions, interval_days, ease, lapses, format_time(now + timedelta(days=interval_days)),
+              format_time(now), user_id, quiz_id, question_index)).fetchone()
+        conn.commit()
+        return _card(card)
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def drop_cards(conn: sqlite3.Connection, user_id: int, cards: Sequence[Tuple[int, int]]) -> None:
+    """Remove (quiz_id, question_index) cards whose question no longer exists. Commits."""
+    conn.executemany("DELETE FROM review_cards WHERE user_id = ? AND quiz_id = ? AND question_index = ?",
+                     [(user_id, quiz_id, question_index) for quiz_id, question_index in cards])
+    conn.commit()
@@ -0,0 +1,236 @@
+import re
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from utils.note_store import read_content
+
+# Full-text search over notes and generated questions (FTS5).
+#
+# questions_fts is an external-content index kept in sync by triggers.
+# notes_fts is contentless because note bodies may be stored compressed:
+# the application indexes a note when it is first stored (index_note) and
+# note snippets are built in Python for the page being returned only.
+# Results are ranked with bm25 and grouped per quiz, so a quiz whose notes
+# and questions both match appears once with its best score.
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+SNIPPET_TOKENS = 12
+
+# Each source is first reduced to one row per quiz (its best match) and cut
+# to the :candidates best quizzes. A quiz on the requested page is among the
+# top offset + limit + 1 quizzes overall, so it is among the top that many of
+# the source it matched best in: no result is dropped, however many notes
+# and questions of other quizzes rank above it. Question snippets are only
+# built for the page, from the best question of each quiz (question_id).
+#
+# :user_id limits results to one user's quizzes (NULL searches everyone's);
+# a note can back quizzes of several users, so the join filters too
+_SEARCH_SQL = '''
+    SELECT quiz_id, MIN(score) AS score, question_id, note_id
+    FROM (
+        SELECT * FROM (
+            SELECT q.id AS quiz_id, n.score AS score, NULL AS question_id, n.rowid AS note_id
+            FROM (
+                SELECT rowid, rank AS score
+                FROM notes_fts WHERE notes_fts MATCH :match
+                  AND (:user_id IS NULL OR rowid IN (SELECT notes_id FROM quizzes WHERE user_id = :user_id))
+            ) n
+            JOIN quizzes q ON q.notes_id = n.rowid AND (:user_id IS NULL OR q.user_id = :user_id)
+            ORDER BY score LIMIT :candidates
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT qu.quiz_id AS quiz_id, MIN(f.score) AS score, f.rowid AS question_id, NULL AS note_id
+            FROM (
+                SELECT rowid, rank AS score
+                FROM questions_fts WHERE questions_fts MATCH :match
+                  AND (:user_id IS NULL OR rowid IN (
+                      SELECT qu.id FROM quizzes q JOIN questions qu ON qu.quiz_id = q.id WHERE q.user_id = :user_id))
+            ) f
+            JOIN questions qu ON qu.id = f.rowid
+            GROUP BY qu.quiz_id
+            ORDER BY score LIMIT :candidates
+        )
+    )
+    GROUP BY quiz_id
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+'''
+
+
+def query_terms(text: str) -> List[str]:
+    """Lowercased search words (at most 16)"""
+    return re.findall(r'\w+', text.lower())[:16]
+
+
+def build_match_query(text: str) -> str:
+    """Turn free user text into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so FTS5 operators in user input are inert) and the
+    terms are ANDed together. The last word is a prefix match so results
+    show up while the user is still typing.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return ''
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def make_snippet(text: str, terms: List[str], tokens: int = SNIPPET_TOKENS) -> str:
+    """Highlighted window of text around the first matching word (like FTS5 snippet())"""
+    words = text.split()
+    if not words:
+        return ''
+
+    def matches(word: str) -> bool:
+        bare = re.sub(r'\W', '', word.lower())
+        return bool(bare) and any(bare.startswith(term) for term in terms)
+
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, min(first - tokens // 4, len(words) - tokens))
+    window = words[start:start + tokens]
+    marked = [f'{HIGHLIGHT_START}{word}{HIGHLIGHT_END}' if matches(word) else word for word in window]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + tokens < len(words) else ''
+    return prefix + ' '.join(marked) + suffix
+
+
+def search_quizzes(conn: sqlite3.Connection, text: str, limit: int = 10, offset: int = 0,
+                   user_id: Optional[int] = None) -> Tuple[List[Dict], bool]:
+    """Return one page of ranked quizzes matching text, and whether more pages exist
+
+    With user_id, only that user's quizzes are searched.
+    """
+    match = build_match_query(text)
+    if not match:
+        return [], False
+
+    # One extra row tells us whether there is a next page without a COUNT(*)
+    cursor = conn.cursor()
+    cursor.execute(_SEARCH_SQL, {
+        'match': match, 'candidates': offset + limit + 1, 'user_id': user_id,
+        'limit': limit + 1, 'offset': offset,
+    })
+    hits = cursor.fetchall()
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    if not hits:
+        return [], False
+
+    quiz_ids = [hit[0] for hit in hits]
+    placeholders = ','.join('?' * len(quiz_ids))
+    cursor.execute(f'''
+        SELECT q.id, q.quiz_type, q.created_at, n.title
+        FROM quizzes q
+        LEFT JOIN notes n ON q.notes_id = n.id
+        WHERE q.id IN ({placeholders})
+    ''', quiz_ids)
+    details = {row[0]: row for row in cursor.fetchall()}
+
+    question_ids = [hit[2] for hit in hits if hit[2] is not None]
+    question_snippets = {}
+    if question_ids:
+        placeholders = ','.join('?' * len(question_ids))
+        cursor.execute(f'''
+            SELECT rowid, snippet(questions_fts, 0, ?, ?, '…', {SNIPPET_TOKENS})
+            FROM questions_fts WHERE questions_fts MATCH ? AND rowid IN ({placeholders})
+        ''', [HIGHLIGHT_START, HIGHLIGHT_END, match] + question_ids)
+        question_snippets = dict(cursor.fetchall())
+
+    # Note snippets: decompress only the notes that made it onto this page
+    note_ids = sorted({hit[3] for hit in hits if hit[2] is None and hit[3] is not None})
+    note_snippets = {}
+    if note_ids:
+        placeholders = ','.join('?' * len(note_ids))
+        cursor.execute(f"SELECT id, content, compression FROM notes WHERE id IN ({placeholders})", note_ids)
+        terms = query_terms(text)
+        for note_id, content, compression in cursor.fetchall():
+            note_snippets[note_id] = make_snippet(read_content(content, compression), terms)
+
+    results = []
+    for quiz_id, score, question_id, note_id in hits:
+        row = details.get(quiz_id)
+        if not row:
+            continue
+        results.append({
+            'id': quiz_id,
+            'type': row[1],
+            'date': row[2],
+            'title': row[3],
+            'snippet': (question_snippets.get(question_id, '') if question_id is not None
+                        else note_snippets.get(note_id, '')),
+            'score': round(-score, 4),  # bm25 is negative; higher is better here
+        })
+    return results, has_more
+
+
+def index_note(cursor: sqlite3.Cursor, notes_id: int, title: Optional[str], text: str) -> None:
+    """Add a newly stored note to the contentless notes index"""
+    cursor.execute("INSERT INTO notes_fts(rowid, title, content) VALUES (?, ?, ?)", (notes_id, title, text))
+
+
+def unindex_note(cursor: sqlite3.Cursor, notes_id: int, title: Optional[str], text: str) -> None:
+    """Remove a note from the index (contentless tables need the indexed values)"""
+    cursor.execute(
+        "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', ?, ?, ?)",
+        (notes_id, title, text)
+    )
+
+
+def pending_backfill(cursor: sqlite3.Cursor, source: str) -> Tuple[int, int]:
+    """(next_rowid, end_rowid) of a source: rows with next_rowid < rowid <= end_rowid are not indexed yet"""
+    row = cursor.execute(
+        "SELECT next_rowid, end_rowid FROM search_backfill WHERE source = ?", (source,)
+    ).fetchone()
+    return tuple(row) if row else (0, 0)
+
+
+def _backfill_notes(cursor: sqlite3.Cursor, start: int, stop: int) -> int:
+    rows = cursor.execute(
+        "SELECT id, title, content, compression FROM notes WHERE id > ? AND id <= ?", (start, stop)
+    ).fetchall()
+    cursor.executemany(
+        "INSERT INTO notes_fts(rowid, title, content) VALUES (?, ?, ?)",
+        [(notes_id, title, read_content(content, compression))
+         for notes_id, title, content, compression in rows]
+    )
+    return len(rows)
+
+
+def _backfill_questions(cursor: sqlite3.Cursor, start: int, stop: int) -> int:
+    cursor.execute('''
+        INSERT INTO questions_fts(rowid, question_text)
+        SELECT id, question_text FROM questions WHERE id > ? AND id <= ?
+    ''', (start, stop))
+    return cursor.rowcount
+
+
+# Sources indexed by the backfill, in search_backfill.source order
+_BACKFILL_SOURCES = {
+    'notes': _backfill_notes,
+    'questions': _backfill_questions,
+}
+
+
+def backfill_search_index(conn: sqlite3.Connection, batch_size: int = 5000) -> int:
+    """Index rows that predate the search index, one short transaction per batch.
+
+    Progress is stored in search_backfill, so the work resumes where it
+    stopped after a restart and never rebuilds what is already indexed.
+    Returns the number of rows indexed by this call.
+    """
+    indexed = 0
+    cursor = conn.cursor()
+    for source, backfill in _BACKFILL_SOURCES.items():
+        while True:
+            start, end = pending_backfill(cursor, source)
+            if start >= end:
+                break
+            stop = min(start + batch_size, end)
+            indexed += backfill(cursor, start, stop)
+            cursor.execute("UPDATE search_backfill SET next_rowid = ? WHERE source = ?", (stop, source))
+            conn.commit()
+    return indexed
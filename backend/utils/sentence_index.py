@@ -0,0 +1,91 @@
+import hashlib
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from utils.near_duplicates import normalize_text
+from utils.questions import Question
+
+# Sentence-level index for incremental regeneration.
+#
+# sentence_index maps the hash of a normalized sentence to the questions
+# that were generated from it (question_id 0 marks a sentence that was sent
+# to the generator but produced no question). When edited notes come back,
+# only sentences whose hash has never been seen need to go to the AI
+# backend; questions for unchanged sentences are reused.
+
+NO_QUESTION = 0
+MIN_SENTENCE_WORDS = 3
+
+
+def split_sentences(notes: str) -> List[str]:
+    """Split notes into sentences, dropping fragments too short to quiz on"""
+    parts = re.split(r'(?<=[.!?])\s+|\n+', notes)
+    return [part.strip() for part in parts if len(part.split()) >= MIN_SENTENCE_WORDS]
+
+
+def sentence_hash(sentence: str) -> int:
+    """Stable 64-bit hash of the normalized sentence (fits an SQLite INTEGER)"""
+    digest = hashlib.blake2b(normalize_text(sentence).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def _tokens(text: str) -> Set[str]:
+    return {word for word in normalize_text(text).split() if len(word) > 2}
+
+
+def attribute_questions(questions: Sequence[Question], sentences: Sequence[str]) -> List[Optional[int]]:
+    """Index of the source sentence for each question, by word overlap (None if no overlap)"""
+    sentence_tokens = [_tokens(sentence) for sentence in sentences]
+    sources = []
+    for question in questions:
+        tokens = _tokens(question.searchable_text())
+        best_index, best_overlap = None, 0
+        for index, candidate in enumerate(sentence_tokens):
+            overlap = len(tokens & candidate)
+            if overlap > best_overlap:
+                best_index, best_overlap = index, overlap
+        sources.append(best_index)
+    return sources
+
+
+def lookup_sentences(conn: sqlite3.Connection, hashes: Iterable[int],
+                     quiz_type: str) -> Tuple[Dict[int, List[tuple]], Set[int]]:
+    """Return ({hash: [question rows]}, seen hashes) for the given sentences.
+
+    Question rows are (question_text, question_type, options, correct_answer),
+    deduplicated per sentence.
+    """
+    hashes = list(set(hashes))
+    reusable: Dict[int, List[tuple]] = {}
+    seen: Set[int] = set()
+    cursor = conn.cursor()
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'''
+            SELECT s.sentence_hash, q.question_text, q.question_type, q.options, q.correct_answer
+            FROM sentence_index s
+            LEFT JOIN questions q ON q.id = s.question_id
+            WHERE s.quiz_type = ? AND s.sentence_hash IN ({placeholders})
+            ORDER BY s.question_id
+        ''', [quiz_type] + chunk)
+        for hash_value, *row in cursor.fetchall():
+            seen.add(hash_value)
+            if row[0] is None:
+                continue
+            rows = reusable.setdefault(hash_value, [])
+            if all(existing[0] != row[0] for existing in rows):
+                rows.append(tuple(row))
+    return reusable, seen
+
+
+def record_sentences(cursor: sqlite3.Cursor, quiz_type: str, processed: Iterable[int],
+                     question_sources: Iterable[Tuple[int, int]]) -> None:
+    """Mark processed sentence hashes and map (hash, question_id) pairs"""
+    cursor.executemany(
+        "INSERT OR IGNORE INTO sentence_index (sentence_hash, quiz_type, question_id) VALUES (?, ?, ?)",
+        [(hash_value, quiz_type, NO_QUESTION) for hash_value in processed]
+        + [(hash_value, quiz_type, question_id) for hash_value, question_id in question_sources]
+    )
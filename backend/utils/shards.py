@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+# Sharded SQLite storage.
+#
+# SQLite serializes writers per file, so with StorageConfig.SHARD_COUNT > 1
+# notes and everything derived from them (quizzes, questions, fingerprints,
+# sentence index, rollups) are spread over N files. A note's shard is a
+# stable hash of its content hash, which keeps identical notes together for
+# content-addressed storage. Users and credits live in the home shard (0).
+#
+# Public quiz ids carry their shard in the low SHARD_BITS bits, so a quiz id
+# routes to its file without a lookup. With a single shard ids are the
+# plain SQLite rowids, exactly as before sharding existed. Reads that span
+# users or content (history, search, stats, near-duplicates) fan out over
+# all shards and merge.
+
+SHARD_BITS = 8
+MAX_SHARDS = 1 << SHARD_BITS
+HOME_SHARD = 0
+
+T = TypeVar('T')
+
+
+def shard_paths(database_path: str, shard_count: int, shard_dir: str) -> List[str]:
+    """Database files for a deployment: the single database, or one file per shard"""
+    if shard_count <= 1:
+        return [database_path]
+    if shard_count > MAX_SHARDS:
+        raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+    return [os.path.join(shard_dir, f'shard_{index:03d}.db') for index in range(shard_count)]
+
+
+def shard_for_digest(digest: str, shard_count: int) -> int:
+    """Stable shard of a note content hash (hex SHA-256)"""
+    return int(digest[:16], 16) % shard_count if shard_count > 1 else 0
+
+
+class ShardRouter:
+    """Maps shards to SQLite files and public ids to (shard, local id)"""
+
+    def __init__(self, paths: List[str]):
+        self.paths = list(paths)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.paths)
+
+    @property
+    def sharded(self) -> bool:
+        return self.count > 1
+
+    def connect(self, shard: int = HOME_SHARD, **kwargs) -> sqlite3.Connection:
+        return sqlite3.connect(self.paths[shard], **kwargs)
+
+    def shard_for_digest(self, digest: str) -> int:
+        return shard_for_digest(digest, self.count)
+
+    def encode_id(self, shard: int, local_id: int) -> int:
+        return (local_id << SHARD_BITS) | shard if self.sharded else local_id
+
+    def decode_id(self, public_id: int) -> Optional[Tuple[int, int]]:
+        """(shard, local id) for a public id, or None if it names no shard"""
+        if not self.sharded:
+            return HOME_SHARD, public_id
+        shard = public_id & (MAX_SHARDS - 1)
+        if shard >= self.count:
+            return None
+        return shard, public_id >> SHARD_BITS
+
+    def fan_out(self, work: Callable[[int, sqlite3.Connection], T]) -> List[T]:
+        """Run work(shard, conn) on every shard (concurrently) and return the results in shard order"""
+        def run(shard: int) -> T:
+            conn = self.connect(shard)
+            try:
+                return work(shard, conn)
+            finally:
+                conn.close()
+
+        if not self.sharded:
+            return [run(HOME_SHARD)]
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=min(self.count, 16), thread_name_prefix='shard')
+        return list(self._pool.map(run, range(self.count)))
@@ -0,0 +1,152 @@
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Request coalescing ("single flight").
+#
+# When identical generations arrive together (a class opening the same
+# shared notes), the result cache cannot help because nothing has finished
+# yet. The first caller for a key runs the work; callers that arrive while
+# it is in flight wait for that same call and receive a copy of its result,
+# or its exception. Nothing is kept once the call finishes; caching results
+# is the result cache's job. In the async version a leader can be cancelled
+# (its client went away); its followers then start the call over, the first
+# of them as the new leader, instead of failing with it.
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, work: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Return work()'s result, sharing one execution among concurrent callers.
+
+        Followers wait at most timeout seconds and then raise TimeoutError;
+        the leader's call keeps running for anyone else still waiting. An
+        exception raised by work() is re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = work()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Timed out after {timeout}s waiting for an identical request in flight")
+        if call.error is not None:
+            raise call.error
+        # Followers must not share mutable results with the leader
+        return copy.deepcopy(call.result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,  # calls saved
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+            }
+
+
+class _LeaderCancelled(Exception):
+    """Set on an async call whose leader was cancelled before it finished"""
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Like SingleFlight.do(), for an async work()"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._lead(key, work)
+
+            self.coalesced += 1
+            try:
+                # shield: a follower giving up must not cancel the leader's call
+                result = await asyncio.wait_for(asyncio.shield(future),
+                                                None if deadline is None else max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TimeoutError(f"Timed out after {timeout}s waiting for an identical request in flight")
+            except _LeaderCancelled:
+                continue  # the leader's client went away; the call starts over
+            return copy.deepcopy(result)
+
+    async def _lead(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        self.executed += 1
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await work()
+        except asyncio.CancelledError:
+            # Not future.cancel(): followers would get CancelledError, which
+            # escapes their `except Exception` and leaves them unanswered
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            self.errors += 1
+            future.set_exception(e)
+            future.exception()  # retrieved here, so an unshared failure is not reported as unhandled
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._calls),
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+        }
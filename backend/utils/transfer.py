@@ -0,0 +1,283 @@
+import sqlite3
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.analytics import record_quiz
+from utils.fast_json import dumps, loads
+from utils.migrations import SCHEMA_VERSION
+from utils.near_duplicates import minhash_signature, store_fingerprint
+from utils.note_store import notes_digest, encode_content, read_content, PREVIEW_LENGTH
+from utils.questions import question_from_dict, question_from_row
+from utils.search import index_note
+
+# Quiz bank export and import as NDJSON.
+#
+# The stream is one JSON object per line: a header, then every note
+# followed by its quizzes (questions inline), then quizzes without a note.
+# Export reads two ordered cursors (notes by id, quizzes by note) and
+# merges them, fetching a batch at a time inside one read transaction, so
+# memory stays flat and the snapshot is consistent whatever the size.
+#
+# Import writes chunks of records in one transaction each. Ids are
+# allocated up front from the table's high-water mark (the chunk holds the
+# write lock), which lets notes, quizzes and questions go in with
+# executemany() instead of a round trip per row for lastrowid. Note bodies
+# already present (same content hash) are reused, as when saving a quiz.
+# Ids in the file are only references within it; imported rows get new ids.
+
+EXPORT_FORMAT = 'quiz-bank'
+EXPORT_VERSION = 1
+
+_NOTES_SQL = "SELECT id, user_id, title, content, compression, created_at FROM notes ORDER BY id"
+_QUIZZES_SQL = '''
+    SELECT q.id, q.notes_id, q.quiz_type, q.generation_method, q.user_id, q.created_at,
+           qu.question_text, qu.question_type, qu.options, qu.correct_answer, qu.explanation
+    FROM quizzes q
+    LEFT JOIN questions qu ON qu.quiz_id = q.id
+    WHERE {where}
+    ORDER BY q.notes_id, q.id, qu.id
+'''
+_HAS_NOTE = "q.notes_id IN (SELECT id FROM notes)"
+_NO_NOTE = "q.notes_id IS NULL OR q.notes_id NOT IN (SELECT id FROM notes)"
+
+# Bound parameters per IN (...) lookup
+_LOOKUP_BATCH = 500
+
+
+def export_header() -> Dict:
+    return {'type': 'header', 'format': EXPORT_FORMAT, 'version': EXPORT_VERSION,
+            'schema_version': SCHEMA_VERSION, 'exported_at': datetime.utcnow().isoformat(timespec='seconds')}
+
+
+def _rows(conn: sqlite3.Connection, sql: str, fetch_size: int) -> Iterator[Tuple]:
+    cursor = conn.execute(sql)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _quiz_records(conn: sqlite3.Connection, where: str, fetch_size: int,
+                  public_id: Callable[[int], int]) -> Iterator[Dict]:
+    rows = _rows(conn, _QUIZZES_SQL.format(where=where), fetch_size)
+    for quiz_id, quiz_rows in groupby(rows, key=lambda row: row[0]):
+        first = next(quiz_rows)
+        questions = [question_from_row(row[6:]).to_json() for row in [first, *quiz_rows] if row[6] is not None]
+        yield {'type': 'quiz', 'id': public_id(quiz_id), 'note_id': first[1], 'quiz_type': first[2],
+               'generation_method': first[3], 'user_id': first[4], 'created_at': first[5], 'questions': questions}
+
+
+def export_records(conn: sqlite3.Connection, fetch_size: int = 1000,
+                   public_id: Optional[Callable[[int], int]] = None) -> Iterator[Dict]:
+    """Every note of a database followed by its quizzes, then quizzes without a note (no header).
+
+    public_id maps local quiz ids to the ids clients see (sharded storage).
+    """
+    public_id = public_id or (lambda local_id: local_id)
+    conn.execute('BEGIN')  # one snapshot for both cursors
+    try:
+        quizzes = _quiz_records(conn, _HAS_NOTE, fetch_size, public_id)
+        pending = next(quizzes, None)
+        for note_id, user_id, title, content, compression, created_at in _rows(conn, _NOTES_SQL, fetch_size):
+            yield {'type': 'note', 'id': note_id, 'user_id': user_id, 'title': title,
+                   'content': read_content(content, compression), 'created_at': created_at}
+            while pending is not None and pending['note_id'] == note_id:
+                yield pending
+                pending = next(quizzes, None)
+        for quiz in _quiz_records(conn, _NO_NOTE, fetch_size, public_id):
+            quiz['note_id'] = None
+            yield quiz
+    finally:
+        conn.rollback()
+
+
+def ndjson_chunks(records: Iterable[Dict], chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode records as NDJSON, joined into chunks of roughly chunk_bytes"""
+    lines: List[bytes] = []
+    size = 0
+    for record in records:
+        line = dumps(record) + b'\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b''.join(lines)
+            lines, size = [], 0
+    if lines:
+        yield b''.join(lines)
+
+
+def read_ndjson(lines: Iterable) -> Iterator[Dict]:
+    """Records of an NDJSON stream (str or bytes lines); ValueError names a malformed line"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        yield record
+
+
+def _next_id(cursor: sqlite3.Cursor, table: str) -> int:
+    """First id an AUTOINCREMENT table would hand out next"""
+    row = cursor.execute(f'''
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0),
+                   COALESCE((SELECT MAX(id) FROM {table}), 0))
+    ''').fetchone()
+    return row[0] + 1
+
+
+def _existing_notes(cursor: sqlite3.Cursor, digests: List[str]) -> Dict[str, int]:
+    found = {}
+    for start in range(0, len(digests), _LOOKUP_BATCH):
+        batch = digests[start:start + _LOOKUP_BATCH]
+        placeholders = ', '.join('?' * len(batch))
+        found.update(cursor.execute(
+            f"SELECT content_hash, MIN(id) FROM notes WHERE content_hash IN ({placeholders}) GROUP BY content_hash",
+            batch
+        ).fetchall())
+    return found
+
+
+def _write_chunk(conn: sqlite3.Connection, chunk: List[Dict], user_id: int, compress_min_bytes: int,
+                 codec: str, map_function: Callable, counts: Dict[str, int]) -> None:
+    # CPU work (hashing, compression, fingerprints) happens before taking the write lock
+    notes = {}  # position in chunk -> (text, digest)
+    for position, record in enumerate(chunk):
+        if record['type'] == 'note':
+            text = record.get('content')
+            if not isinstance(text, str) or not text.strip():
+                counts['skipped'] += 1
+                continue
+            notes[position] = (text, notes_digest(text))
+
+    cursor = conn.cursor()
+    digests = list({digest for _, digest in notes.values()})
+    known = _existing_notes(cursor, digests)
+    new_notes = {}
+    for text, digest in notes.values():
+        if digest not in known and digest not in new_notes:
+            new_notes[digest] = (text, encode_content(text, compress_min_bytes, codec))
+    signatures = map_function(minhash_signature, [text for text, _ in new_notes.values()])
+    for digest, signature in zip(list(new_notes), signatures):
+        new_notes[digest] += (signature,)
+
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        # Looked up again and ids handed out under the write lock, so a
+        # concurrent save can neither duplicate a body nor take an id
+        known = _existing_notes(cursor, digests)
+        next_note_id = _next_id(cursor, 'notes')
+        next_quiz_id = _next_id(cursor, 'quizzes')
+        # Id in the file -> id here, updated in stream order: a quiz refers to
+        # the latest note with its id (shards of one export reuse note ids)
+        note_ids = {}
+        note_rows, quiz_rows, question_rows, rollups = [], [], [], []
+        for position, record in enumerate(chunk):
+            if record['type'] == 'note':
+                if position not in notes:
+                    continue
+                text, digest = notes[position]
+                if digest not in known:
+                    known[digest] = next_note_id
+                    next_note_id += 1
+                    if digest not in new_notes:  # deleted since the first lookup
+                        new_notes[digest] = (text, encode_content(text, compress_min_bytes, codec),
+                                             minhash_signature(text))
+                    stored, compression = new_notes[digest][1]
+                    note_rows.append((known[digest], user_id, stored, record.get('title'), digest, compression,
+                                      len(text), text[:PREVIEW_LENGTH], record.get('created_at')))
+                else:
+                    counts['notes_reused'] += 1
+                note_ids[record.get('id')] = known[digest]
+                continue
+
+            note_id = record.get('note_id')
+            if record.get('quiz_type') not in ('mcq', 'flashcard') or (note_id is not None and note_id not in note_ids):
+                counts['skipped'] += 1
+                continue
+            questions = []
+            for data in record.get('questions') or []:
+                try:
+                    questions.append(question_from_dict(data))
+                except (ValueError, TypeError, AttributeError):
+                    counts['skipped_questions'] += 1
+            if not questions:
+                counts['skipped'] += 1
+                continue
+
+            quiz_id = next_quiz_id
+            next_quiz_id += 1
+            generation_method = record.get('generation_method')
+            quiz_rows.append((quiz_id, note_ids.get(note_id), record['quiz_type'], generation_method, user_id,
+                              len(questions), record.get('created_at')))
+            question_rows.extend((quiz_id,) + question.db_columns() + (question.explanation,)
+                                 for question in questions)
+            rollups.append((quiz_id, generation_method or 'Unknown', len(questions)))
+
+        cursor.executemany(
+            "INSERT INTO notes (id, user_id, content, title, content_hash, compression, size, preview, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+            note_rows
+        )
+        for note_id, _, _, title, digest, *_ in note_rows:
+            text, _, signature = new_notes[digest]
+            store_fingerprint(cursor, note_id, signature)
+            index_note(cursor, note_id, title, text)
+        cursor.executemany(
+            "INSERT INTO quizzes (id, notes_id, quiz_type, generation_method, user_id, question_count, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+            quiz_rows
+        )
+        cursor.executemany(
+            "INSERT INTO questions (quiz_id, question_text, question_type, options, correct_answer, explanation) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            question_rows
+        )
+        for quiz_id, generation_method, question_count in rollups:
+            record_quiz(cursor, quiz_id, generation_method, question_count)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    counts['notes'] += len(note_rows)
+    counts['quizzes'] += len(quiz_rows)
+    counts['questions'] += len(question_rows)
+
+
+def import_records(conn: sqlite3.Connection, records: Iterable[Dict], user_id: int = 1, chunk_size: int = 5000,
+                   compress_min_bytes: int = 1024, codec: str = 'zlib', map_function: Callable = map,
+                   progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, int]:
+    """Add an export stream to a database, owned by user_id; returns counters.
+
+    A chunk is only cut before a note, so every quiz lands in the same
+    transaction as the note it refers to. A failed chunk is rolled back and
+    the error raised; chunks committed before it stay imported. MinHash
+    fingerprints of new notes dominate the cost; pass a process pool's map
+    as map_function to spread them over cores.
+    """
+    counts = {'notes': 0, 'notes_reused': 0, 'quizzes': 0, 'questions': 0, 'skipped': 0, 'skipped_questions': 0}
+    chunk: List[Dict] = []
+    for record in records:
+        kind = record.get('type')
+        if kind == 'header':
+            if record.get('format') != EXPORT_FORMAT or record.get('version') != EXPORT_VERSION:
+                raise ValueError(f"Unsupported export: format {record.get('format')!r}, "
+                                 f"version {record.get('version')!r}")
+            continue
+        if kind not in ('note', 'quiz'):
+            counts['skipped'] += 1
+            continue
+        if kind == 'note' and len(chunk) >= chunk_size:
+            _write_chunk(conn, chunk, user_id, compress_min_bytes, codec, map_function, counts)
+            chunk = []
+            if progress:
+                progress(counts)
+        chunk.append(record)
+    if chunk:
+        _write_chunk(conn, chunk, user_id, compress_min_bytes, codec, map_function, counts)
+    return counts
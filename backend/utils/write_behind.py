@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Write-behind buffering of small, frequent writes.
+#
+# Callers hand items to add() and return immediately; a background worker
+# writes them with one flush_batch(items) call (one transaction) once
+# max_items are waiting or the oldest has waited max_delay seconds. That
+# delay is the most recent data a crash can lose; max_delay = 0 writes
+# through synchronously. close() (registered with atexit by the owner)
+# writes whatever is left on shutdown. flush_batch may return the items it
+# could not write (or raise for the whole batch); those are put back and
+# retried with the next flush. Past max_pending items the caller flushes
+# inline, so a stuck database slows writers down instead of eating memory.
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Batches items in memory and writes them from a background thread"""
+
+    def __init__(self, flush_batch: Callable[[List[Any]], Optional[List[Any]]], max_items: int = 200,
+                 max_delay: float = 2.0, max_pending: int = 10000, name: str = 'write-behind'):
+        self.flush_batch = flush_batch
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.max_pending = max(max_pending, max_items)
+        self.name = name
+        self._items: List[Any] = []
+        self._oldest = 0.0  # monotonic time the oldest buffered item arrived
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # batches are written one at a time, in order
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.counters = {'added': 0, 'written': 0, 'batches': 0, 'failed_batches': 0, 'inline_flushes': 0}
+
+    def add(self, item: Any) -> None:
+        with self._condition:
+            if not self._items:
+                self._oldest = time.monotonic()
+            self._items.append(item)
+            self.counters['added'] += 1
+            pending = len(self._items)
+            write_through = self._closed or self.max_delay <= 0
+            backlogged = not write_through and pending >= self.max_pending
+            if backlogged:
+                self.counters['inline_flushes'] += 1
+            elif not write_through:
+                self._ensure_worker()
+                if pending >= self.max_items:
+                    self._condition.notify()
+
+        if write_through or backlogged:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of items written"""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._items = self._items, []
+            if not batch:
+                return 0
+            try:
+                failed = self.flush_batch(batch) or []
+            except Exception:
+                self._requeue(batch)
+                raise
+            if failed:
+                self._requeue(failed)
+            with self._condition:
+                self.counters['written'] += len(batch) - len(failed)
+                self.counters['batches'] += 1
+            return len(batch) - len(failed)
+
+    def _requeue(self, items: List[Any]) -> None:
+        with self._condition:
+            # Keep arrival order: failed items go back in front
+            self._items[:0] = items
+            self._oldest = time.monotonic()
+            self.counters['failed_batches'] += 1
+
+    def close(self) -> None:
+        """Stop the worker and write what is left"""
+        with self._condition:
+            self._closed = True
+            worker = self._worker
+            self._condition.notify()
+        if worker is not None:
+            worker.join(timeout=30)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("%s: %s buffered item(s) lost at shutdown: %s", self.name, self.pending(), e)
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._items)
+
+    def _ensure_worker(self) -> None:
+        # Called with the condition held
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._items:
+                        wait = self._oldest + self.max_delay - time.monotonic()
+                        if len(self._items) >= self.max_items or wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._condition.wait(wait)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("%s flush failed, will retry: %s", self.name, e)
+                time.sleep(min(self.max_delay, 1.0))
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return dict(self.counters, pending=len(self._items), max_delay=self.max_delay,
+                        max_items=self.max_items)
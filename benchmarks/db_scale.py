@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'database'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('LOG_FILE', '')
+
+import app
+from utils.shards import ShardRouter
+from utils.analytics import query_stats, merge_series
+from utils.questions import question_from_row
+from generate_synthetic import fill, synthetic_notes, synthetic_questions, TOPICS
+
+# Database scale benchmark.
+#
+# Grows a synthetic database step by step (e.g. 10^4, 10^5, 10^6 quizzes)
+# and, at each step, times the real code paths behind /history, /quiz/<id>,
+# /search, /stats and quiz saving, then records the database size. Compare
+# runs before and after a schema or index change.
+#
+#   python benchmarks/db_scale.py --steps 10000,100000,1000000 --json results.json
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+    return {'p50_ms': round(pick(0.5) * 1000, 3), 'p95_ms': round(pick(0.95) * 1000, 3),
+            'mean_ms': round(statistics.fmean(ordered) * 1000, 3)}
+
+
+def timed(operation, arguments):
+    samples = []
+    for args in arguments:
+        started = time.perf_counter()
+        operation(*args)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def load_quiz(quiz_id):
+    """The uncached /quiz/<id> path"""
+    shard, local_id = app.storage.decode_id(quiz_id)
+    conn = app.storage.connect(shard)
+    try:
+        return app.load_quiz_questions(conn.cursor(), local_id)
+    finally:
+        conn.close()
+
+
+def stats_last_30_days():
+    """The /stats path: daily series read from the rollups"""
+    end = datetime.utcnow()
+    window = (end - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+    return merge_series(app.storage.fan_out(lambda shard, conn: query_stats(conn, *window, 'day')))
+
+
+def database_bytes(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+
+
+def measure(db_path, users, samples, rng):
+    conn = app.storage.connect()
+    quiz_count, max_id = conn.execute("SELECT COUNT(*), MAX(id) FROM quizzes").fetchone()
+    conn.close()
+
+    quiz_ids = [(rng.randint(1, max_id),) for _ in range(samples)]
+    user_ids = [(rng.randint(1, users),) for _ in range(samples)]
+    terms = [(rng.choice(TOPICS[rng.choice(list(TOPICS))]), 10, 0) for _ in range(samples)]
+
+    inserts = []
+    for _ in range(max(samples // 10, 5)):
+        notes, topic, words = synthetic_notes(rng)
+        quiz_type = rng.choice(['mcq', 'flashcard'])
+        questions = [question_from_row(row) for row in synthetic_questions(rng, quiz_type, topic, words, 5)]
+        inserts.append((notes, questions, quiz_type, None, (), 'AI', rng.randint(1, users)))
+
+    return {
+        'quizzes': quiz_count,
+        'db_mb': round(database_bytes(db_path) / (1024 * 1024), 1),
+        'history': timed(app.get_quiz_history, user_ids),
+        'quiz': timed(load_quiz, quiz_ids),
+        'search': timed(app.search_all_shards, terms),
+        'stats': timed(stats_last_30_days, [()] * samples),
+        'insert': timed(app.save_quiz_to_db, inserts),
+    }
+
+
+COLUMNS = ('history', 'quiz', 'search', 'stats', 'insert')
+
+
+def print_row(result):
+    cells = [f"{result['quizzes']:>10,}", f"{result['db_mb']:>9.1f}"]
+    for name in COLUMNS:
+        cells.append(f"{result[name]['p50_ms']:>8.2f}/{result[name]['p95_ms']:<8.2f}")
+    print(' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency and size of the database at growing scale")
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'quiz_scale_bench.db'))
+    parser.add_argument('--steps', default='10000,100000', help='comma-separated quiz counts')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=200, help='timed calls per query type and step')
+    parser.add_argument('--workers', type=int, default=None, help='generator processes')
+    parser.add_argument('--fresh', action='store_true', help='delete the database before the first step')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    if args.fresh:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    app.storage = ShardRouter([args.db])
+    rng = random.Random(7)
+    results = []
+
+    print(f"{'quizzes':>10} {'size MB':>9} " + ' '.join(f"{name + ' p50/p95 ms':^17}" for name in COLUMNS))
+    for step in [int(value) for value in args.steps.split(',')]:
+        fill(args.db, step, users=args.users, workers=args.workers, progress=False)
+        result = measure(args.db, args.users, args.samples, rng)
+        results.append(result)
+        print_row(result)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import Config
+from utils.generator_backends import MODEL_PARAMETERS
+from utils.prompts import PROMPT_TEMPLATES, PromptBuilder, estimate_tokens
+
+# Prompt size benchmark.
+#
+# Builds Hugging Face request bodies for notes of growing length, up to the
+# longest notes /generate accepts (Config.MAX_NOTES_LENGTH characters), the
+# old way (the whole notes in the template) and through PromptBuilder, and
+# reports body size, estimated prompt tokens against the model's window
+# and build time. Every token over the window was uploaded and then cut
+# off by the API, and inference time grows with the tokens sent.
+#
+#   python benchmarks/prompts.py --model gpt2 --quiz-type mcq
+
+SUBJECTS = ['photosynthesis', 'the chloroplast', 'cellular respiration', 'the Calvin cycle', 'chlorophyll',
+            'the mitochondrion', 'glucose', 'the electron transport chain', 'ATP synthase', 'the stroma']
+VERBS = ['produces', 'requires', 'converts', 'stores', 'regulates', 'depends on', 'releases', 'absorbs']
+OBJECTS = ['light energy', 'carbon dioxide', 'oxygen', 'chemical energy', 'water molecules', 'NADPH',
+           'a proton gradient', 'three-carbon sugars', 'heat', 'pyruvate']
+
+
+def sample_notes(chars, seed=7):
+    """Whole sentences, at most chars characters in all"""
+    rng = random.Random(seed)
+    sentences, length = [], -1
+    while True:
+        sentence = (f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+                    f"in {rng.randint(2, 40)} steps during {rng.choice(SUBJECTS)}.")
+        if length + 1 + len(sentence) > chars:
+            return ' '.join(sentences)
+        sentences.append(sentence)
+        length += 1 + len(sentence)
+
+
+def full_prompt(model, notes, quiz_type, num_questions):
+    """The prompt before token budgeting: the whole notes, whatever their length"""
+    template = PROMPT_TEMPLATES.get(model, PROMPT_TEMPLATES['default'])[quiz_type]
+    return template.format(notes=notes, num_questions=num_questions)
+
+
+def body(prompt, parameters):
+    return json.dumps({'inputs': prompt, 'parameters': parameters}).encode('utf-8')
+
+
+def per_call_us(operation, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request body size and prompt tokens with and without budgeting")
+    parser.add_argument('--model', default='gpt2')
+    parser.add_argument('--quiz-type', choices=['mcq', 'flashcard'], default='mcq')
+    parser.add_argument('--questions', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200, help='timed builds per size')
+    args = parser.parse_args()
+
+    parameters = MODEL_PARAMETERS.get(args.model, MODEL_PARAMETERS['default'])[args.quiz_type]
+    builder = PromptBuilder(args.model, MODEL_PARAMETERS.get(args.model, MODEL_PARAMETERS['default']))
+    print(f"{args.model}, {args.quiz_type}: notes budget {builder.notes_budget(args.quiz_type)} tokens, "
+          f"max_new_tokens {parameters.get('max_new_tokens')}; "
+          f"/generate accepts notes of up to {Config.MAX_NOTES_LENGTH} characters")
+    print(f"{'notes chars':>12}{'body bytes':>22}{'prompt tokens':>20}{'build us':>18}")
+    print(f"{'':>12}{'full':>11}{'budgeted':>11}{'full':>10}{'budgeted':>10}{'full':>9}{'budgeted':>9}")
+
+    for chars in (500, 1000, 2000, 3500, Config.MAX_NOTES_LENGTH):
+        notes = sample_notes(chars)
+        before = full_prompt(args.model, notes, args.quiz_type, args.questions)
+        after = builder.build(notes, args.quiz_type, args.questions)
+        repeat = max(args.repeat * 5000 // chars, 5)
+        print(f"{len(notes):>12}"
+              f"{len(body(before, parameters)):>11}{len(body(after, parameters)):>11}"
+              f"{estimate_tokens(before):>10}{estimate_tokens(after):>10}"
+              f"{per_call_us(lambda: full_prompt(args.model, notes, args.quiz_type, args.questions), repeat):>9.0f}"
+              f"{per_call_us(lambda: builder.build(notes, args.quiz_type, args.questions), repeat):>9.0f}")
+
+if __name__ == "__main__":
+    main()
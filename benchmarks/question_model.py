@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.fast_json import dumps, JSON_BACKEND
+from utils.questions import question_from_dict, question_from_row
+
+# Question model benchmark.
+#
+# Compares the old path (ad-hoc dicts, json.dumps per DB column, Flask's
+# standard json provider for responses) with the __slots__ models and the
+# utils.fast_json codec, on a 10-question quiz: memory held per quiz,
+# encoding the DB columns, encoding the /quiz response and rebuilding the
+# quiz from its rows.
+#
+#   python benchmarks/question_model.py --repeat 20000
+
+
+def sample_quiz(count=10):
+    questions = []
+    for i in range(count):
+        if i % 2 == 0:
+            questions.append({'question': f"Which organelle performs step {i} of cellular respiration?",
+                              'options': ['Mitochondria', 'Ribosome', 'Nucleus', 'Golgi apparatus'],
+                              'correct_answer': i % 4, 'type': 'mcq'})
+        else:
+            questions.append({'question': f"What happens during stage {i} of photosynthesis?",
+                              'answer': "Light energy is captured by chlorophyll and stored as chemical energy.",
+                              'type': 'flashcard'})
+    return questions
+
+
+def dict_db_columns(question):
+    """save_quiz_to_db before the question model"""
+    options_json = json.dumps(question.get('options', []))
+    if question['type'] == 'mcq':
+        answer_json = json.dumps(question.get('correct_answer', 0))
+    else:
+        answer_json = json.dumps(question.get('answer', ''))
+    return question['question'], question['type'], options_json, answer_json
+
+
+def dict_from_row(row):
+    """question_from_row before the question model"""
+    question = {'question': row[0], 'type': row[1]}
+    if row[1] == 'mcq':
+        question['options'] = json.loads(row[2]) if row[2] else []
+        question['correct_answer'] = json.loads(row[3]) if row[3] else 0
+    else:
+        question['answer'] = json.loads(row[3]) if row[3] else ''
+    return question
+
+
+def stdlib_response(questions):
+    """What Flask's default provider produced for /quiz/<id>"""
+    return json.dumps({'success': True, 'questions': questions}, sort_keys=True, ensure_ascii=True,
+                      separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def model_response(questions):
+    return dumps({'success': True, 'questions': questions}, sort_keys=True) + b'\n'
+
+
+def per_call_us(operation, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def held_bytes(build, copies):
+    """Bytes allocated to keep `copies` quizzes alive"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build() for _ in range(copies)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+    return size / copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocation and serialization cost of quiz questions")
+    parser.add_argument('--repeat', type=int, default=20000, help='timed calls per operation')
+    parser.add_argument('--copies', type=int, default=2000, help='quizzes kept alive for the memory figure')
+    args = parser.parse_args()
+
+    dict_quiz = sample_quiz()
+    model_quiz = [question_from_dict(question) for question in dict_quiz]
+    rows = [question.db_columns() for question in model_quiz]
+
+    results = [
+        ('bytes held per quiz',
+         held_bytes(lambda: [dict_from_row(row) for row in rows], args.copies),
+         held_bytes(lambda: [question_from_row(row) for row in rows], args.copies)),
+        ('encode DB columns (us)',
+         per_call_us(lambda: [dict_db_columns(question) for question in dict_quiz], args.repeat),
+         per_call_us(lambda: [question.db_columns() for question in model_quiz], args.repeat)),
+        ('encode /quiz response (us)',
+         per_call_us(lambda: stdlib_response(dict_quiz), args.repeat),
+         per_call_us(lambda: model_response(model_quiz), args.repeat)),
+        ('rebuild from rows (us)',
+         per_call_us(lambda: [dict_from_row(row) for row in rows], args.repeat),
+         per_call_us(lambda: [question_from_row(row) for row in rows], args.repeat)),
+    ]
+
+    print(f"10-question quiz, JSON backend: {JSON_BACKEND}")
+    print(f"{'':<28}{'dicts + json':>14}{'models':>14}{'change':>10}")
+    for name, before, after in results:
+        print(f"{name:<28}{before:>14.1f}{after:>14.1f}{(after - before) / before:>+10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Startup time benchmark.
+#
+# Starts fresh interpreters, as a worker spawn or development reload does,
+# and times importing app (which builds the app through create_app()),
+# bringing the schema up to date, the first request and the first quiz
+# generation (which builds the AI generator). Runs against TestingConfig's
+# scratch database without an API key, so no network is involved. Also
+# checks that heavy modules only needed by the AI path (requests) are still
+# unimported once create_app() has run and asgi.py is loaded.
+#
+#   python benchmarks/startup.py --runs 15
+
+# Imported on first use only; importing app or asgi must not pull them in
+LAZY_MODULES = ('requests',)
+
+SAMPLE_NOTES = ("Photosynthesis converts light energy into chemical energy. Chlorophyll absorbs mostly "
+                "blue and red light. The Calvin cycle fixes carbon dioxide into sugars.")
+
+
+def measure():
+    """Timings of one cold start, in ms (run in the child process)"""
+    started = time.perf_counter()
+    import app
+    imported = time.perf_counter()
+    app.init_database()
+    migrated = time.perf_counter()
+    client = app.app.test_client()
+    client.get('/health')
+    first_request = time.perf_counter()
+    client.post('/generate', json={'notes': SAMPLE_NOTES, 'force_new': True})
+    first_generate = time.perf_counter()
+    import asgi  # noqa: F401  (the ASGI entry point around the same app)
+    eager = [module for module in LAZY_MODULES if module in sys.modules]
+    print(json.dumps({
+        'import': (imported - started) * 1000,
+        'init_database': (migrated - imported) * 1000,
+        'first_request': (first_request - migrated) * 1000,
+        'first_generate': (first_generate - first_request) * 1000,
+        'eager_imports': eager
+    }))
+
+
+def cold_start():
+    env = dict(os.environ, FLASK_ENV='testing', HUGGING_FACE_API_KEY='', ENFORCE_CREDITS='false',
+               LOG_LEVEL='WARNING', LOG_FILE='', PREFETCH_ENABLED='false')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and first-request time of the Flask app")
+    parser.add_argument('--runs', type=int, default=10, help='cold starts to time')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, BACKEND)
+        measure()
+        return
+
+    runs = [cold_start() for _ in range(args.runs)]
+    print(f"{args.runs} cold starts (ms)")
+    print(f"{'':<18}{'median':>10}{'min':>10}{'max':>10}")
+    for name in ('import', 'init_database', 'first_request', 'first_generate'):
+        samples = [run[name] for run in runs]
+        print(f"{name:<18}{statistics.median(samples):>10.1f}{min(samples):>10.1f}{max(samples):>10.1f}")
+
+    eager = sorted({module for run in runs for module in run['eager_imports']})
+    if eager:
+        sys.exit(f"Imported at startup although only needed by the AI path: {', '.join(eager)}")
+    print(f"Not imported at startup: {', '.join(LAZY_MODULES)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import NoteStorageConfig
+from utils.migrations import migrate
+from utils.note_store import compact_notes
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quiz_app.db')
+
+def enable_incremental_vacuum(conn):
+    """Switch an existing database to auto_vacuum=INCREMENTAL (one full, blocking VACUUM)"""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate and compress stored notes, then reclaim space")
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help='SQLite database file')
+    parser.add_argument('--batch-size', type=int, default=NoteStorageConfig.COMPACTION_BATCH_SIZE)
+    parser.add_argument('--vacuum-pages', type=int, default=NoteStorageConfig.VACUUM_PAGES_PER_STEP,
+                        help='pages released per incremental vacuum step')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='convert an older database to incremental auto-vacuum first '
+                             '(runs one full VACUUM, which blocks writers while it runs)')
+    args = parser.parse_args()
+    
+    conn = sqlite3.connect(args.db, timeout=30)
+    migrate(conn)
+    
+    if args.enable_incremental_vacuum and enable_incremental_vacuum(conn):
+        print("🔧 Enabled incremental auto-vacuum")
+    
+    print("🗜️  Compacting notes...")
+    totals = compact_notes(conn, batch_size=args.batch_size,
+                           compress_min_bytes=NoteStorageConfig.COMPRESS_MIN_BYTES,
+                           codec=NoteStorageConfig.COMPRESSION,
+                           vacuum_pages=args.vacuum_pages)
+    incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    conn.close()
+    
+    for name, value in totals.items():
+        print(f"   {name.replace('_', ' ')}: {value}")
+    if not incremental:
+        print("   (free pages were not released; rerun with --enable-incremental-vacuum)")
+    print("✅ Compaction complete!")
+
+if __name__ == "__main__":
+    main()
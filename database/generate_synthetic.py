@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import NoteStorageConfig, SearchConfig
+from utils.migrations import migrate
+from utils.note_store import notes_digest, encode_content, PREVIEW_LENGTH
+from utils.near_duplicates import minhash_signature, band_buckets
+from utils.search import backfill_search_index
+from utils.analytics import rebuild_rollups
+
+# Synthetic data for load and scale testing.
+#
+# Worker processes build chunks of rows (note text, compression, MinHash
+# fingerprints, quizzes and questions are the CPU-heavy part) and the main
+# process, the only SQLite writer, loads each chunk with executemany in one
+# transaction. Note and quiz ids are assigned per chunk up front so workers
+# never need to talk to the database.
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synthetic.db')
+
+TOPICS = {
+    'biology': ['cell', 'mitochondria', 'protein', 'enzyme', 'membrane', 'nucleus', 'ribosome', 'photosynthesis',
+                'chlorophyll', 'respiration', 'gene', 'chromosome', 'organism', 'tissue', 'evolution'],
+    'physics': ['force', 'energy', 'momentum', 'velocity', 'acceleration', 'gravity', 'friction', 'wave',
+                'frequency', 'electron', 'circuit', 'resistance', 'voltage', 'magnet', 'photon'],
+    'history': ['empire', 'revolution', 'treaty', 'colony', 'parliament', 'dynasty', 'trade', 'war', 'reform',
+                'constitution', 'monarchy', 'republic', 'independence', 'alliance', 'migration'],
+    'computing': ['algorithm', 'database', 'index', 'network', 'compiler', 'processor', 'memory', 'cache',
+                  'thread', 'protocol', 'encryption', 'function', 'variable', 'recursion', 'server'],
+    'economics': ['market', 'inflation', 'demand', 'supply', 'price', 'interest', 'currency', 'tax', 'budget',
+                  'investment', 'trade', 'growth', 'labour', 'capital', 'monopoly'],
+}
+VERBS = ['controls', 'produces', 'reduces', 'increases', 'stores', 'transfers', 'depends on', 'regulates',
+         'converts', 'supports', 'limits', 'explains', 'determines', 'connects', 'protects']
+ADJECTIVES = ['important', 'complex', 'basic', 'central', 'efficient', 'stable', 'modern', 'primary',
+              'essential', 'dynamic', 'critical', 'common', 'natural', 'global', 'local']
+TEMPLATES = [
+    "The {a} is a {adj} part of {topic} that {verb} the {b}.",
+    "In {topic}, the {a} {verb} the {b} under most conditions.",
+    "A {adj} {a} usually {verb} the {b} and the {c}.",
+    "Students should remember that the {a} {verb} the {b}.",
+    "Without the {a}, the {b} would not be {adj} in {topic}.",
+    "The relationship between the {a} and the {b} is {adj} for understanding {topic}.",
+]
+
+QUIZ_TYPES = [('mcq', 0.6), ('flashcard', 0.4)]
+GENERATION_METHODS = [('AI', 0.7), ('Fallback', 0.25), ('Reused', 0.05)]
+
+
+def _pick(rng, weighted):
+    return rng.choices([value for value, _ in weighted], [weight for _, weight in weighted])[0]
+
+
+def _sentence(rng, topic, words):
+    a, b, c = rng.sample(words, 3)
+    return rng.choice(TEMPLATES).format(a=a, b=b, c=c, topic=topic, verb=rng.choice(VERBS),
+                                        adj=rng.choice(ADJECTIVES)).capitalize()
+
+
+def synthetic_notes(rng):
+    """Study notes of 200-5000 characters on one topic"""
+    topic = rng.choice(list(TOPICS))
+    words = TOPICS[topic]
+    target = int(min(max(rng.lognormvariate(6.8, 0.7), 200), 5000))
+    sentences, length = [], 0
+    while length < target:
+        sentence = _sentence(rng, topic, words)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return ' '.join(sentences)[:5000], topic, words
+
+
+def synthetic_questions(rng, quiz_type, topic, words, count):
+    rows = []
+    for _ in range(count):
+        a, b = rng.sample(words, 2)
+        if quiz_type == 'mcq':
+            options = rng.sample(words, 4)
+            rows.append((f"Which concept in {topic} {rng.choice(VERBS)} the {a}?", 'mcq',
+                         json.dumps(options), json.dumps(rng.randrange(4))))
+        else:
+            rows.append((f"What is the role of the {a} in {topic}?", 'flashcard', json.dumps([]),
+                         json.dumps(f"The {a} {rng.choice(VERBS)} the {b}.")))
+    return rows
+
+
+def build_chunk(seed, first_id, count, users, days, questions_per_quiz, fingerprints, now):
+    """Rows for quizzes first_id .. first_id + count - 1, each with its own note of the same id"""
+    rng = random.Random(seed * 1_000_003 + first_id)
+    notes, fingerprint_rows, bucket_rows, quizzes, questions = [], [], [], [], []
+
+    for quiz_id in range(first_id, first_id + count):
+        text, topic, words = synthetic_notes(rng)
+        user_id = rng.randint(1, users)
+        created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+        stamp = created_at.strftime('%Y-%m-%d %H:%M:%S')
+        stored, compression = encode_content(text, NoteStorageConfig.COMPRESS_MIN_BYTES,
+                                             NoteStorageConfig.COMPRESSION)
+        notes.append((quiz_id, user_id, stored, f"Notes from {created_at.strftime('%Y-%m-%d %H:%M')}", stamp,
+                      notes_digest(text), compression, len(text), text[:PREVIEW_LENGTH]))
+
+        if fingerprints:
+            signature = minhash_signature(text)
+            fingerprint_rows.append((quiz_id, signature.tobytes()))
+            bucket_rows.extend((band, bucket, quiz_id) for band, bucket in band_buckets(signature))
+
+        quiz_type = _pick(rng, QUIZ_TYPES)
+        question_count = max(1, min(10, int(rng.gauss(questions_per_quiz, 1.5))))
+        quizzes.append((quiz_id, quiz_id, quiz_type, stamp, _pick(rng, GENERATION_METHODS), user_id, question_count))
+        questions.extend((quiz_id,) + row
+                         for row in synthetic_questions(rng, quiz_type, topic, words, question_count))
+
+    return notes, fingerprint_rows, bucket_rows, quizzes, questions
+
+
+def load_chunk(conn, chunk):
+    notes, fingerprint_rows, bucket_rows, quizzes, questions = chunk
+    conn.execute('BEGIN')
+    conn.executemany('''
+        INSERT INTO notes (id, user_id, content, title, created_at, content_hash, compression, size, preview)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', notes)
+    conn.executemany("INSERT INTO note_fingerprints (note_id, signature) VALUES (?, ?)", fingerprint_rows)
+    conn.executemany("INSERT OR IGNORE INTO note_lsh_buckets (band, bucket, note_id) VALUES (?, ?, ?)", bucket_rows)
+    conn.executemany('''
+        INSERT INTO quizzes (id, notes_id, quiz_type, created_at, generation_method, user_id, question_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', quizzes)
+    conn.executemany('''
+        INSERT INTO questions (quiz_id, question_text, question_type, options, correct_answer)
+        VALUES (?, ?, ?, ?, ?)
+    ''', questions)
+    conn.execute('COMMIT')
+    return len(quizzes), len(questions)
+
+
+def ensure_users(conn, users):
+    """Users 1..users, about one in ten on the premium plan"""
+    conn.execute('BEGIN')
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (id, username, email, plan) VALUES (?, ?, ?, ?)",
+        [(user_id, f'user_{user_id}', f'user_{user_id}@example.com', 'premium' if user_id % 10 == 0 else 'free')
+         for user_id in range(2, users + 1)]
+    )
+    conn.execute('COMMIT')
+
+
+def fill(db_path, quizzes, users=1000, workers=None, chunk_size=2000, days=365, questions_per_quiz=5,
+         fingerprints=True, search_index=True, seed=42, progress=True):
+    """Add synthetic quizzes until the database holds `quizzes` of them; returns the number added"""
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    conn.isolation_level = None  # explicit transactions per chunk
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')  # bulk load; a crash only loses synthetic rows
+    ensure_users(conn, users)
+
+    # Notes and quizzes share ids so each chunk's ranges are known before it is built
+    first_id = max(conn.execute("SELECT COALESCE(MAX(id), 0) FROM notes").fetchone()[0],
+                   conn.execute("SELECT COALESCE(MAX(id), 0) FROM quizzes").fetchone()[0]) + 1
+    existing = conn.execute("SELECT COUNT(*) FROM quizzes").fetchone()[0]
+    missing = max(quizzes - existing, 0)
+    now = datetime.utcnow()
+
+    added = questions_added = 0
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep only a few chunks in flight so memory stays flat when the writer is the bottleneck
+        offsets = iter(range(0, missing, chunk_size))
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2:
+                offset = next(offsets, None)
+                if offset is None:
+                    break
+                count = min(chunk_size, missing - offset)
+                pending.append(pool.submit(build_chunk, seed, first_id + offset, count, users, days,
+                                           questions_per_quiz, fingerprints, now))
+            if not pending:
+                break
+            chunk_quizzes, chunk_questions = load_chunk(conn, pending.popleft().result())
+            added += chunk_quizzes
+            questions_added += chunk_questions
+            if progress:
+                rate = added / max(time.perf_counter() - started, 1e-9)
+                print(f"   {existing + added:,}/{quizzes:,} quizzes ({rate:,.0f}/s)", end='\r', flush=True)
+    if progress and missing:
+        print()
+
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('BEGIN')
+    rebuild_rollups(conn.cursor())
+    # Notes are indexed from Python (compressed bodies); questions were indexed by their triggers
+    conn.execute('''
+        INSERT OR REPLACE INTO search_backfill (source, next_rowid, end_rowid)
+        SELECT 'notes', COALESCE((SELECT next_rowid FROM search_backfill WHERE source = 'notes'), 0),
+               COALESCE(MAX(id), 0)
+        FROM notes
+    ''')
+    conn.execute('COMMIT')
+    if search_index:
+        backfill_search_index(conn, SearchConfig.BACKFILL_BATCH_SIZE)
+    conn.close()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic notes, quizzes and questions")
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help='SQLite database file (created if missing)')
+    parser.add_argument('--quizzes', type=int, default=100_000, help='total quizzes the database should hold')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None, help='generator processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='quizzes per bulk-insert transaction')
+    parser.add_argument('--days', type=int, default=365, help='spread created_at over this many past days')
+    parser.add_argument('--questions-per-quiz', type=int, default=5, help='average questions per quiz')
+    parser.add_argument('--no-fingerprints', action='store_true', help='skip MinHash fingerprints (faster)')
+    parser.add_argument('--no-search-index', action='store_true',
+                        help='leave notes unindexed; the app indexes them in the background on startup')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🧪 Filling {args.db} up to {args.quizzes:,} quizzes...")
+    started = time.perf_counter()
+    added = fill(args.db, args.quizzes, users=args.users, workers=args.workers, chunk_size=args.chunk_size,
+                 days=args.days, questions_per_quiz=args.questions_per_quiz,
+                 fingerprints=not args.no_fingerprints, search_index=not args.no_search_index, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(args.db) / (1024 * 1024)
+    print(f"✅ Added {added:,} quizzes in {elapsed:.1f}s; database is {size_mb:,.1f} MB")
+
+if __name__ == "__main__":
+    main()
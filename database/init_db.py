@@ -1,6 +1,12 @@
- 
 import sqlite3
 import os
+import sys
+
+# The schema lives in backend/utils/migrations.py (single source of truth)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.migrations import migrate, describe_migrations, SCHEMA_VERSION
+from utils.search import backfill_search_index
 
 def create_database():
     """Create and initialize the SQLite database"""
@@ -10,73 +16,18 @@ def create_database():
     
     # Connect to database (creates if doesn't exist)
     conn = sqlite3.connect('database/quiz_app.db')
-    cursor = conn.cursor()
-    
-    print("Creating database tables...")
-    
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            email TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Notes table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER DEFAULT 1,
-            content TEXT NOT NULL,
-            title TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
     
-    # Quizzes table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS quizzes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            notes_id INTEGER,
-            quiz_type TEXT NOT NULL CHECK(quiz_type IN ('mcq', 'flashcard')),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (notes_id) REFERENCES notes (id)
-        )
-    ''')
-    
-    # Questions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            quiz_id INTEGER,
-            question_text TEXT NOT NULL,
-            question_type TEXT NOT NULL,
-            options TEXT,  -- JSON string for MCQ options
-            correct_answer TEXT,  -- JSON string
-            explanation TEXT,
-            FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
-        )
-    ''')
-    
-    # Create a default user for demo purposes
-    cursor.execute('''
-        INSERT OR IGNORE INTO users (id, username, email) 
-        VALUES (1, 'demo_user', 'demo@example.com')
-    ''')
-    
-    # Create indexes for better performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_quizzes_notes_id ON quizzes(notes_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_quiz_id ON questions(quiz_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notes_user_id ON notes(user_id)')
-    
-    conn.commit()
+    print("Applying schema migrations...")
+    applied = migrate(conn)
+    indexed = backfill_search_index(conn)
     conn.close()
     
-    print("✅ Database created successfully!")
-    print("Tables created: users, notes, quizzes, questions")
+    if indexed:
+        print(f"🔎 Indexed {indexed} existing rows for search")
+    
+    print(f"✅ Database ready at schema v{SCHEMA_VERSION} ({applied} migration(s) applied)")
+    for line in describe_migrations():
+        print(f"   {line}")
     
 def test_database():
     """Test database connection and basic operations"""
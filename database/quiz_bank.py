@@ -0,0 +1,114 @@
+import argparse
+import gzip
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import NoteStorageConfig, TransferConfig, UserConfig
+from utils.migrations import migrate
+from utils.transfer import export_header, export_records, ndjson_chunks, read_ndjson, import_records
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quiz_app.db')
+
+# Export and import the quiz bank as NDJSON (the format of GET /export).
+#
+#   python database/quiz_bank.py export --out bank.ndjson.gz
+#   python database/quiz_bank.py export --db shards/shard-0.db shards/shard-1.db --out -
+#   python database/quiz_bank.py import bank.ndjson.gz --db other.db --user-id 7
+#
+# Both directions stream, so memory stays flat for any number of rows. A
+# .gz path is compressed/decompressed on the fly and '-' means stdout/stdin.
+# Import writes into one database file; spread it over shards afterwards
+# with reshard.py.
+
+def open_stream(path, mode):
+    if path == '-':
+        return (sys.stdout if 'w' in mode else sys.stdin).buffer
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+def export_bank(args):
+    out = open_stream(args.out, 'wb')
+    # Progress goes to stderr so the export itself can go to stdout
+    log = sys.stderr if args.out == '-' else sys.stdout
+    counts = {'note': 0, 'quiz': 0}
+
+    def records():
+        yield export_header()
+        for path in args.db:
+            conn = sqlite3.connect(path, timeout=30)
+            try:
+                for record in export_records(conn, args.fetch_size):
+                    counts[record['type']] += 1
+                    yield record
+            finally:
+                conn.close()
+
+    print("📤 Exporting quiz bank...", file=log)
+    try:
+        for chunk in ndjson_chunks(records(), TransferConfig.CHUNK_BYTES):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"   notes: {counts['note']}", file=log)
+    print(f"   quizzes: {counts['quiz']}", file=log)
+    print("✅ Export complete!", file=log)
+
+def import_bank(args):
+    conn = sqlite3.connect(args.db, timeout=30)
+    migrate(conn)
+
+    def progress(counts):
+        print(f"   ... {counts['notes'] + counts['notes_reused']} notes, {counts['quizzes']} quizzes")
+
+    print("📥 Importing quiz bank...")
+    source = open_stream(args.input, 'rb')
+    # MinHash fingerprints of new notes are most of the work
+    pool = ProcessPoolExecutor(args.workers)
+    try:
+        totals = import_records(conn, read_ndjson(source), user_id=args.user_id, chunk_size=args.chunk_size,
+                                compress_min_bytes=NoteStorageConfig.COMPRESS_MIN_BYTES,
+                                codec=NoteStorageConfig.COMPRESSION,
+                                map_function=partial(pool.map, chunksize=64), progress=progress)
+    finally:
+        pool.shutdown()
+        if source is not sys.stdin.buffer:
+            source.close()
+        conn.close()
+
+    for name, value in totals.items():
+        print(f"   {name.replace('_', ' ')}: {value}")
+    print("✅ Import complete!")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import notes, quizzes and questions as NDJSON")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='write every note, quiz and question')
+    export_parser.add_argument('--db', nargs='+', default=[DEFAULT_DATABASE],
+                               help='SQLite database file(s); list every shard file of a sharded deployment')
+    export_parser.add_argument('--out', default='-', help="output file (.gz to compress, '-' for stdout)")
+    export_parser.add_argument('--fetch-size', type=int, default=TransferConfig.FETCH_SIZE,
+                               help='rows read per round trip')
+    export_parser.set_defaults(run=export_bank)
+
+    import_parser = commands.add_parser('import', help='add an export to a database')
+    import_parser.add_argument('input', help="export file (.gz is decompressed, '-' for stdin)")
+    import_parser.add_argument('--db', default=DEFAULT_DATABASE, help='SQLite database file')
+    import_parser.add_argument('--user-id', type=int, default=UserConfig.DEFAULT_USER_ID,
+                               help='owner of the imported notes and quizzes')
+    import_parser.add_argument('--chunk-size', type=int, default=TransferConfig.IMPORT_CHUNK_SIZE,
+                               help='records written per transaction')
+    import_parser.add_argument('--workers', type=int, default=None,
+                               help='fingerprinting processes (default: CPU count)')
+    import_parser.set_defaults(run=import_bank)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
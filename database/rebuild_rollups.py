@@ -0,0 +1,30 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from utils.migrations import migrate
+from utils.analytics import rebuild_rollups
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quiz_app.db')
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute analytics rollups from quizzes and questions")
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help='SQLite database file')
+    args = parser.parse_args()
+    
+    conn = sqlite3.connect(args.db, timeout=30)
+    migrate(conn)
+    
+    print("📊 Rebuilding analytics rollups...")
+    conn.execute('BEGIN IMMEDIATE')
+    rows = rebuild_rollups(conn.cursor())
+    conn.commit()
+    conn.close()
+    
+    print(f"✅ Rebuilt {rows} rollup rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from config import StorageConfig, SearchConfig
+from utils.migrations import migrate
+from utils.search import backfill_search_index
+from utils.analytics import rebuild_rollups
+from utils.shards import shard_paths, shard_for_digest, HOME_SHARD, MAX_SHARDS, SHARD_BITS
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quiz_app.db')
+
+# (table, rows of the source that belong to the shard being filled). Notes are
+# placed by content hash; everything derived from a note follows it.
+SHARDED_TABLES = [
+    ('notes', "SELECT * FROM src.notes WHERE note_shard(content_hash) = :shard"),
+    ('note_fingerprints', "SELECT * FROM src.note_fingerprints WHERE note_id IN (SELECT id FROM main.notes)"),
+    ('note_lsh_buckets', "SELECT * FROM src.note_lsh_buckets WHERE note_id IN (SELECT id FROM main.notes)"),
+    ('quizzes', "SELECT * FROM src.quizzes WHERE notes_id IN (SELECT id FROM main.notes) "
+                "OR (notes_id IS NULL AND :shard = 0)"),
+    ('questions', "SELECT * FROM src.questions WHERE quiz_id IN (SELECT id FROM main.quizzes)"),
+    ('attempts', "SELECT * FROM src.attempts WHERE quiz_id IN (SELECT id FROM main.quizzes)"),
+    ('attempt_answers', "SELECT * FROM src.attempt_answers WHERE attempt_id IN (SELECT id FROM main.attempts)"),
+    # Rows without a question only mark a sentence as seen; every shard keeps them
+    ('sentence_index', "SELECT * FROM src.sentence_index "
+                       "WHERE question_id = 0 OR question_id IN (SELECT id FROM main.questions)"),
+]
+
+def copy_table(conn, table, select, shard):
+    """Insert the selected source rows, keeping their ids (they stay unique within a shard)"""
+    columns = ', '.join(row[1] for row in conn.execute(f'PRAGMA main.table_info({table})'))
+    select = select.replace('SELECT *', f'SELECT {columns}', 1)
+    return conn.execute(f'INSERT INTO main.{table} ({columns}) {select}', {'shard': shard}).rowcount
+
+def fill_shard(path, shard, shard_count, source):
+    """Create one shard file and copy its share of the source database into it"""
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.isolation_level = None  # explicit transaction below
+    conn.create_function('note_shard', 1,
+                         lambda digest: shard_for_digest(digest, shard_count) if digest else HOME_SHARD,
+                         deterministic=True)
+    conn.execute('ATTACH DATABASE ? AS src', (source,))
+
+    counts = {}
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table, select in SHARDED_TABLES:
+            counts[table] = copy_table(conn, table, select, shard)
+        if shard == HOME_SHARD:
+            conn.execute('DELETE FROM main.users')
+            counts['users'] = copy_table(conn, 'users', 'SELECT * FROM src.users', shard)
+            # Review cards stay with the users but name quizzes by public id, which now encodes the shard
+            counts['review_cards'] = conn.execute(f'''
+                INSERT INTO main.review_cards (user_id, quiz_id, question_index, due_at, interval_days, ease,
+                                               repetitions, lapses, reviewed_at)
+                SELECT rc.user_id, (rc.quiz_id << {SHARD_BITS}) | note_shard(n.content_hash), rc.question_index,
+                       rc.due_at, rc.interval_days, rc.ease, rc.repetitions, rc.lapses, rc.reviewed_at
+                FROM src.review_cards rc
+                JOIN src.quizzes q ON q.id = rc.quiz_id
+                LEFT JOIN src.notes n ON n.id = q.notes_id
+            ''').rowcount
+
+        # Notes are indexed from Python (decompression); questions were indexed by their triggers
+        conn.execute('''
+            INSERT OR REPLACE INTO search_backfill (source, next_rowid, end_rowid)
+            SELECT 'notes', 0, COALESCE(MAX(id), 0) FROM main.notes
+        ''')
+        rebuild_rollups(conn.cursor())
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('DETACH DATABASE src')
+
+    backfill_search_index(conn, SearchConfig.BACKFILL_BATCH_SIZE)
+    conn.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a single-file database into notes-hash shards")
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help='existing single-file SQLite database')
+    parser.add_argument('--shards', type=int, required=True, help=f'number of shards (2-{MAX_SHARDS})')
+    parser.add_argument('--out-dir', default=StorageConfig.SHARD_DIR, help='directory for the shard files')
+    args = parser.parse_args()
+
+    if not 2 <= args.shards <= MAX_SHARDS:
+        parser.error(f'--shards must be between 2 and {MAX_SHARDS}')
+    paths = shard_paths(args.db, args.shards, args.out_dir)
+    existing = [path for path in paths if os.path.exists(path)]
+    if existing:
+        parser.error(f'shard files already exist: {", ".join(existing)}')
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # Bring the source to the current schema so its columns match the shards
+    source = sqlite3.connect(args.db, timeout=30)
+    migrate(source)
+    source.close()
+
+    print(f"🔀 Splitting {args.db} into {args.shards} shards in {args.out_dir}...")
+    for shard, path in enumerate(paths):
+        counts = fill_shard(path, shard, args.shards, args.db)
+        print(f"   shard {shard}: {counts['notes']} notes, {counts['quizzes']} quizzes, "
+              f"{counts['questions']} questions")
+
+    print("✅ Resharding complete!")
+    print(f"   Start the app with SHARD_COUNT={args.shards} SHARD_DIR={os.path.abspath(args.out_dir)}")
+    print("   Quiz ids change: each is now (old id << 8) | shard")
+
+if __name__ == "__main__":
+    main()